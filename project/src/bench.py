@@ -0,0 +1,303 @@
+# src/bench.py
+"""
+Benchmark dos parsers, do match e da escolha de custo.
+
+Uso (de dentro de project/):
+    python -m src.bench                          # escala padrão, imprime JSON
+    python -m src.bench --saida bench.json       # grava o JSON
+    python -m src.bench --comparar bench.json    # compara com uma rodada anterior
+
+Mede:
+- parse_fornecedorN: linhas/s e ofertas/s sobre os fornecedorN.txt (texto repetido
+  até a escala pedida)
+- read_products_csv: produtos/s num CSV sintético
+- match_ofertas_por_nome / melhor_compra_para_produto: produtos/s (lista e OfferIndex)
+- pico de memória (tracemalloc) de cada etapa
+"""
+import contextlib
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+from .domain import OfertaFornecedor, ProdutoDesejado
+from .io import read_products_csv
+from .services import (
+    LAYOUTS,
+    OfferIndex,
+    _clean_for_match,
+    match_ofertas_por_nome,
+    melhor_compra_para_produto,
+)
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+FORNECEDORES_DIR = BASE_DIR / "data" / "fornecedores"
+
+# métricas "maior é melhor" que entram na comparação entre rodadas
+_METRICAS = ("linhas_s", "ofertas_s", "produtos_s")
+
+
+# ---------------- gerador sintético ----------------
+
+def gerar_texto_catalogo(texto: str, linhas_alvo: int) -> str:
+    """Repete o texto do fornecedor até ter ~linhas_alvo linhas."""
+    linhas = texto.splitlines()
+    if not linhas:
+        return ""
+    vezes = max(1, -(-linhas_alvo // len(linhas)))
+    return "\n".join(linhas * vezes)
+
+
+def gerar_ofertas(base: list[OfertaFornecedor], n: int, seed: int = 0) -> list[OfertaFornecedor]:
+    """
+    n ofertas sintéticas com nomes novos: primeira palavra de um nome real
+    + palavras sorteadas do vocabulário real (tamanho parecido com o real).
+    """
+    rnd = random.Random(seed)
+    vocab = sorted({t for o in base for t in _clean_for_match(o.nome_pdf).split()})
+    ofertas = []
+    for i in range(n):
+        o = base[rnd.randrange(len(base))]
+        tokens = _clean_for_match(o.nome_pdf).split()[:1] + rnd.sample(vocab, rnd.randint(1, 3))
+        ofertas.append(
+            OfertaFornecedor(
+                fornecedor=f"sint{i % 20}",
+                nome_pdf=" ".join(tokens).upper(),
+                embalagem_kg=o.embalagem_kg,
+                preco_por_kg=round((o.preco_por_kg or 10.0) * rnd.uniform(0.8, 1.2), 2),
+                tipo_preco=o.tipo_preco,
+                linha_origem="",
+            )
+        )
+    return ofertas
+
+
+def gerar_produtos(base: list[OfertaFornecedor], n: int, seed: int = 0) -> list[ProdutoDesejado]:
+    """n produtos: 1-3 primeiras palavras de nomes reais, demanda entre 1 e 100 kg."""
+    rnd = random.Random(seed)
+    nomes = [_clean_for_match(o.nome_pdf).split() for o in base]
+    nomes = [t for t in nomes if t]
+    produtos = []
+    for _ in range(n):
+        tokens = nomes[rnd.randrange(len(nomes))]
+        produtos.append(
+            ProdutoDesejado(
+                nome_base=" ".join(tokens[:rnd.randint(1, 3)]),
+                demanda_kg=float(rnd.randint(1, 100)),
+            )
+        )
+    return produtos
+
+
+def escrever_produtos_csv(produtos: list[ProdutoDesejado], path: str | Path) -> None:
+    with Path(path).open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["produto", "demanda", "unidade"])
+        for p in produtos:
+            w.writerow([p.nome_base, p.demanda_kg, "kg"])
+
+
+# ---------------- medição ----------------
+
+def _medir(fn: Callable[[], object]) -> tuple[object, float]:
+    """(resultado, segundos)."""
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def _pico_mb(fn: Callable[[], object]) -> float:
+    """Pico de memória alocada (MB) rodando fn com tracemalloc (rodada separada,
+    para o tracemalloc não distorcer o tempo)."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pico / 2**20, 2)
+
+
+def _taxa(n: int, dt: float) -> float:
+    return round(n / dt, 1) if dt > 0 else 0.0
+
+
+def bench_parsers(linhas_alvo: int) -> dict:
+    out = {}
+    for nome, layout in LAYOUTS.items():
+        txt = FORNECEDORES_DIR / f"{nome}.txt"
+        if not txt.exists():
+            continue
+        texto = gerar_texto_catalogo(txt.read_text(encoding="utf-8"), linhas_alvo)
+        n_linhas = texto.count("\n") + 1
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            ofertas, dt = _medir(lambda: list(layout.parser(texto, nome)))
+            pico = _pico_mb(lambda: list(layout.parser(texto, nome)))
+
+        out[nome] = {
+            "linhas": n_linhas,
+            "ofertas": len(ofertas),
+            "segundos": round(dt, 4),
+            "linhas_s": _taxa(n_linhas, dt),
+            "ofertas_s": _taxa(len(ofertas), dt),
+            "pico_mem_mb": pico,
+        }
+    return out
+
+
+def _bench_produtos(fn: Callable[[ProdutoDesejado], object], produtos: list[ProdutoDesejado], orcamento_s: float) -> dict:
+    """
+    Roda fn produto a produto até acabar a lista ou o orçamento de tempo.
+    O pico de memória é medido numa amostra pequena (tracemalloc é lento).
+    """
+    feitos = 0
+
+    def rodar():
+        nonlocal feitos
+        limite = time.perf_counter() + orcamento_s
+        for p in produtos:
+            fn(p)
+            feitos += 1
+            if time.perf_counter() > limite:
+                break
+
+    _, dt = _medir(rodar)
+    amostra = produtos[:min(feitos, 20)]
+    return {
+        "produtos": feitos,
+        "segundos": round(dt, 4),
+        "produtos_s": _taxa(feitos, dt),
+        "pico_mem_mb": _pico_mb(lambda: [fn(p) for p in amostra]),
+    }
+
+
+def bench_match(ofertas: list[OfertaFornecedor], produtos: list[ProdutoDesejado], orcamento_s: float) -> dict:
+    out = {"n_ofertas": len(ofertas), "n_produtos": len(produtos)}
+
+    index, dt = _medir(lambda: OfferIndex(ofertas))
+    out["index_build"] = {"segundos": round(dt, 4), "pico_mem_mb": _pico_mb(lambda: OfferIndex(ofertas))}
+
+    out["match_lista"] = _bench_produtos(lambda p: match_ofertas_por_nome(p.nome_base, ofertas), produtos, orcamento_s)
+    out["match_index"] = _bench_produtos(lambda p: match_ofertas_por_nome(p.nome_base, index), produtos, orcamento_s)
+    out["melhor_compra_lista"] = _bench_produtos(lambda p: melhor_compra_para_produto(p, ofertas), produtos, orcamento_s)
+    out["melhor_compra_index"] = _bench_produtos(lambda p: melhor_compra_para_produto(p, index), produtos, orcamento_s)
+    return out
+
+
+def bench_read_products(produtos: list[ProdutoDesejado]) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "produtos.csv"
+        escrever_produtos_csv(produtos, path)
+        lidos, dt = _medir(lambda: list(read_products_csv(path)))
+        pico = _pico_mb(lambda: list(read_products_csv(path)))
+    return {
+        "produtos": len(lidos),
+        "segundos": round(dt, 4),
+        "produtos_s": _taxa(len(lidos), dt),
+        "pico_mem_mb": pico,
+    }
+
+
+def _ofertas_fixtures() -> list[OfertaFornecedor]:
+    ofertas = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for nome, layout in LAYOUTS.items():
+            txt = FORNECEDORES_DIR / f"{nome}.txt"
+            if txt.exists():
+                ofertas += layout.parser(txt.read_text(encoding="utf-8"), nome)
+    return ofertas
+
+
+def run(
+    linhas_parser: int = 50_000,
+    n_ofertas: int = 100_000,
+    n_produtos: int = 10_000,
+    orcamento_s: float = 10.0,
+    seed: int = 0,
+) -> dict:
+    base = _ofertas_fixtures()
+    ofertas = base + gerar_ofertas(base, max(0, n_ofertas - len(base)), seed=seed)
+    produtos = gerar_produtos(base, n_produtos, seed=seed)
+
+    return {
+        "config": {
+            "linhas_parser": linhas_parser,
+            "n_ofertas": len(ofertas),
+            "n_produtos": n_produtos,
+            "orcamento_s": orcamento_s,
+            "seed": seed,
+            "python": sys.version.split()[0],
+        },
+        "parsers": bench_parsers(linhas_parser),
+        "read_products_csv": bench_read_products(produtos),
+        "match": bench_match(ofertas, produtos, orcamento_s),
+    }
+
+
+# ---------------- comparação entre rodadas ----------------
+
+def _achatar(d: dict, prefixo: str = "") -> dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        chave = f"{prefixo}{k}"
+        if isinstance(v, dict):
+            out.update(_achatar(v, chave + "."))
+        elif k in _METRICAS:
+            out[chave] = v
+    return out
+
+
+def comparar(atual: dict, anterior: dict, tolerancia: float = 0.2) -> list[str]:
+    """Métricas de vazão que caíram mais que `tolerancia` (ex: 0.2 = 20%)."""
+    a, b = _achatar(atual), _achatar(anterior)
+    regressoes = []
+    for k, antes in b.items():
+        agora = a.get(k)
+        if agora is None or not antes:
+            continue
+        if agora < antes * (1 - tolerancia):
+            regressoes.append(f"{k}: {antes} -> {agora} ({(agora / antes - 1) * 100:+.0f}%)")
+    return regressoes
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Benchmark de parse, match e custo.")
+    ap.add_argument("--linhas-parser", type=int, default=50_000, help="linhas de texto por fornecedor")
+    ap.add_argument("--ofertas", type=int, default=100_000, help="total de ofertas (fixtures + sintéticas)")
+    ap.add_argument("--produtos", type=int, default=10_000, help="produtos sintéticos")
+    ap.add_argument("--orcamento", type=float, default=10.0, help="segundos máximos por medição de match")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--saida", help="grava o resultado em JSON neste arquivo")
+    ap.add_argument("--comparar", help="JSON de uma rodada anterior")
+    ap.add_argument("--tolerancia", type=float, default=0.2, help="queda aceita antes de acusar regressão")
+    args = ap.parse_args(argv)
+
+    resultado = run(args.linhas_parser, args.ofertas, args.produtos, args.orcamento, args.seed)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        Path(args.saida).write_text(texto, encoding="utf-8")
+    else:
+        print(texto)
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        regressoes = comparar(resultado, anterior, args.tolerancia)
+        for r in regressoes:
+            print("[REGRESSAO]", r, file=sys.stderr)
+        return 1 if regressoes else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
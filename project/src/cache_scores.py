@@ -0,0 +1,94 @@
+# src/cache_scores.py
+"""
+Cache persistente dos scores de similaridade entre rodadas.
+
+Chave: (consulta limpa, nome limpo da oferta). Como catálogos e lista de
+produtos mudam pouco de um dia para o outro, quase todos os pares se repetem
+e o SequenceMatcher só roda para os pares novos.
+
+- LRU com limite de itens: o par menos usado sai primeiro
+- gravado em JSON (do mais antigo para o mais recente), escrita atômica
+- versão do matcher no arquivo: se _similarity/_clean_for_match mudar,
+  o cache salvo é descartado
+"""
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from .services import MATCHER_VERSION
+
+MAX_ITENS = 500_000
+
+
+class CacheScores:
+    """
+    Uso:
+        cache = CacheScores(folder / ".cache" / "scores.json")
+        match_ofertas_por_nome(nome, index, cache=cache)
+        cache.salvar()
+        cache.estatisticas()   # hits / misses / taxa
+    """
+
+    def __init__(self, path: Optional[str | Path] = None, max_itens: int = MAX_ITENS):
+        self.path = Path(path) if path is not None else None
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+        self._itens: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._alterado = False
+        if self.path is not None:
+            self._carregar()
+
+    def _carregar(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            dados = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError:
+            return
+        if dados.get("versao") != MATCHER_VERSION:
+            return
+        for a, b, s in dados["itens"][-self.max_itens:]:
+            self._itens[(a, b)] = s
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def get(self, a: str, b: str) -> Optional[float]:
+        chave = (a, b)
+        s = self._itens.get(chave)
+        if s is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._itens.move_to_end(chave)
+        return s
+
+    def put(self, a: str, b: str, s: float) -> None:
+        self._itens[(a, b)] = s
+        self._itens.move_to_end((a, b))
+        self._alterado = True
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def estatisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_hit": round(self.hits / total, 4) if total else 0.0,
+            "itens": len(self._itens),
+        }
+
+    def salvar(self) -> None:
+        """Grava só se algum par novo entrou (a ordem LRU de uma rodada só com hits não é regravada)."""
+        if self.path is None or not self._alterado:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        dados = {"versao": MATCHER_VERSION, "itens": [[a, b, s] for (a, b), s in self._itens.items()]}
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._alterado = False
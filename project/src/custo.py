@@ -0,0 +1,95 @@
+# src/custo.py
+"""
+Custo vetorizado (NumPy) de todos os candidatos de um produto.
+
+melhor_entre_candidatos monta um dict por candidato num loop Python, então
+só dá para custear os top_n do match. Aqui pacotes, qtd_comprada_kg e
+custo_total saem de uma passada NumPy sobre todos os candidatos (ex: todos
+acima do min_score) e só as linhas emitidas (melhor + alternativas) viram dict.
+
+Mesma regra de melhor_entre_candidatos: menor custo_total arredondado em
+centavos; empate fica com o candidato que veio antes (maior score).
+"""
+from typing import Optional
+
+import numpy as np
+
+from .domain import OfertaFornecedor, ProdutoDesejado
+
+# folga (R$) acima do k-ésimo menor custo bruto: cobre os candidatos que
+# podem empatar com ele depois de arredondar em centavos
+_FOLGA = 0.02
+
+
+def avaliar_custos(
+    p: ProdutoDesejado,
+    candidatos: list[tuple[OfertaFornecedor, float]],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (pacotes, qtd_comprada_kg, custo_total) de cada candidato, na ordem dada.
+    Embalagem <= 0 ou sem preço: custo = +inf (nunca escolhido).
+    """
+    n = len(candidatos)
+    emb = np.fromiter((np.nan if o.embalagem_kg is None else o.embalagem_kg for o, _ in candidatos), np.float64, n)
+    preco = np.fromiter((np.nan if o.preco_por_kg is None else o.preco_por_kg for o, _ in candidatos), np.float64, n)
+
+    valido = (emb > 0) & ~np.isnan(preco)
+    emb_ok = np.where(valido, emb, 1.0)
+    pacotes = np.ceil(p.demanda_kg / emb_ok)
+    qtd = pacotes * emb_ok
+    custo = np.where(valido, qtd * np.where(valido, preco, 0.0), np.inf)
+    return pacotes, qtd, custo
+
+
+def ranking_compras(
+    p: ProdutoDesejado,
+    candidatos: list[tuple[OfertaFornecedor, float]],
+    n: int = 1,
+) -> list[dict]:
+    """
+    Os n candidatos de menor custo, do melhor para o pior, no formato de
+    melhor_entre_candidatos ([] se nenhum candidato serve).
+    ranking_compras(p, c)[0] == melhor_entre_candidatos(p, c).
+    """
+    if not candidatos or n <= 0:
+        return []
+
+    pacotes, qtd, custo = avaliar_custos(p, candidatos)
+    ok = np.flatnonzero(np.isfinite(custo))
+    if len(ok) == 0:
+        return []
+
+    # só os perto do k-ésimo menor custo podem ficar entre os n primeiros
+    k = min(n, len(ok))
+    kesimo = np.partition(custo[ok], k - 1)[k - 1]
+    perto = ok[custo[ok] <= kesimo + _FOLGA]
+
+    # desempate exato como no loop: round() do Python e ordem do candidato
+    ordem = sorted(perto.tolist(), key=lambda i: (round(float(custo[i]), 2), i))[:n]
+
+    linhas = []
+    for i in ordem:
+        o, score = candidatos[i]
+        linhas.append({
+            "produto": p.nome_base,
+            "demanda_kg": p.demanda_kg,
+            "fornecedor": o.fornecedor,
+            "nome_pdf": o.nome_pdf,
+            "match_score": round(score, 3),
+            "embalagem_kg": o.embalagem_kg,
+            "preco_por_kg": o.preco_por_kg,
+            "pacotes": int(pacotes[i]),
+            "qtd_comprada_kg": float(qtd[i]),
+            "custo_total": round(float(custo[i]), 2),
+            "tipo_preco": o.tipo_preco,
+        })
+    return linhas
+
+
+def melhor_compra_vetorizada(
+    p: ProdutoDesejado,
+    candidatos: list[tuple[OfertaFornecedor, float]],
+) -> Optional[dict]:
+    """melhor_entre_candidatos com o custo vetorizado."""
+    linhas = ranking_compras(p, candidatos, 1)
+    return linhas[0] if linhas else None
@@ -0,0 +1,78 @@
+# src/demanda.py
+"""
+Demanda de várias lojas: CSV de produtos com coluna loja (ou filial).
+
+- agregar(): soma a demanda de cada produto (nome_base) entre as lojas; o
+  match e o custo rodam uma vez por produto, não uma vez por linha
+- ratear(): reparte a compra consolidada do produto entre as lojas que o
+  pediram, na proporção da demanda de cada uma
+- gravar_rateio(): compras_por_loja.csv, lendo o CSV de novo linha a linha
+  (memória proporcional aos produtos distintos, não às linhas)
+"""
+import csv
+from pathlib import Path
+from typing import Iterable
+
+from .domain import ProdutoDesejado
+
+COLUNAS_RATEIO = [
+    "loja", "produto", "demanda_kg",
+    "fornecedor", "nome_pdf", "preco_por_kg",
+    "qtd_alocada_kg", "custo_rateado",
+]
+
+
+def agregar(produtos: Iterable[ProdutoDesejado]) -> tuple[list[ProdutoDesejado], int, int]:
+    """
+    (um ProdutoDesejado por nome_base com a demanda somada, na ordem da
+    1ª aparição; nº de linhas lidas; nº de lojas distintas)
+    """
+    total: dict[str, float] = {}
+    lojas: set[str] = set()
+    n_linhas = 0
+    for p in produtos:
+        total[p.nome_base] = total.get(p.nome_base, 0.0) + p.demanda_kg
+        lojas.add(p.loja)
+        n_linhas += 1
+    # arredonda o resíduo da soma de floats (ex: 3.033 + ... = 2251.267999999999)
+    agregados = [ProdutoDesejado(nome, round(kg, 6)) for nome, kg in total.items()]
+    return agregados, n_linhas, len(lojas)
+
+
+def ratear(compra: dict, p: ProdutoDesejado) -> dict:
+    """
+    Parte da loja de `p` na compra consolidada (formato de
+    melhor_entre_candidatos para a demanda somada): recebe e paga na
+    proporção do que pediu, inclusive a sobra do último pacote.
+    """
+    fracao = p.demanda_kg / compra["demanda_kg"]
+    return {
+        "loja": p.loja,
+        "produto": p.nome_base,
+        "demanda_kg": p.demanda_kg,
+        "fornecedor": compra["fornecedor"],
+        "nome_pdf": compra["nome_pdf"],
+        "preco_por_kg": compra["preco_por_kg"],
+        "qtd_alocada_kg": round(compra["qtd_comprada_kg"] * fracao, 3),
+        "custo_rateado": round(compra["custo_total"] * fracao, 2),
+    }
+
+
+def gravar_rateio(path: str | Path, produtos: Iterable[ProdutoDesejado], compras: dict[str, dict]) -> int:
+    """
+    Uma linha por (loja, produto) do CSV original com a parte da compra
+    consolidada; produto sem compra (não encontrado) fica de fora.
+    Retorna o nº de linhas gravadas.
+    """
+    n = 0
+    with Path(path).open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUNAS_RATEIO)
+        for p in produtos:
+            compra = compras.get(p.nome_base)
+            if compra is None:
+                continue
+            r = ratear(compra, p)
+            w.writerow([r[c] for c in COLUNAS_RATEIO])
+            n += 1
+    return n
@@ -1,15 +1,22 @@
 # src/domain.py
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass(frozen=True)
 class ProdutoDesejado:
     nome_base: str      # nome normalizado (simples)
     demanda_kg: float   # sempre em kg
+    loja: Optional[str] = None  # loja/filial que pediu (CSV com coluna loja)
+
+    def __repr__(self) -> str:
+        # sem loja (CSV sem a coluna) o texto é o mesmo de antes do campo existir
+        loja = "" if self.loja is None else f", loja={self.loja!r}"
+        return f"ProdutoDesejado(nome_base={self.nome_base!r}, demanda_kg={self.demanda_kg!r}{loja})"
 from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class OfertaFornecedor:
     fornecedor: str
     nome_pdf: str
@@ -0,0 +1,340 @@
+# src/historico.py
+"""
+Histórico local de preços (SQLite, só biblioteca padrão): cada tabela de
+fornecedor ingerida entra uma vez, com a data da tabela, e nunca é alterada.
+
+Uso (de dentro de project/):
+    python -m src.main --historico                         # grava a rodada no histórico
+    python -m src.historico registrar                      # idem, sem calcular compras
+    python -m src.historico tendencia chia --desde 2025-07-01 --ate 2025-09-30
+    python -m src.historico melhor "castanha do pará"
+    python -m src.historico fornecedor fornecedor3 --desde 2025-10-01
+
+- tabelas: uma linha por (fornecedor, sha256 do PDF); o mesmo PDF ingerido de
+  novo não duplica nada (append-only e idempotente)
+- precos: uma linha por oferta, com fornecedor, data da tabela e a chave do
+  produto (nome limpo como no match: _clean_for_match)
+- índices (chave, data) e (fornecedor, data): consultas por produto ou por
+  fornecedor num intervalo de datas leem só a faixa do índice
+- termos: palavra -> chave; "chia" acha "semente de chia 1kg" sem varrer
+  a tabela de preços
+- data da tabela: 1ª data dd/mm/aaaa da 1ª página do PDF ("TABELA DIA
+  01/04/2025", "Atualizado em: 27/10/2025"...); sem data, a do arquivo
+"""
+import datetime as dt
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .domain import OfertaFornecedor
+from .io import _sha256_file, extract_first_page
+from .services import _clean_for_match, _queries_limpas
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tabelas (
+    id           INTEGER PRIMARY KEY,
+    fornecedor   TEXT NOT NULL,
+    data_tabela  TEXT NOT NULL,          -- aaaa-mm-dd
+    sha256       TEXT NOT NULL,
+    layout       TEXT,
+    registrada_em TEXT NOT NULL,
+    UNIQUE (fornecedor, sha256)
+);
+CREATE TABLE IF NOT EXISTS precos (
+    tabela       INTEGER NOT NULL REFERENCES tabelas (id),
+    fornecedor   TEXT NOT NULL,
+    data_tabela  TEXT NOT NULL,
+    chave        TEXT NOT NULL,
+    nome_pdf     TEXT NOT NULL,
+    embalagem_kg REAL,
+    preco_por_kg REAL,
+    tipo_preco   TEXT
+);
+CREATE INDEX IF NOT EXISTS precos_chave_data ON precos (chave, data_tabela);
+CREATE INDEX IF NOT EXISTS precos_fornecedor_data ON precos (fornecedor, data_tabela);
+CREATE TABLE IF NOT EXISTS termos (
+    termo TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    PRIMARY KEY (termo, chave)
+) WITHOUT ROWID;
+"""
+
+_COLUNAS_PRECO = ["fornecedor", "data_tabela", "nome_pdf", "embalagem_kg", "preco_por_kg", "tipo_preco"]
+
+_RE_DATA = re.compile(r"\b(\d{2})/(\d{2})/(\d{4})\b")
+
+
+def data_da_tabela(pdf_path: str | Path) -> str:
+    """Data (aaaa-mm-dd) da tabela: 1ª data da 1ª página; sem data, a do arquivo."""
+    pdf_path = Path(pdf_path)
+    for d, m, a in _RE_DATA.findall(extract_first_page(pdf_path)):
+        try:
+            return dt.date(int(a), int(m), int(d)).isoformat()
+        except ValueError:
+            continue  # "31/02/2025", código com barras etc.
+    return dt.date.fromtimestamp(pdf_path.stat().st_mtime).isoformat()
+
+
+def _iso(data) -> Optional[str]:
+    """None, date/datetime ou texto aaaa-mm-dd -> aaaa-mm-dd."""
+    if data is None:
+        return None
+    if isinstance(data, dt.datetime):
+        return data.date().isoformat()
+    if isinstance(data, dt.date):
+        return data.isoformat()
+    try:
+        return dt.date.fromisoformat(str(data)).isoformat()
+    except ValueError:
+        raise ValueError(f"Data inválida (use aaaa-mm-dd): {data!r}") from None
+
+
+def _faixa(coluna: str, desde, ate) -> tuple[str, list]:
+    """Trecho de WHERE para o intervalo de datas (inclusivo nas duas pontas)."""
+    sql, args = "", []
+    if desde is not None:
+        sql += f" AND {coluna} >= ?"
+        args.append(_iso(desde))
+    if ate is not None:
+        sql += f" AND {coluna} <= ?"
+        args.append(_iso(ate))
+    return sql, args
+
+
+class HistoricoPrecos:
+    """
+    Uso:
+        with HistoricoPrecos(base_dir / "data" / "historico_precos.sqlite") as h:
+            h.registrar_pasta(folder, ofertas, tempos)
+            h.tendencia("chia", desde="2025-07-01", ate="2025-09-30")
+            h.melhor_preco("chia")
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(self.path)
+        self._con.row_factory = sqlite3.Row
+        self._con.executescript(_ESQUEMA)
+        # nome_pdf -> chave: as tabelas novas de um fornecedor repetem quase todos os nomes
+        self._chave_do_nome: dict[str, str] = {}
+
+    def fechar(self) -> None:
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    # ---------------------------------------------------------------- gravação
+
+    def tem_tabela(self, fornecedor: str, sha256: str) -> bool:
+        cur = self._con.execute(
+            "SELECT 1 FROM tabelas WHERE fornecedor = ? AND sha256 = ?", (fornecedor, sha256)
+        )
+        return cur.fetchone() is not None
+
+    def registrar(
+        self,
+        fornecedor: str,
+        data_tabela,
+        sha256: str,
+        ofertas: Iterable[OfertaFornecedor],
+        layout: Optional[str] = None,
+    ) -> int:
+        """
+        Grava a tabela e suas ofertas numa transação (executemany).
+        Tabela já registrada (mesmo fornecedor e sha256): não grava nada.
+        Retorna o nº de ofertas gravadas.
+        """
+        data_tabela = _iso(data_tabela)
+        with self._con:
+            cur = self._con.execute(
+                "INSERT OR IGNORE INTO tabelas (fornecedor, data_tabela, sha256, layout, registrada_em)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (fornecedor, data_tabela, sha256, layout, time.strftime("%Y-%m-%dT%H:%M:%S")),
+            )
+            if cur.rowcount == 0:
+                return 0
+            tabela = cur.lastrowid
+
+            linhas = []
+            chaves = set()
+            memo = self._chave_do_nome
+            for o in ofertas:
+                chave = memo.get(o.nome_pdf)
+                if chave is None:
+                    chave = memo[o.nome_pdf] = _clean_for_match(o.nome_pdf)
+                chaves.add(chave)
+                linhas.append((
+                    tabela, fornecedor, data_tabela, chave, o.nome_pdf,
+                    o.embalagem_kg, o.preco_por_kg, o.tipo_preco,
+                ))
+            self._con.executemany("INSERT INTO precos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+            self._con.executemany(
+                "INSERT OR IGNORE INTO termos VALUES (?, ?)",
+                {(t, c) for c in chaves for t in c.split()},
+            )
+        return len(linhas)
+
+    def registrar_pasta(self, folder: str | Path, ofertas: Iterable[OfertaFornecedor], tempos: dict[str, dict]) -> dict[str, int]:
+        """
+        Grava as ofertas de uma rodada (formato de ingest_fornecedores), um
+        registro por PDF de folder. Retorna {fornecedor: ofertas gravadas}
+        (0 = tabela já estava no histórico).
+        """
+        folder = Path(folder)
+        por_forn: dict[str, list] = defaultdict(list)
+        for o in ofertas:
+            por_forn[o.fornecedor].append(o)
+
+        gravadas = {}
+        for forn, t in tempos.items():
+            pdf_path = folder / f"{forn}.pdf"
+            sha = _sha256_file(pdf_path)
+            if self.tem_tabela(forn, sha):
+                # evita abrir o PDF só para ler a data de uma tabela já gravada
+                gravadas[forn] = 0
+                continue
+            gravadas[forn] = self.registrar(forn, data_da_tabela(pdf_path), sha, por_forn[forn], t.get("layout"))
+        return gravadas
+
+    # ---------------------------------------------------------------- consultas
+
+    def _chaves(self, produto: str) -> tuple[str, list]:
+        """
+        Subconsulta das chaves com todas as palavras de `produto` (ou de um
+        dos seus sinônimos, como no match).
+        """
+        partes, args = [], []
+        for q in dict.fromkeys(_queries_limpas(produto)):
+            termos = sorted(set(q.split()))
+            if not termos:
+                continue
+            partes.append(
+                f"SELECT chave FROM termos WHERE termo IN ({', '.join('?' * len(termos))})"
+                " GROUP BY chave HAVING COUNT(*) = ?"
+            )
+            args += termos + [len(termos)]
+        if not partes:
+            raise ValueError(f"Produto sem palavras para buscar: {produto!r}")
+        return " UNION ".join(partes), args
+
+    def tendencia(self, produto: str, desde=None, ate=None, fornecedor: Optional[str] = None) -> list[dict]:
+        """
+        Evolução do preço de `produto`: uma linha por (data da tabela,
+        fornecedor) com menor e média de preço_por_kg e nº de ofertas,
+        em ordem de data.
+        """
+        sub, args = self._chaves(produto)
+        faixa, args_faixa = _faixa("data_tabela", desde, ate)
+        sql = (
+            "SELECT data_tabela, fornecedor, MIN(preco_por_kg) AS menor_preco_kg,"
+            " ROUND(AVG(preco_por_kg), 2) AS preco_medio_kg, COUNT(*) AS ofertas"
+            f" FROM precos WHERE chave IN ({sub}) AND preco_por_kg IS NOT NULL{faixa}"
+        )
+        args += args_faixa
+        if fornecedor is not None:
+            sql += " AND fornecedor = ?"
+            args.append(fornecedor)
+        sql += " GROUP BY data_tabela, fornecedor ORDER BY data_tabela, fornecedor"
+        return [dict(r) for r in self._con.execute(sql, args)]
+
+    def melhor_preco(self, produto: str, desde=None, ate=None) -> Optional[dict]:
+        """Oferta de menor preço_por_kg de `produto` no intervalo (None se não houver)."""
+        sub, args = self._chaves(produto)
+        faixa, args_faixa = _faixa("data_tabela", desde, ate)
+        cur = self._con.execute(
+            f"SELECT {', '.join(_COLUNAS_PRECO)} FROM precos"
+            f" WHERE chave IN ({sub}) AND preco_por_kg IS NOT NULL{faixa}"
+            " ORDER BY preco_por_kg, data_tabela DESC LIMIT 1",
+            args + args_faixa,
+        )
+        r = cur.fetchone()
+        return None if r is None else dict(r)
+
+    def ofertas_do_fornecedor(self, fornecedor: str, desde=None, ate=None) -> list[dict]:
+        """Ofertas de `fornecedor` nas tabelas do intervalo, por data e nome."""
+        faixa, args = _faixa("data_tabela", desde, ate)
+        cur = self._con.execute(
+            f"SELECT {', '.join(_COLUNAS_PRECO)} FROM precos"
+            f" WHERE fornecedor = ?{faixa} ORDER BY data_tabela, nome_pdf",
+            [fornecedor] + args,
+        )
+        return [dict(r) for r in cur]
+
+    def tabelas(self) -> list[dict]:
+        """Tabelas registradas (fornecedor, data, sha256, layout, quando), por data."""
+        cur = self._con.execute(
+            "SELECT fornecedor, data_tabela, sha256, layout, registrada_em,"
+            " (SELECT COUNT(*) FROM precos WHERE precos.fornecedor = tabelas.fornecedor"
+            "  AND precos.data_tabela = tabelas.data_tabela AND precos.tabela = tabelas.id) AS ofertas"
+            " FROM tabelas ORDER BY data_tabela, fornecedor"
+        )
+        return [dict(r) for r in cur]
+
+
+def _imprimir(linhas: list[dict]) -> None:
+    if not linhas:
+        print("(nada no histórico)")
+        return
+    colunas = list(linhas[0])
+    print(" | ".join(colunas))
+    for r in linhas:
+        print(" | ".join("" if r[c] is None else str(r[c]) for c in colunas))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    base_dir = Path(__file__).resolve().parents[1]
+
+    ap = argparse.ArgumentParser(description="Histórico local de preços dos fornecedores.")
+    ap.add_argument("--banco", default=str(base_dir / "data" / "historico_precos.sqlite"),
+                    help="arquivo SQLite do histórico")
+    sub = ap.add_subparsers(dest="comando", required=True)
+
+    periodo = argparse.ArgumentParser(add_help=False)
+    periodo.add_argument("--desde", default=None, help="data inicial (aaaa-mm-dd)")
+    periodo.add_argument("--ate", default=None, help="data final (aaaa-mm-dd)")
+
+    p = sub.add_parser("registrar", help="ingere os PDFs de data/fornecedores e grava as tabelas novas")
+    p.add_argument("--workers", type=int, default=None,
+                   help="processos para extrair os PDFs (padrão: nº de CPUs; 1 = sequencial)")
+    p.add_argument("--detectar", action="store_true",
+                   help="escolhe o layout de todo PDF pela 1ª página (ignora o nome do arquivo)")
+    sub.add_parser("tendencia", parents=[periodo], help="preço por data e fornecedor").add_argument("produto")
+    sub.add_parser("melhor", parents=[periodo], help="menor preço do período").add_argument("produto")
+    sub.add_parser("fornecedor", parents=[periodo], help="ofertas de um fornecedor no período").add_argument("fornecedor")
+    sub.add_parser("tabelas", help="tabelas registradas")
+    args = ap.parse_args()
+
+    with HistoricoPrecos(args.banco) as h:
+        t0 = time.perf_counter()
+        if args.comando == "registrar":
+            from .ingest import ingest_fornecedores
+
+            folder = base_dir / "data" / "fornecedores"
+            ofertas, tempos = ingest_fornecedores(folder, workers=args.workers, detectar=args.detectar)
+            t0 = time.perf_counter()
+            for forn, n in h.registrar_pasta(folder, ofertas, tempos).items():
+                print(f"[{forn}] {n} ofertas gravadas" if n else f"[{forn}] tabela já registrada")
+        else:
+            try:
+                if args.comando == "tendencia":
+                    _imprimir(h.tendencia(args.produto, args.desde, args.ate))
+                elif args.comando == "melhor":
+                    r = h.melhor_preco(args.produto, args.desde, args.ate)
+                    _imprimir([] if r is None else [r])
+                elif args.comando == "fornecedor":
+                    _imprimir(h.ofertas_do_fornecedor(args.fornecedor, args.desde, args.ate))
+                else:
+                    _imprimir(h.tabelas())
+            except ValueError as e:
+                ap.error(str(e))
+        print(f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
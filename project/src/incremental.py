@@ -0,0 +1,193 @@
+# src/incremental.py
+"""
+Rodada incremental: só reprocessa o fornecedor cujo PDF mudou.
+
+Estado salvo em data/fornecedores/.cache/incremental.json:
+- por fornecedor: chave do PDF (sha256 + versões do extrator/parser + layout) e as ofertas
+- por fornecedor e produto: os top_n candidatos (posição da oferta, score),
+  refeitos se top_n, min_score ou MATCHER_VERSION mudarem
+
+Por que dá o mesmo resultado da rodada completa: a ordem do match é
+(-score, posição global) e, dentro de um fornecedor, a ordem relativa é a mesma.
+Então os top_n globais estão sempre na união dos top_n de cada fornecedor;
+basta juntar essas listas, cortar em top_n e escolher o menor custo.
+"""
+import heapq
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .domain import OfertaFornecedor, ProdutoDesejado
+from .ingest import chaves_pdfs, ingest_fornecedores
+from .io import MIN_PAGINAS_SHARD
+from .services import MATCHER_VERSION, OfferIndex, match_ofertas_por_nome, melhor_entre_candidatos
+
+# mude quando o formato do estado mudar (parser mudou: PARSER_VERSION)
+VERSAO_ESTADO = "1"
+
+
+def _oferta_para_lista(o: OfertaFornecedor) -> list:
+    return [o.nome_pdf, o.embalagem_kg, o.preco_por_kg, o.tipo_preco, o.linha_origem]
+
+
+def _lista_para_oferta(fornecedor: str, x: list) -> OfertaFornecedor:
+    return OfertaFornecedor(
+        fornecedor=fornecedor,
+        nome_pdf=x[0],
+        embalagem_kg=x[1],
+        preco_por_kg=x[2],
+        tipo_preco=x[3],
+        linha_origem=x[4],
+    )
+
+
+class IngestaoIncremental:
+    """
+    Uso:
+        inc = IngestaoIncremental(folder / ".cache" / "incremental.json")
+        ofertas, tempos = inc.ingest(folder)
+        bests = inc.melhores(produtos)
+        inc.salvar()
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.estado = self._carregar()
+        self.ofertas_por_forn: dict[str, list[OfertaFornecedor]] = {}
+        self.alterados: set[str] = set()
+
+    def _carregar(self) -> dict:
+        vazio = {"versao": VERSAO_ESTADO, "fornecedores": {}, "match": {}}
+        if not self.path.exists():
+            return vazio
+        try:
+            estado = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError:
+            return vazio
+        if estado.get("versao") != VERSAO_ESTADO:
+            return vazio
+        return estado
+
+    def salvar(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.estado, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def ingest(
+        self,
+        folder: str | Path,
+        workers: Optional[int] = None,
+        detectar: bool = False,
+        min_paginas_shard: int = MIN_PAGINAS_SHARD,
+    ) -> tuple[list[OfertaFornecedor], dict[str, dict]]:
+        """
+        Como ingest_fornecedores, mas só extrai/parseia os PDFs novos ou alterados;
+        os outros vêm do estado salvo. Fornecedor sem PDF sai do estado.
+        """
+        folder = Path(folder)
+        fornecedores = sorted(p.stem for p in folder.glob("*.pdf"))
+        salvos = self.estado["fornecedores"]
+
+        chaves = chaves_pdfs(folder, fornecedores, detectar=detectar)
+
+        self.alterados = {f for f in fornecedores if f not in salvos or salvos[f]["chave"] != chaves[f]}
+
+        novos, tempos = {}, {}
+        if self.alterados:
+            ofertas_novas, tempos = ingest_fornecedores(
+                folder, fornecedores=sorted(self.alterados), workers=workers, detectar=detectar,
+                min_paginas_shard=min_paginas_shard,
+            )
+            for o in ofertas_novas:
+                novos.setdefault(o.fornecedor, []).append(o)
+
+        for forn in list(salvos):
+            if forn not in chaves:
+                del salvos[forn]
+                self.estado["match"].pop(forn, None)
+
+        ofertas: list[OfertaFornecedor] = []
+        self.ofertas_por_forn = {}
+        for forn in fornecedores:
+            if forn in self.alterados:
+                lista = novos.get(forn, [])
+                salvos[forn] = {"chave": chaves[forn], "ofertas": [_oferta_para_lista(o) for o in lista]}
+                self.estado["match"].pop(forn, None)  # candidatos velhos não valem mais
+            else:
+                lista = [_lista_para_oferta(forn, x) for x in salvos[forn]["ofertas"]]
+                tempos[forn] = {"layout": chaves[forn]["layout"], "ofertas": len(lista), "tempo_s": 0.0, "reuso": True}
+            self.ofertas_por_forn[forn] = lista
+            ofertas += lista
+
+        tempos = {forn: tempos[forn] for forn in fornecedores}
+        return ofertas, tempos
+
+    def melhores(
+        self,
+        produtos: list[ProdutoDesejado],
+        top_n: Optional[int] = 20,
+        min_score: float = 0.52,
+        cache=None,
+    ) -> list[Optional[dict]]:
+        """
+        melhor_compra_para_produto de cada produto, recalculando o match só
+        para fornecedores alterados (ou produtos novos).
+        """
+        candidatos = self.candidatos(produtos, top_n=top_n, min_score=min_score, cache=cache)
+        return [melhor_entre_candidatos(p, c) for p, c in zip(produtos, candidatos)]
+
+    def podar(self, nomes: set[str]) -> None:
+        """Esquece os candidatos salvos de produtos fora de `nomes`."""
+        for salvo in self.estado["match"].values():
+            salvo["produtos"] = {n: c for n, c in salvo["produtos"].items() if n in nomes}
+
+    def candidatos(
+        self,
+        produtos: list[ProdutoDesejado],
+        top_n: Optional[int] = 20,
+        min_score: float = 0.52,
+        cache=None,
+        podar: bool = True,
+    ) -> list[list[tuple[OfertaFornecedor, float]]]:
+        """
+        match_ofertas_por_nome de cada produto sobre todas as ofertas (top_n=None: todas).
+        podar=True esquece os produtos que não estão em `produtos`; lendo a lista
+        em lotes, passe podar=False e chame podar(nomes) no fim.
+        """
+        # candidatos salvos dependem também da versão do match (limpeza, sinônimos)
+        params = [top_n, min_score, MATCHER_VERSION]
+        match = self.estado["match"]
+        nomes = list(dict.fromkeys(p.nome_base for p in produtos))
+        atuais = set(nomes)
+
+        for forn, lista in self.ofertas_por_forn.items():
+            salvo = match.get(forn)
+            if salvo is None or salvo.get("params") != params:
+                salvo = match[forn] = {"params": params, "produtos": {}}
+
+            # só guarda os produtos da lista atual (o estado não cresce sem limite)
+            if podar:
+                salvo["produtos"] = {n: c for n, c in salvo["produtos"].items() if n in atuais}
+            faltando = [n for n in nomes if n not in salvo["produtos"]]
+            if not faltando:
+                continue
+
+            index = OfferIndex(lista)
+            pos = {id(o): i for i, o in enumerate(lista)}
+            for nome in faltando:
+                cands = match_ofertas_por_nome(nome, index, top_n=top_n, min_score=min_score, cache=cache)
+                salvo["produtos"][nome] = [[pos[id(o)], s] for o, s in cands]
+
+        # ordem global = ordem dos fornecedores + posição dentro do fornecedor
+        ordem = list(self.ofertas_por_forn)
+        resultado = []
+        for p in produtos:
+            juntos = []
+            for k, forn in enumerate(ordem):
+                for i, s in match[forn]["produtos"][p.nome_base]:
+                    juntos.append((-s, k, i))
+            top = sorted(juntos) if top_n is None else heapq.nsmallest(top_n, juntos)
+            resultado.append([(self.ofertas_por_forn[ordem[k]][i], -s) for s, k, i in top])
+        return resultado
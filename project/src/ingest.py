@@ -0,0 +1,275 @@
+# src/ingest.py
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .domain import OfertaFornecedor
+from .io import (
+    EXTRACTOR_VERSION,
+    MIN_PAGINAS_SHARD,
+    PerfilExtracao,
+    _cache_lookup,
+    _sha256_file,
+    contar_paginas,
+    extract_first_page,
+    extrair_paginas,
+    faixas_de_paginas,
+    gravar_cache_texto,
+    iter_pdf_lines,
+    normalize_name,
+)
+from .services import LAYOUTS, PARSER_VERSION, LayoutFornecedor, detectar_layout
+from .store import OfertaStore
+
+
+def layout_para_pdf(pdf_path: str | Path, detectar: bool = False) -> LayoutFornecedor:
+    """
+    Escolhe o layout (parser) do PDF:
+    - arquivo com nome registrado (ex: fornecedor1.pdf) usa o layout desse nome
+    - senão (ou detectar=True) identifica pela 1ª página, sem extrair o resto
+    """
+    pdf_path = Path(pdf_path)
+    if not detectar and pdf_path.stem in LAYOUTS:
+        return LAYOUTS[pdf_path.stem]
+
+    layout = detectar_layout(extract_first_page(pdf_path))
+    if layout is None:
+        raise ValueError(f"Layout de fornecedor não reconhecido: {pdf_path.name}")
+    return layout
+
+
+def iter_ofertas_pdf(
+    pdf_path: str | Path,
+    fornecedor: str,
+    layout: Optional[LayoutFornecedor] = None,
+    contadores: Optional[Counter] = None,
+) -> Iterator[OfertaFornecedor]:
+    """
+    Pipeline em streaming: páginas -> linhas -> linhas juntadas -> ofertas.
+    Nenhuma etapa monta o documento inteiro na memória.
+    `contadores` recebe as ofertas e os descartes do parser (por motivo).
+    """
+    if layout is None:
+        layout = layout_para_pdf(pdf_path)
+    ofertas = layout.parser(iter_pdf_lines(pdf_path, perfil=layout.extracao), fornecedor, contadores=contadores)
+    return sem_duplicadas(ofertas, contadores)
+
+
+def sem_duplicadas(
+    ofertas: Iterable[OfertaFornecedor],
+    contadores: Optional[Counter] = None,
+) -> Iterator[OfertaFornecedor]:
+    """
+    Tira as cópias da mesma oferta: mesmo fornecedor, nome normalizado,
+    embalagem e preço por kg (item repetido em outra página, em outra seção
+    de tipo_preco ou em linhas quebradas que dão a mesma linha).
+    Como o preço faz parte da chave, as cópias custam o mesmo: fica a 1ª na
+    ordem do PDF, a mesma que o custo escolheria no empate.
+    `contadores["duplicadas"]` soma as descartadas.
+    """
+    vistas = set()
+    for o in ofertas:
+        chave = (o.fornecedor, normalize_name(o.nome_pdf), o.embalagem_kg, o.preco_por_kg)
+        if chave in vistas:
+            if contadores is not None:
+                contadores["duplicadas"] += 1
+            continue
+        vistas.add(chave)
+        yield o
+
+
+def _cronometrar(linhas: Iterable[str], medida: dict) -> Iterator[str]:
+    """
+    Repassa as linhas somando em medida["extracao_s"] o tempo gasto para
+    produzi-las (extração) e em medida["linhas"] quantas foram.
+    Como o pipeline é em streaming, o resto do tempo é do parser.
+    """
+    it = iter(linhas)
+    gasto, n = 0.0, 0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                ln = next(it)
+            except StopIteration:
+                gasto += time.perf_counter() - t0
+                return
+            gasto += time.perf_counter() - t0
+            n += 1
+            yield ln
+    finally:
+        medida["extracao_s"] = gasto
+        medida["linhas"] = n
+
+
+def chaves_pdfs(folder: str | Path, fornecedores: list[str], detectar: bool = False) -> dict[str, dict]:
+    """
+    Chave de cada PDF para reaproveitar ofertas já parseadas: se qualquer
+    campo mudar (conteúdo, extrator, perfil de extração, parser ou layout), reparseia.
+    """
+    folder = Path(folder)
+    chaves = {}
+    for forn in fornecedores:
+        pdf_path = folder / f"{forn}.pdf"
+        layout = layout_para_pdf(pdf_path, detectar=detectar)
+        perfil = layout.extracao
+        chaves[forn] = {
+            "sha256": _sha256_file(pdf_path),
+            "extrator": EXTRACTOR_VERSION,
+            "perfil": None if perfil is None else [perfil.nome, perfil.versao],
+            "parser": PARSER_VERSION,
+            "layout": layout.nome,
+        }
+    return chaves
+
+
+def _ingest_one(pdf_path: str, fornecedor: str, detectar: bool = False) -> tuple[str, OfertaStore, dict]:
+    """
+    Extrai + parseia um PDF (roda dentro do worker).
+    Retorna (fornecedor, ofertas, tempos). As ofertas voltam em colunas
+    (OfertaStore): menos memória e menos bytes para serializar entre processos.
+    Os tempos separam extração e parse e trazem os descartes do parser e
+    as duplicadas tiradas (sem_duplicadas).
+    """
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    layout = layout_para_pdf(pdf_path, detectar=detectar)
+
+    medida: dict = {}
+    contadores: Counter = Counter()
+    linhas = _cronometrar(iter_pdf_lines(pdf_path, perfil=layout.extracao), medida)
+    ofertas = OfertaStore(sem_duplicadas(layout.parser(linhas, fornecedor, contadores=contadores), contadores))
+    t1 = time.perf_counter()
+
+    parsed = contadores.pop("parsed", 0)
+    duplicadas = contadores.pop("duplicadas", 0)
+    stats = {
+        "layout": layout.nome,
+        "ofertas": len(ofertas),
+        "tempo_s": round(t1 - t0, 3),
+        "cpu_s": round(time.process_time() - c0, 3),
+        "extracao_s": round(medida["extracao_s"], 3),
+        "parse_s": round(t1 - t0 - medida["extracao_s"], 3),
+        "linhas": medida["linhas"],
+        "parsed": parsed,
+        "duplicadas": duplicadas,
+        "descartes": dict(sorted(contadores.items())),
+    }
+    return fornecedor, ofertas, stats
+
+
+def _planejar_faixas(
+    jobs: list[tuple[int, str, str]],
+    workers: int,
+    min_paginas: int,
+    detectar: bool = False,
+) -> dict[str, tuple[dict, list[tuple[int, int]], Optional[PerfilExtracao]]]:
+    """
+    PDFs que vão ser extraídos em faixas de páginas: sem cache de texto
+    válido e com pelo menos `min_paginas` páginas.
+    Retorna {fornecedor: (chave do cache a gravar, faixas [ini, fim), perfil de extração)}.
+
+    Só a extração é dividida: o texto das faixas é remontado na ordem das
+    páginas antes do parse, então itens quebrados entre o fim de uma página
+    e o começo da seguinte são juntados por _merge_wrapped_lines como antes.
+    """
+    planos = {}
+    for _, path, forn in jobs:
+        perfil = layout_para_pdf(path, detectar=detectar).extracao
+        key = _cache_lookup(Path(path), perfil)
+        if key is None:
+            continue
+        n_paginas = contar_paginas(path)
+        if n_paginas >= min_paginas:
+            planos[forn] = (key, faixas_de_paginas(n_paginas, workers), perfil)
+    return planos
+
+
+def ingest_fornecedores(
+    folder: str | Path,
+    fornecedores: Optional[list[str]] = None,
+    workers: Optional[int] = None,
+    detectar: bool = False,
+    min_paginas_shard: int = MIN_PAGINAS_SHARD,
+) -> tuple[OfertaStore, dict[str, dict]]:
+    """
+    Extrai e parseia os PDFs dos fornecedores em paralelo (ProcessPoolExecutor).
+    - fornecedores=None pega todos os .pdf da pasta (o nome do arquivo é o fornecedor)
+    - o layout vem do nome registrado ou da 1ª página (ver layout_para_pdf)
+    - os maiores arquivos são enviados primeiro
+    - PDF sem cache de texto com >= min_paginas_shard páginas: a extração é
+      dividida em faixas de páginas no mesmo pool (ver _planejar_faixas)
+    - o resultado é juntado sempre na ordem de `fornecedores` (determinístico)
+    - workers=None usa os.cpu_count(); workers=1 roda tudo no processo atual
+    Retorna (ofertas, tempos por fornecedor).
+    """
+    folder = Path(folder)
+    if fornecedores is None:
+        fornecedores = sorted(p.stem for p in folder.glob("*.pdf"))
+
+    jobs = []
+    for forn in fornecedores:
+        pdf_path = folder / f"{forn}.pdf"
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
+        jobs.append((pdf_path.stat().st_size, str(pdf_path), forn))
+
+    # maiores primeiro: o PDF mais lento não fica para o final
+    jobs.sort(key=lambda j: j[0], reverse=True)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    planos = _planejar_faixas(jobs, workers, min_paginas_shard, detectar) if workers > 1 else {}
+    tarefas = len(jobs) + sum(len(faixas) - 1 for _, faixas, _ in planos.values())
+    workers = max(1, min(workers, tarefas))
+
+    results: dict[str, tuple[OfertaStore, dict]] = {}
+    if workers == 1:
+        for _, path, forn in jobs:
+            _, ofertas, stats = _ingest_one(path, forn, detectar)
+            results[forn] = (ofertas, stats)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            # faixas dos PDFs grandes primeiro (são os mais lentos), depois os PDFs inteiros
+            t0 = time.perf_counter()
+            partes = {}
+            for _, path, forn in jobs:
+                if forn in planos:
+                    _, faixas, perfil = planos[forn]
+                    partes[forn] = [ex.submit(extrair_paginas, path, ini, fim, perfil) for ini, fim in faixas]
+            futures = {
+                forn: ex.submit(_ingest_one, path, forn, detectar)
+                for _, path, forn in jobs if forn not in planos
+            }
+
+            # remonta o texto na ordem das páginas e grava o cache de texto;
+            # o parse (no pool) lê esse cache como numa extração sequencial
+            extras = {}
+            for _, path, forn in jobs:
+                if forn not in partes:
+                    continue
+                text = "\n".join(t for fut in partes[forn] for t in fut.result())
+                key, _, perfil = planos[forn]
+                gravar_cache_texto(path, key, text, perfil)
+                extras[forn] = (len(partes[forn]), time.perf_counter() - t0)
+                futures[forn] = ex.submit(_ingest_one, path, forn, detectar)
+
+            for forn, fut in futures.items():
+                _, ofertas, stats = fut.result()
+                if forn in extras:
+                    n, gasto = extras[forn]
+                    stats["faixas"] = n
+                    stats["extracao_s"] = round(stats["extracao_s"] + gasto, 3)
+                    stats["tempo_s"] = round(stats["tempo_s"] + gasto, 3)
+                results[forn] = (ofertas, stats)
+
+    ofertas = OfertaStore()
+    tempos: dict[str, dict] = {}
+    for forn in fornecedores:
+        ofertas += results[forn][0]
+        tempos[forn] = results[forn][1]
+
+    return ofertas, tempos
@@ -1,8 +1,14 @@
 # src/io.py
 import csv
+import hashlib
+import json
+import os
+import re
 import unicodedata
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from .domain import ProdutoDesejado
 
@@ -14,6 +20,9 @@ def normalize_name(text: str) -> str:
     - remove espaços duplicados
     """
     text = text.strip().lower()
+    if text.isascii():
+        # ASCII não tem acento: a NFKD não muda nada, só sobram os espaços
+        return " ".join(text.split())
     text = unicodedata.normalize("NFKD", text)
     text = "".join(ch for ch in text if not unicodedata.combining(ch))
     text = " ".join(text.split())
@@ -23,16 +32,12 @@ def normalize_name(text: str) -> str:
 
 def _normalize_name(text: str) -> str:
     """
-    Normaliza o nome para facilitar comparação:
+    Normaliza o nome para facilitar comparação (mesmo resultado de normalize_name):
     - lower
     - remove acentos
     - remove espaços duplicados
     """
-    text = text.strip().lower()
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join(ch for ch in text if not unicodedata.combining(ch))
-    text = " ".join(text.split())
-    return text
+    return normalize_name(text)
 
 
 def _to_kg(value: float, unit: str) -> float:
@@ -44,10 +49,29 @@ def _to_kg(value: float, unit: str) -> float:
     raise ValueError(f"Unidade não suportada: '{unit}'. Use 'kg' ou 'g'.")
 
 
-def read_products_csv(path: str | Path, delimiter: Optional[str] = None) -> List[ProdutoDesejado]:
+# o delimitador é detectado só por este começo do arquivo
+_AMOSTRA_DELIMITADOR = 2048
+
+
+def _detectar_delimitador(path: Path) -> str:
+    """Entre ',' e ';', o que mais aparece no começo do arquivo (lê só o prefixo)."""
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        sample = f.read(_AMOSTRA_DELIMITADOR)
+    return ";" if sample.count(";") > sample.count(",") else ","
+
+
+# coluna opcional com a loja/filial de cada linha (demanda de várias lojas)
+_COLUNAS_LOJA = ("loja", "filial")
+
+
+def _coluna_loja(fieldnames) -> Optional[str]:
+    return next((h for h in fieldnames or [] if h.strip().lower() in _COLUNAS_LOJA), None)
+
+
+def iter_products_csv(path: str | Path, delimiter: Optional[str] = None) -> Iterator[ProdutoDesejado]:
     """
-    Lê um CSV com colunas: produto, demanda, unidade
-    Retorna lista de ProdutoDesejado com demanda em kg.
+    Lê um CSV com colunas: produto, demanda, unidade (e, opcional, loja ou filial)
+    Gera ProdutoDesejado (demanda em kg) linha a linha, sem carregar o arquivo.
 
     Observação: alguns Excels salvam CSV com ';'. Se der erro, passe delimiter=';'
     """
@@ -58,11 +82,12 @@ def read_products_csv(path: str | Path, delimiter: Optional[str] = None) -> List
 
     # Se não informarem delimiter, tenta detectar entre ',' e ';'
     if delimiter is None:
-        sample = path.read_text(encoding="utf-8", errors="ignore")[:2048]
-        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        delimiter = _detectar_delimitador(path)
 
-    produtos: List[ProdutoDesejado] = []
+    return _iter_products(path, delimiter)
 
+
+def _iter_products(path: Path, delimiter: str) -> Iterator[ProdutoDesejado]:
     with path.open("r", encoding="utf-8-sig", newline="") as f:
         reader = csv.DictReader(f, delimiter=delimiter)
         required = {"produto", "demanda", "unidade"}
@@ -73,6 +98,7 @@ def read_products_csv(path: str | Path, delimiter: Optional[str] = None) -> List
                 f"CSV precisa ter colunas {sorted(required)}. "
                 f"Colunas encontradas: {sorted(header)}"
             )
+        col_loja = _coluna_loja(reader.fieldnames)
 
         for i, row in enumerate(reader, start=2):  # linha 1 é header
             produto_raw = (row.get("produto") or row.get("Produto") or "").strip()
@@ -86,6 +112,12 @@ def read_products_csv(path: str | Path, delimiter: Optional[str] = None) -> List
             if not unidade_raw:
                 raise ValueError(f"Linha {i}: campo 'unidade' vazio.")
 
+            loja = None
+            if col_loja is not None:
+                loja = (row.get(col_loja) or "").strip()
+                if not loja:
+                    raise ValueError(f"Linha {i}: campo '{col_loja.strip()}' vazio.")
+
             # troca vírgula decimal por ponto (ex: "1,5")
             demanda_raw = demanda_raw.replace(",", ".")
             try:
@@ -97,29 +129,370 @@ def read_products_csv(path: str | Path, delimiter: Optional[str] = None) -> List
                 raise ValueError(f"Linha {i}: demanda deve ser > 0. Recebido: {demanda}")
 
             demanda_kg = _to_kg(demanda, unidade_raw)
-            produtos.append(
-                ProdutoDesejado(
-                    nome_base=_normalize_name(produto_raw),
-                    demanda_kg=demanda_kg
-                )
+            yield ProdutoDesejado(
+                nome_base=_normalize_name(produto_raw),
+                demanda_kg=demanda_kg,
+                loja=loja,
             )
 
-    return produtos
 
-from pathlib import Path
+def tem_coluna_loja(path: str | Path, delimiter: Optional[str] = None) -> bool:
+    """O CSV de produtos tem coluna loja/filial? (lê só o cabeçalho)"""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+    if delimiter is None:
+        delimiter = _detectar_delimitador(path)
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        return _coluna_loja(next(csv.reader(f, delimiter=delimiter), [])) is not None
+
+
+def em_lotes(itens, tamanho: int) -> Iterator[list]:
+    """Qualquer iterável em listas de até `tamanho` itens."""
+    if tamanho <= 0:
+        raise ValueError(f"Tamanho de lote inválido: {tamanho}")
+    it = iter(itens)
+    while True:
+        lote = list(islice(it, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def iter_products_chunks(
+    path: str | Path,
+    tamanho: int = 5000,
+    delimiter: Optional[str] = None,
+) -> Iterator[List[ProdutoDesejado]]:
+    """Os produtos do CSV em lotes de até `tamanho` (memória limitada a um lote)."""
+    yield from em_lotes(iter_products_csv(path, delimiter), tamanho)
+
+
+def read_products_csv(path: str | Path, delimiter: Optional[str] = None) -> List[ProdutoDesejado]:
+    """
+    Lê um CSV com colunas: produto, demanda, unidade
+    Retorna lista de ProdutoDesejado com demanda em kg.
+    (Para arquivos grandes, use iter_products_csv / iter_products_chunks.)
+    """
+    return list(iter_products_csv(path, delimiter))
+
+# mude quando a extração mudar (invalida o cache de texto dos PDFs)
+EXTRACTOR_VERSION = "1"
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_atomic(path: Path, data: str) -> None:
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(data, encoding="utf-8", newline="")
+    os.replace(tmp, path)
+
+
+def _cache_paths(pdf_path: Path, perfil: Optional["PerfilExtracao"] = None) -> tuple[Path, Path]:
+    """
+    Cache do texto extraído, em .cache/ ao lado do PDF (fora do controle de versão):
+    - texto: .cache/<nome>.txt (com perfil: .cache/<nome>.<perfil>.txt)
+    - chave: o .json de mesmo nome, com o sha256 do PDF + versão do extrator
+    Uma entrada por perfil: trocar de layout (--detectar) não sobrescreve a outra.
+    O fornecedorN.txt ao lado do PDF não é cache: é o texto de página inteira
+    usado como exemplo pelos testes, sem chave de quem o gerou (e os layouts
+    extraem com perfil, que recorta a página). Gravar o cache nele o
+    sobrescreveria com o texto recortado.
+    """
+    base = pdf_path.stem if perfil is None else f"{pdf_path.stem}.{perfil.nome}"
+    pasta = pdf_path.parent / ".cache"
+    return pasta / f"{base}.txt", pasta / f"{base}.json"
+
+
+@dataclass(frozen=True)
+class PerfilExtracao:
+    """
+    Onde fica a tabela de preços nas páginas de um fornecedor. A página vira
+    linhas (com bbox) numa passada só do pdfplumber e é recortada na faixa da
+    tabela, do fim do cabeçalho ao começo do rodapé:
+    - inicio: linha que fecha o cabeçalho da tabela (ela e o que vem acima saem);
+      página sem ela começa no topo
+    - fim: 1ª linha do rodapé (ela e o que vem abaixo saem); sem ela vai até o fim
+    - linha: linha de item com preço; página sem nenhuma (depois do recorte) é pulada
+    - versao: mude quando o perfil mudar (invalida o cache de texto)
+    """
+    nome: str
+    inicio: Optional[re.Pattern] = None
+    fim: Optional[re.Pattern] = None
+    linha: Optional[re.Pattern] = None
+    versao: str = "1"
 
-def extract_text_from_pdf(pdf_path: str | Path) -> str:
+    def recortar(self, linhas: list[dict]) -> str:
+        """Texto da faixa da tabela ("" se a página não tem tabela)."""
+        textos = [ln["text"] for ln in linhas]
+
+        ini = 0
+        if self.inicio is not None:
+            ini = next((i + 1 for i, t in enumerate(textos) if self.inicio.search(t)), 0)
+        fim = len(textos)
+        if self.fim is not None:
+            fim = next((i for i in range(ini, fim) if self.fim.search(textos[i])), fim)
+
+        textos = textos[ini:fim]
+        if self.linha is not None and not any(self.linha.search(t) for t in textos):
+            return ""
+        return "\n".join(textos)
+
+
+def _texto_pagina(page, perfil: Optional[PerfilExtracao] = None) -> str:
+    # extract_text_lines dá o mesmo texto de extract_text, linha a linha
+    if perfil is None:
+        text = page.extract_text() or ""
+    else:
+        text = perfil.recortar(page.extract_text_lines())
+    page.close()  # flush do cache de layout/objetos da página
+    return text
+
+
+def iter_pdf_pages(pdf_path: str | Path, perfil: Optional[PerfilExtracao] = None) -> Iterator[str]:
+    """
+    Gera o texto de cada página (sem cache), liberando o cache do
+    pdfplumber de cada página assim que ela é lida.
+    Com `perfil`, só a faixa da tabela; páginas sem tabela são puladas.
+    """
     import pdfplumber
 
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text = _texto_pagina(page, perfil)
+            if text.strip():
+                yield text
+
+
+def iter_pdf_lines(
+    pdf_path: str | Path,
+    use_cache: bool = True,
+    perfil: Optional[PerfilExtracao] = None,
+) -> Iterator[str]:
+    """
+    Gera as linhas do texto do PDF, sem montar o documento inteiro na memória.
+    - cache válido: lê o .txt do cache linha a linha
+    - senão: extrai página a página e grava o cache enquanto gera
+    O perfil de extração entra na chave do cache.
+    """
     pdf_path = Path(pdf_path)
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
 
-    chunks: list[str] = []
+    if not use_cache:
+        for page in iter_pdf_pages(pdf_path, perfil):
+            yield from page.splitlines()
+        return
+
+    txt_path, meta_path = _cache_paths(pdf_path, perfil)
+    key = _cache_lookup(pdf_path, perfil)
+    if key is None:
+        with txt_path.open("r", encoding="utf-8") as f:
+            for raw in f:
+                yield from raw.splitlines()
+        return
+
+    meta_path.parent.mkdir(exist_ok=True)
+    tmp = txt_path.with_name(txt_path.name + f".{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8", newline="") as out:
+            for i, page in enumerate(iter_pdf_pages(pdf_path, perfil)):
+                if i:
+                    out.write("\n")
+                out.write(page)
+                yield from page.splitlines()
+    except BaseException:
+        # consumidor parou no meio (ou erro): não deixa cache pela metade
+        tmp.unlink(missing_ok=True)
+        raise
+
+    # só grava a chave depois do documento inteiro (gerador consumido até o fim)
+    os.replace(tmp, txt_path)
+    _write_atomic(meta_path, json.dumps(key))
+
+
+def _cache_key(pdf_path: Path, perfil: Optional[PerfilExtracao] = None) -> dict:
+    key = {"sha256": _sha256_file(pdf_path), "versao": EXTRACTOR_VERSION}
+    if perfil is not None:
+        key["perfil"] = [perfil.nome, perfil.versao]
+    return key
+
+
+def _cache_valido(pdf_path: Path, key: dict, perfil: Optional[PerfilExtracao] = None) -> bool:
+    txt_path, meta_path = _cache_paths(pdf_path, perfil)
+    if not (meta_path.exists() and txt_path.exists()):
+        return False
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8")) == key
+    except ValueError:
+        return False
+
+
+def _cache_lookup(pdf_path: Path, perfil: Optional[PerfilExtracao] = None) -> Optional[dict]:
+    """
+    Retorna None se o .txt em cache vale para este PDF (e perfil).
+    Senão descarta a entrada velha e retorna a chave nova a ser gravada.
+    """
+    key = _cache_key(pdf_path, perfil)
+    if _cache_valido(pdf_path, key, perfil):
+        return None
+
+    _, meta_path = _cache_paths(pdf_path, perfil)
+    # entrada velha (PDF mudou ou extrator mudou): descarta antes de extrair
+    meta_path.unlink(missing_ok=True)
+    return key
+
+
+# PDFs com pelo menos esta quantidade de páginas são extraídos em faixas
+# paralelas (um processo por faixa); abaixo disso abrir o PDF em cada
+# processo custa mais do que ganha
+MIN_PAGINAS_SHARD = 40
+
+
+def contar_paginas(pdf_path: str | Path) -> int:
+    import pdfplumber
+
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text() or ""
+        return len(pdf.pages)
+
+
+def faixas_de_paginas(n_paginas: int, partes: int) -> list[tuple[int, int]]:
+    """Divide [0, n_paginas) em até `partes` faixas contíguas [ini, fim) de tamanho parecido."""
+    partes = max(1, min(partes, n_paginas))
+    base, resto = divmod(n_paginas, partes)
+    faixas, ini = [], 0
+    for k in range(partes):
+        fim = ini + base + (k < resto)
+        faixas.append((ini, fim))
+        ini = fim
+    return faixas
+
+
+def extrair_paginas(
+    pdf_path: str | Path,
+    ini: int,
+    fim: int,
+    perfil: Optional[PerfilExtracao] = None,
+) -> list[str]:
+    """
+    Texto das páginas [ini, fim) (as vazias ficam de fora, como em
+    iter_pdf_pages). Roda dentro de um worker: cada faixa abre o PDF.
+    """
+    import pdfplumber
+
+    textos = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[ini:fim]:
+            text = _texto_pagina(page, perfil)
             if text.strip():
-                chunks.append(text)
+                textos.append(text)
+    return textos
 
-    return "\n".join(chunks)
\ No newline at end of file
+
+def gravar_cache_texto(
+    pdf_path: str | Path,
+    key: dict,
+    text: str,
+    perfil: Optional[PerfilExtracao] = None,
+) -> None:
+    """Grava o .txt e a chave do cache (a chave por último: .txt sem chave não vale)."""
+    txt_path, meta_path = _cache_paths(Path(pdf_path), perfil)
+    meta_path.parent.mkdir(exist_ok=True)
+    _write_atomic(txt_path, text)
+    _write_atomic(meta_path, json.dumps(key))
+
+
+def _texto_em_faixas(
+    pdf_path: Path,
+    workers: int,
+    min_paginas: int,
+    perfil: Optional[PerfilExtracao] = None,
+) -> Optional[str]:
+    """
+    Texto do PDF extraído em faixas de páginas num ProcessPoolExecutor e
+    remontado na ordem das páginas. None se o PDF tem menos de `min_paginas`.
+
+    Só a extração é paralela: o texto remontado é idêntico ao sequencial, então
+    o parser (e _merge_wrapped_lines) vê as mesmas linhas, inclusive os itens
+    quebrados entre o fim de uma página e o começo da seguinte.
+    """
+    n_paginas = contar_paginas(pdf_path)
+    if workers <= 1 or n_paginas < min_paginas:
+        return None
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    faixas = faixas_de_paginas(n_paginas, workers)
+    with ProcessPoolExecutor(max_workers=len(faixas)) as ex:
+        n = len(faixas)
+        partes = ex.map(extrair_paginas, [pdf_path] * n, *zip(*faixas), [perfil] * n)
+        return "\n".join(t for textos in partes for t in textos)
+
+
+# no cache (.txt) não há quebra de página: usa um prefixo do tamanho de uma página
+_PRIMEIRA_PAGINA_CHARS = 4096
+
+
+def extract_first_page(pdf_path: str | Path) -> str:
+    """
+    Texto só da 1ª página (para identificar o layout do fornecedor).
+    Com cache válido lê o começo do .txt, sem abrir o PDF (só o cache sem
+    perfil serve: o recorte tira o cabeçalho onde ficam as assinaturas).
+    """
+    pdf_path = Path(pdf_path)
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
+
+    if _cache_valido(pdf_path, _cache_key(pdf_path)):
+        txt_path, _ = _cache_paths(pdf_path)
+        with txt_path.open("r", encoding="utf-8") as f:
+            return f.read(_PRIMEIRA_PAGINA_CHARS)
+
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        if not pdf.pages:
+            return ""
+        page = pdf.pages[0]
+        text = page.extract_text() or ""
+        page.close()
+    return text
+
+
+def extract_text_from_pdf(
+    pdf_path: str | Path,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    min_paginas: int = MIN_PAGINAS_SHARD,
+    perfil: Optional[PerfilExtracao] = None,
+) -> str:
+    """
+    Texto do PDF inteiro (páginas separadas por quebra de linha).
+    Com workers > 1 e pelo menos `min_paginas` páginas, extrai em faixas de
+    páginas em paralelo (mesmo texto da extração sequencial).
+    Com `perfil`, só a faixa da tabela de cada página.
+    """
+    pdf_path = Path(pdf_path)
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"PDF não encontrado: {pdf_path}")
+
+    if use_cache:
+        txt_path, _ = _cache_paths(pdf_path, perfil)
+        key = _cache_lookup(pdf_path, perfil)
+        if key is None:
+            return txt_path.read_text(encoding="utf-8")
+
+    text = _texto_em_faixas(pdf_path, workers or 1, min_paginas, perfil)
+    if text is None:
+        text = "\n".join(iter_pdf_pages(pdf_path, perfil))
+
+    if use_cache:
+        gravar_cache_texto(pdf_path, key, text, perfil)
+
+    return text
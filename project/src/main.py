@@ -1,95 +1,374 @@
-from pathlib import Path
 import csv
 from collections import Counter
-from .services import melhor_compra_para_produto
-from .io import read_products_csv
-from .services import melhor_compra_para_produto
-from .services import match_ofertas_por_nome
+from contextlib import nullcontext
+from itertools import count
+from pathlib import Path
 
+from .ingest import ingest_fornecedores
+from .io import MIN_PAGINAS_SHARD, em_lotes, iter_products_chunks, iter_products_csv, tem_coluna_loja
+from .relatorio import RelatorioExecucao
+from .services import OfferIndex, match_ofertas_por_nome, melhor_compra_para_produto, melhor_entre_candidatos
 
 
-from .io import extract_text_from_pdf
-from .services import (
-    parse_fornecedor1,
-    parse_fornecedor2,
-    parse_fornecedor3,
-    parse_fornecedor4,
-)
+def _casar(rel, produtos, index, top_n, cache=None):
+    """Candidatos de cada produto (etapa "match", medida produto a produto)."""
+    for p in produtos:
+        with rel.etapa("match") as e:
+            candidatos = match_ofertas_por_nome(p.nome_base, index, top_n=top_n, min_score=0.52, cache=cache)
+            e["itens"] += 1
+        yield candidatos
 
-def main():
-    base_dir = Path(__file__).resolve().parents[1]
-    folder = base_dir / "data" / "fornecedores"
 
-    # extrai texto dos PDFs
-    t1 = extract_text_from_pdf(folder / "fornecedor1.pdf")
-    print("DEBUG fornecedor1: chars =", len(t1))
-    print("DEBUG fornecedor1: primeiras 300 chars:\n", t1[:300])
+def _escolher(rel, produtos, candidatos, alternativas=0, vetorizado=False):
+    """
+    Ranking de custo dos candidatos de cada produto (etapa "custo"):
+    gera [melhor, alternativas...] por produto ([] = não encontrado).
+    vetorizado=True custeia todos os candidatos numa passada NumPy.
+    """
+    if vetorizado:
+        from .custo import ranking_compras
 
-    t2 = extract_text_from_pdf(folder / "fornecedor2.pdf")
-    t3 = extract_text_from_pdf(folder / "fornecedor3.pdf")
-    t4 = extract_text_from_pdf(folder / "fornecedor4.pdf")
+    for p, cands in zip(produtos, candidatos):
+        with rel.etapa("custo") as e:
+            if vetorizado:
+                linhas = ranking_compras(p, cands, 1 + alternativas)
+            else:
+                best = melhor_entre_candidatos(p, cands)
+                linhas = [] if best is None else [best]
+            e["itens"] += len(cands)
+        yield linhas
 
-    # parseia ofertas
-    ofertas = []
-    ofertas += parse_fornecedor1(t1, "fornecedor1")
-    ofertas += parse_fornecedor2(t2, "fornecedor2")
-    ofertas += parse_fornecedor3(t3, "fornecedor3")
-    ofertas += parse_fornecedor4(t4, "fornecedor4")
 
-    #---------------------------------------------------
-    # ---- Lê produtos desejados ----
-    produtos_path = base_dir / "data" / "produtos.csv"
-    produtos = read_products_csv(produtos_path)
+def main(
+    workers: int | None = None,
+    matcher: str = "sequence",
+    detectar: bool = False,
+    incremental: bool = False,
+    snapshot: bool = False,
+    quiet: bool = False,
+    relatorio: str | Path | None = None,
+    top_n: int | None = 20,
+    alternativas: int = 0,
+    cache_scores: bool = False,
+    lote: int = 5000,
+    min_paginas_shard: int = MIN_PAGINAS_SHARD,
+    historico: bool = False,
+    workers_match: int | None = 1,
+    folder: str | Path | None = None,
+):
+    """
+    Rodada completa: ingere os PDFs de `folder` (padrão: data/fornecedores),
+    casa data/produtos.csv e grava os CSVs de saída em `folder`.
+    """
+    if workers_match != 1 and (matcher == "tfidf" or incremental or cache_scores):
+        # tfidf já casa o lote inteiro em NumPy; incremental e cache_scores gravam estado da rodada
+        raise ValueError("workers_match só vale com matcher='sequence', sem incremental nem cache_scores.")
 
-    print("\nProdutos desejados:", len(produtos))
-    for p in produtos:
-        print("-", p)
+    base_dir = Path(__file__).resolve().parents[1]
+    folder = base_dir / "data" / "fornecedores" if folder is None else Path(folder)
+    rel = RelatorioExecucao()
+
+    # extrai texto dos PDFs e parseia ofertas (um processo por PDF)
+    with rel.etapa("ingest") as etapa:
+        ofertas, tempos, modo = _ingerir(folder, workers, detectar, incremental, snapshot, min_paginas_shard)
+        etapa["itens"] = len(ofertas)
+    rel.dados["fornecedores"] = tempos
+
+    for forn, t in tempos.items():
+        duplicadas = f" duplicadas={t['duplicadas']}" if t.get("duplicadas") else ""
+        print(f"[{forn}] layout={t['layout']} ofertas={t['ofertas']}{duplicadas} tempo={t['tempo_s']}s")
+        if not quiet and t.get("descartes"):
+            print("   descartes:", t["descartes"])
+
+    if historico:
+        # tabelas novas entram no histórico de preços (PDF já gravado é pulado)
+        from .historico import HistoricoPrecos
+
+        with rel.etapa("historico") as etapa, HistoricoPrecos(base_dir / "data" / "historico_precos.sqlite") as h:
+            gravadas = h.registrar_pasta(folder, ofertas, tempos)
+            etapa["itens"] += sum(gravadas.values())
+        novas = [forn for forn, n in gravadas.items() if n]
+        print("Histórico de preços:", f"{sum(gravadas.values())} ofertas de {', '.join(novas)}" if novas else "nenhuma tabela nova")
 
     # ---- Calcula melhor compra por produto ----
-    recomendadas = []
-    nao_encontrados = []
+    # top_n=None (todos os candidatos) ou alternativas: custo em NumPy.
+    # Todos os candidatos não é o padrão de propósito: o custo escolhe o mais
+    # barato sem olhar o score, e com todos acima de 0.52 um casamento fraco e
+    # mais barato ganha do certo (ex.: "farinha de trigo"). top_n=20 mantém só
+    # os 20 mais parecidos, como a rodada original.
+    vetorizado = top_n is None or alternativas > 0
 
-    for p in produtos:
-        best = melhor_compra_para_produto(p, ofertas, top_n=20, min_score=0.52)
+    cache = None
+    if cache_scores and matcher != "tfidf":
+        # scores de pares (consulta, nome) já vistos em rodadas anteriores
+        from .cache_scores import CacheScores
+
+        cache = CacheScores(folder / ".cache" / "scores.json")
 
-        if best is None:
-            nao_encontrados.append(p.nome_base)
+    if matcher == "tfidf":
+        # cada lote de produtos contra todas as ofertas de uma vez (NumPy)
+        from .tfidf import TfidfMatcher
 
-            print("\n[NAO ENCONTRADO]", p.nome_base)
-            candidatos = match_ofertas_por_nome(p.nome_base, ofertas, top_n=8, min_score=0.0)
-            for o, s in candidatos:
-                print("   cand:", round(s, 3), "|", o.fornecedor, "|", o.nome_pdf[:90])
+        with rel.etapa("indice") as etapa:
+            index = TfidfMatcher(ofertas)
+            etapa["itens"] = len(index.nomes)
+    elif incremental:
+        # só recalcula o match dos fornecedores alterados
+        index = ofertas
+    else:
+        # monta uma vez, consulta por produto
+        with rel.etapa("indice") as etapa:
+            index = modo.index if snapshot else OfferIndex(ofertas)
+            etapa["itens"] = len(index.nomes)
 
-        else:
-            recomendadas.append(best)
-            print("\n[OK]", p.nome_base, "->", best["fornecedor"], "| score:", best["match_score"])
+    def candidatos_do_lote(produtos):
+        if matcher == "tfidf":
+            with rel.etapa("match") as etapa:
+                candidatos = index.match_lote([p.nome_base for p in produtos], top_n=top_n)
+                etapa["itens"] += len(produtos)
+            return candidatos
+        if incremental:
+            with rel.etapa("match") as etapa:
+                candidatos = modo.candidatos(produtos, top_n=top_n, min_score=0.52, cache=cache, podar=False)
+                etapa["itens"] += len(produtos)
+            return candidatos
+        return _casar(rel, produtos, index, top_n, cache)
 
-    # ---- Salva CSV final ----
-        
+    # ---- Lê produtos desejados em lotes; cada lote já sai no CSV final ----
+    produtos_path = base_dir / "data" / "produtos.csv"
     out_final = folder / "compras_recomendadas.csv"
-    with out_final.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            "produto", "demanda_kg", "fornecedor", "nome_pdf", "match_score",
-            "embalagem_kg", "preco_por_kg", "pacotes", "qtd_comprada_kg",
-            "custo_total", "tipo_preco"
-        ])
+    out_alt = folder / "compras_alternativas.csv"
+    out_lojas = folder / "compras_por_loja.csv"
 
-        for r in recomendadas:
-            w.writerow([
-                r["produto"], r["demanda_kg"], r["fornecedor"], r["nome_pdf"], r["match_score"],
-                r["embalagem_kg"], r["preco_por_kg"], r["pacotes"], r["qtd_comprada_kg"],
-                r["custo_total"], r["tipo_preco"]
-             ])
+    por_loja = tem_coluna_loja(produtos_path)
+    if por_loja:
+        # várias lojas: um match/custo por produto com a demanda somada;
+        # a compra de cada produto é rateada entre as lojas no fim
+        from .demanda import agregar, gravar_rateio
+
+        with rel.etapa("produtos") as etapa:
+            agregados, n_linhas, n_lojas = agregar(iter_products_csv(produtos_path))
+            etapa["itens"] += n_linhas
+        print(f"\nDemanda de {n_lojas} lojas: {n_linhas} linhas, {len(agregados)} produtos distintos")
+        lotes = em_lotes(agregados, lote)
+    else:
+        lotes = iter_products_chunks(produtos_path, tamanho=lote)
+
+    if workers_match == 1:
+        paralelo = nullcontext()
+    else:
+        # match + custo de cada lote repartido entre processos (catálogo herdado, não copiado)
+        from .paralelo import MatchParalelo
+
+        paralelo = MatchParalelo(
+            index, processos=workers_match, top_n=top_n, alternativas=alternativas, vetorizado=vetorizado,
+            snapshot=folder / ".cache" / "catalogo.snap" if snapshot else None,
+        )
+
+    n_produtos = n_recomendadas = n_nao_encontrados = 0
+    vistos: set[str] = set()
+    compras: dict[str, dict] = {}  # nome_base -> compra consolidada (só com lojas)
+
+    with _SaidaCompras(out_final, out_alt if alternativas else None) as saida, paralelo as pool:
+        for k_lote in count(1):
+            with rel.etapa("produtos") as etapa:
+                produtos = next(lotes, None)
+                etapa["itens"] += len(produtos or ())
+            if produtos is None:
+                break
+            n_produtos += len(produtos)
+            if incremental:
+                vistos.update(p.nome_base for p in produtos)
+
+            print("\nProdutos desejados:" if k_lote == 1 else f"\nProdutos desejados (lote {k_lote}):", len(produtos))
+            if not quiet:
+                for p in produtos:
+                    print("-", p)
+
+            if pool is not None:
+                with rel.etapa("match") as etapa:
+                    rankings = pool.rankings(produtos)
+                    etapa["itens"] += len(produtos)
+            else:
+                rankings = _escolher(rel, produtos, candidatos_do_lote(produtos), alternativas, vetorizado)
+            recomendadas = []
+            outras = []
+
+            for p, linhas in zip(produtos, rankings):
+                if not linhas:
+                    n_nao_encontrados += 1
+                    if quiet:
+                        continue
+
+                    print("\n[NAO ENCONTRADO]", p.nome_base)
+                    if matcher == "tfidf":
+                        candidatos = index.match_lote([p.nome_base], top_n=8, min_score=0.0)[0]
+                    else:
+                        candidatos = match_ofertas_por_nome(p.nome_base, index, top_n=8, min_score=0.0)
+                    for o, s in candidatos:
+                        print("   cand:", round(s, 3), "|", o.fornecedor, "|", o.nome_pdf[:90])
+
+                else:
+                    best = linhas[0]
+                    recomendadas.append(best)
+                    if por_loja:
+                        compras[p.nome_base] = best
+                    outras += [(k, r) for k, r in enumerate(linhas[1:], start=2)]
+                    if not quiet:
+                        print("\n[OK]", p.nome_base, "->", best["fornecedor"], "| score:", best["match_score"])
+
+            # ---- Salva o lote no CSV final ----
+            with rel.etapa("csv") as etapa:
+                saida.escrever(recomendadas, outras)
+                etapa["itens"] += len(recomendadas) + len(outras)
+            n_recomendadas += len(recomendadas)
+
+    if por_loja:
+        with rel.etapa("csv") as etapa:
+            etapa["itens"] += gravar_rateio(out_lojas, iter_products_csv(produtos_path), compras)
+
+    if incremental:
+        modo.podar(vistos)
+        modo.salvar()
+
+    rel.dados["resultado"] = {
+        "produtos": n_produtos,
+        "recomendados": n_recomendadas,
+        "nao_encontrados": n_nao_encontrados,
+    }
+    if por_loja:
+        rel.dados["resultado"].update({"linhas_demanda": n_linhas, "lojas": n_lojas})
+    if cache is not None:
+        cache.salvar()
+        rel.dados["cache_scores"] = cache.estatisticas()
+        print("\nCache de scores:", cache.estatisticas())
 
     print("\nCSV final gerado:", out_final)
+    if alternativas:
+        print("CSV de alternativas gerado:", out_alt)
+    if por_loja:
+        print("CSV por loja gerado:", out_lojas)
+    if quiet:
+        print("Não encontrados:", n_nao_encontrados)
 
+    with rel.etapa("csv") as etapa:
+        out_csv = _salvar_ofertas(folder, ofertas)
+        etapa["itens"] += len(ofertas)
     
     #---------------------------------------------------
     # prints "bonitos"
     print("Total de ofertas extraídas:", len(ofertas))
     print("Ofertas por fornecedor:", Counter([o.fornecedor for o in ofertas]))
 
+    if not quiet:
+        _amostra(ofertas)
+
+    print("\nCSV gerado:", out_csv)
+
+    if relatorio:
+        rel.dados["config"] = {
+            "matcher": matcher,
+            "workers": workers,
+            "detectar": detectar,
+            "modo": "incremental" if incremental else "snapshot" if snapshot else "completo",
+            "quiet": quiet,
+            "top_n": top_n,
+            "alternativas": alternativas,
+            "cache_scores": cache_scores,
+            "lote": lote,
+            "min_paginas_shard": min_paginas_shard,
+            "historico": historico,
+            "workers_match": workers_match,
+        }
+        rel.salvar(relatorio)
+        print("Relatório gerado:", relatorio)
+
+
+def _ingerir(folder, workers, detectar, incremental, snapshot, min_paginas_shard=MIN_PAGINAS_SHARD):
+    """
+    (ofertas, tempos por fornecedor, objeto do modo): o objeto é o
+    IngestaoIncremental, o Snapshot ou None na rodada completa.
+    """
+    if incremental:
+        # só os PDFs alterados; o resto vem do estado da última rodada
+        from .incremental import IngestaoIncremental
+
+        inc = IngestaoIncremental(folder / ".cache" / "incremental.json")
+        ofertas, tempos = inc.ingest(folder, workers=workers, detectar=detectar, min_paginas_shard=min_paginas_shard)
+        return ofertas, tempos, inc
+    if snapshot:
+        # ofertas + índice direto do snapshot (mmap); regrava se os PDFs mudaram
+        from .snapshot import abrir_ou_gerar
+
+        snap, tempos = abrir_ou_gerar(
+            folder / ".cache" / "catalogo.snap", folder,
+            workers=workers, detectar=detectar, min_paginas_shard=min_paginas_shard,
+        )
+        return snap.ofertas, tempos, snap
+    ofertas, tempos = ingest_fornecedores(folder, workers=workers, detectar=detectar, min_paginas_shard=min_paginas_shard)
+    return ofertas, tempos, None
+
+
+_COLUNAS_COMPRA = [
+    "fornecedor", "nome_pdf", "match_score",
+    "embalagem_kg", "preco_por_kg", "pacotes", "qtd_comprada_kg",
+    "custo_total", "tipo_preco"
+]
+
+
+class _SaidaCompras:
+    """
+    compras_recomendadas.csv (e compras_alternativas.csv, se pedido) abertos
+    durante a rodada: cada lote é escrito e descarregado assim que termina.
+    """
+
+    def __init__(self, out_final, out_alt=None):
+        self.out_final = out_final
+        self.out_alt = out_alt
+        self._arquivos = []
+
+    def __enter__(self):
+        f = self.out_final.open("w", newline="", encoding="utf-8")
+        self._arquivos.append(f)
+        self._w = csv.writer(f)
+        self._w.writerow(["produto", "demanda_kg"] + _COLUNAS_COMPRA)
+
+        self._w_alt = None
+        if self.out_alt is not None:
+            f = self.out_alt.open("w", newline="", encoding="utf-8")
+            self._arquivos.append(f)
+            self._w_alt = csv.writer(f)
+            self._w_alt.writerow(["produto", "posicao"] + _COLUNAS_COMPRA)
+        return self
+
+    def escrever(self, recomendadas, outras=()):
+        for r in recomendadas:
+            self._w.writerow([r["produto"], r["demanda_kg"]] + [r[c] for c in _COLUNAS_COMPRA])
+        if self._w_alt is not None:
+            # 2ª, 3ª... opções de custo de cada produto
+            for k, r in outras:
+                self._w_alt.writerow([r["produto"], k] + [r[c] for c in _COLUNAS_COMPRA])
+        for f in self._arquivos:
+            f.flush()
+
+    def __exit__(self, *exc):
+        for f in self._arquivos:
+            f.close()
+
+
+def _salvar_ofertas(folder, ofertas):
+    # salva CSV
+    out_csv = folder / "ofertas_extraidas.csv"
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["fornecedor", "nome_pdf", "embalagem_kg", "preco_por_kg", "tipo_preco"])
+        for o in ofertas:
+            w.writerow([o.fornecedor, o.nome_pdf, o.embalagem_kg, o.preco_por_kg, o.tipo_preco])
+
+    return out_csv
+
+
+def _amostra(ofertas):
     from collections import defaultdict
 
     print("\nAmostra (2 por fornecedor):")
@@ -103,15 +382,59 @@ def main():
         for o in por_forn[forn]:
             print(f"- {o.fornecedor:11} | {o.embalagem_kg:>6} kg | {o.preco_por_kg:>8} R$/kg | {o.nome_pdf[:70]}")
 
-    # salva CSV
-    out_csv = folder / "ofertas_extraidas.csv"
-    with out_csv.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["fornecedor", "nome_pdf", "embalagem_kg", "preco_por_kg", "tipo_preco"])
-        for o in ofertas:
-            w.writerow([o.fornecedor, o.nome_pdf, o.embalagem_kg, o.preco_por_kg, o.tipo_preco])
-
-    print("\nCSV gerado:", out_csv)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Compara preços dos fornecedores.")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="processos para extrair os PDFs (padrão: nº de CPUs; 1 = sequencial)")
+    ap.add_argument("--workers-match", type=int, default=1,
+                    help="processos para o match/custo dos produtos (0 = nº de CPUs; 1 = sequencial)")
+    ap.add_argument("--matcher", choices=["sequence", "tfidf"], default="sequence",
+                    help="sequence = SequenceMatcher por produto; tfidf = trigramas TF-IDF em lote")
+    modo = ap.add_mutually_exclusive_group()
+    modo.add_argument("--incremental", action="store_true",
+                      help="reprocessa só os PDFs alterados desde a última rodada incremental")
+    modo.add_argument("--snapshot", action="store_true",
+                      help="carrega ofertas e índice do snapshot binário (regrava se os PDFs mudaram)")
+    ap.add_argument("--paginas-shard", type=int, default=MIN_PAGINAS_SHARD,
+                    help="PDF com pelo menos N páginas (sem cache de texto) é extraído em faixas paralelas")
+    ap.add_argument("--detectar", action="store_true",
+                    help="escolhe o layout de todo PDF pela 1ª página (ignora o nome do arquivo)")
+    ap.add_argument("--top-n", type=int, default=20,
+                    help="candidatos do match que entram no custo (padrão: os 20 de maior score; "
+                         "0 = todos acima do score mínimo 0.52, custeados em NumPy; o mais barato "
+                         "ganha mesmo com score baixo, então pode trocar o produto certo por um parecido)")
+    ap.add_argument("--alternativas", type=int, default=0,
+                    help="grava também as N próximas opções de custo (entre os --top-n candidatos) "
+                         "em compras_alternativas.csv")
+    ap.add_argument("--cache-scores", action="store_true",
+                    help="reaproveita scores de similaridade de rodadas anteriores (.cache/scores.json)")
+    ap.add_argument("--lote", type=int, default=5000,
+                    help="produtos lidos/casados por vez; cada lote já é gravado no CSV final")
+    ap.add_argument("--historico", action="store_true",
+                    help="grava as tabelas novas no histórico de preços (data/historico_precos.sqlite)")
+    ap.add_argument("-q", "--quiet", action="store_true",
+                    help="não imprime produto a produto (só os totais)")
+    ap.add_argument("--relatorio", default=None,
+                    help="grava o relatório da rodada (tempo/CPU/itens/RSS por etapa) neste JSON")
+    args = ap.parse_args()
+
+    main(
+        workers=args.workers,
+        matcher=args.matcher,
+        detectar=args.detectar,
+        incremental=args.incremental,
+        snapshot=args.snapshot,
+        quiet=args.quiet,
+        relatorio=args.relatorio,
+        top_n=args.top_n or None,
+        alternativas=args.alternativas,
+        cache_scores=args.cache_scores,
+        lote=args.lote,
+        min_paginas_shard=args.paginas_shard,
+        historico=args.historico,
+        workers_match=args.workers_match or None,
+    )
+
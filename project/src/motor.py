@@ -0,0 +1,158 @@
+# src/motor.py
+"""
+Motor de cotação em processo: ingere as ofertas uma vez e responde
+"melhor compra de X kg de Y" sem reextrair PDFs nem gravar arquivos.
+
+Uso:
+    motor = MotorCotacao(folder)
+    motor.cotar("chia", 35)                     # dict de melhor_entre_candidatos ou None
+    motor.cotar_lote([("chia", 35), ("aveia", 500, "g")])
+    motor.recarregar()                          # troca o catálogo inteiro de uma vez
+
+O catálogo (ofertas + OfferIndex) é imutável depois de montado. recarregar()
+monta o novo ao lado e só então troca a referência: consultas em andamento
+terminam no catálogo antigo, as seguintes já pegam o novo.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .domain import ProdutoDesejado
+from .ingest import ingest_fornecedores
+from .io import _to_kg, normalize_name
+from .services import OfferIndex, match_ofertas_por_nome, melhor_entre_candidatos
+from .store import OfertaStore
+
+
+@dataclass(frozen=True)
+class Catalogo:
+    versao: int                     # 1, 2, ... a cada recarga
+    ofertas: OfertaStore
+    index: OfferIndex
+    tempos: dict[str, dict]         # por fornecedor, como ingest_fornecedores
+    carregado_em: float             # time.time()
+
+
+class MotorCotacao:
+    """
+    Catálogo "quente" para consultas avulsas ou em lote (seguro entre threads:
+    cada consulta usa um único catálogo do começo ao fim).
+    """
+
+    def __init__(
+        self,
+        folder: str | Path,
+        workers: Optional[int] = None,
+        detectar: bool = False,
+        snapshot: bool = False,
+        top_n: Optional[int] = 20,
+        min_score: float = 0.52,
+    ):
+        self.folder = Path(folder)
+        self.workers = workers
+        self.detectar = detectar
+        self.snapshot = snapshot
+        self.top_n = top_n
+        self.min_score = min_score
+        self._recarga = threading.Lock()
+        self._catalogo = self._montar(1)
+
+    def _montar(self, versao: int) -> Catalogo:
+        if self.snapshot:
+            # ofertas + índice do snapshot (mmap); regrava se os PDFs mudaram
+            from .snapshot import abrir_ou_gerar
+
+            snap, tempos = abrir_ou_gerar(
+                self.folder / ".cache" / "catalogo.snap", self.folder,
+                workers=self.workers, detectar=self.detectar,
+            )
+            ofertas, index = snap.ofertas, snap.index
+        else:
+            ofertas, tempos = ingest_fornecedores(self.folder, workers=self.workers, detectar=self.detectar)
+            index = OfferIndex(ofertas)
+        return Catalogo(versao, ofertas, index, tempos, time.time())
+
+    @property
+    def catalogo(self) -> Catalogo:
+        return self._catalogo
+
+    def recarregar(self) -> Catalogo:
+        """
+        Reingere os PDFs e troca o catálogo atomicamente. Recargas simultâneas
+        rodam uma de cada vez; se a ingestão falhar, o catálogo atual continua.
+        """
+        with self._recarga:
+            novo = self._montar(self._catalogo.versao + 1)
+            self._catalogo = novo
+        return novo
+
+    def estado(self) -> dict:
+        cat = self._catalogo
+        return {
+            "versao": cat.versao,
+            "ofertas": len(cat.ofertas),
+            "nomes": len(cat.index.nomes),
+            "carregado_em": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(cat.carregado_em)),
+            "fornecedores": {forn: t["ofertas"] for forn, t in cat.tempos.items()},
+        }
+
+    def _cotar(self, cat: Catalogo, produto: str, demanda: float, unidade: str = "kg", alternativas: int = 0) -> dict:
+        # entrada pode vir de JSON: valida os tipos antes de usar
+        if not isinstance(produto, str):
+            raise ValueError(f"Campo 'produto' deve ser texto. Recebido: {produto!r}")
+        if not produto.strip():
+            raise ValueError("Campo 'produto' vazio.")
+        if not isinstance(unidade, str):
+            raise ValueError(f"Campo 'unidade' deve ser texto ('kg' ou 'g'). Recebido: {unidade!r}")
+        if isinstance(demanda, bool) or not isinstance(demanda, (int, float, str)):
+            raise ValueError(f"Campo 'demanda' deve ser um número. Recebido: {demanda!r}")
+        try:
+            demanda = float(demanda)
+        except ValueError:
+            raise ValueError(f"Campo 'demanda' deve ser um número. Recebido: {demanda!r}") from None
+        if not math.isfinite(demanda) or demanda <= 0:
+            raise ValueError(f"Demanda deve ser um número finito > 0. Recebido: {demanda}")
+
+        p = ProdutoDesejado(nome_base=normalize_name(produto), demanda_kg=_to_kg(demanda, unidade))
+        candidatos = match_ofertas_por_nome(p.nome_base, cat.index, top_n=self.top_n, min_score=self.min_score)
+
+        if alternativas > 0:
+            from .custo import ranking_compras
+
+            linhas = ranking_compras(p, candidatos, 1 + alternativas)
+        else:
+            best = melhor_entre_candidatos(p, candidatos)
+            linhas = [] if best is None else [best]
+
+        return {
+            "produto": p.nome_base,
+            "demanda_kg": p.demanda_kg,
+            "melhor": linhas[0] if linhas else None,
+            "alternativas": linhas[1:],
+        }
+
+    def cotar(
+        self,
+        produto: str,
+        demanda: float,
+        unidade: str = "kg",
+        alternativas: int = 0,
+    ) -> Optional[dict]:
+        """Melhor compra (formato de melhor_entre_candidatos) ou None se não achou."""
+        return self._cotar(self._catalogo, produto, demanda, unidade, alternativas)["melhor"]
+
+    def cotar_lote(
+        self,
+        itens: Iterable[tuple],
+        alternativas: int = 0,
+    ) -> tuple[int, list[dict]]:
+        """
+        itens: (produto, demanda) ou (produto, demanda, unidade).
+        Retorna (versão do catálogo usado, resultados na ordem dos itens);
+        o lote inteiro é respondido pelo mesmo catálogo.
+        """
+        cat = self._catalogo
+        return cat.versao, [self._cotar(cat, *item, alternativas=alternativas) for item in itens]
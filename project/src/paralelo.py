@@ -0,0 +1,120 @@
+# src/paralelo.py
+"""
+Match + custo dos produtos em vários processos (main(workers_match=N)).
+
+O catálogo (OfferIndex ou o índice do snapshot) não vai em cada tarefa:
+- com fork (Linux): fica numa global antes de abrir o pool e os workers o
+  herdam por copy-on-write; gc.freeze() evita que o coletor dos filhos
+  toque (e copie) as páginas dos objetos herdados
+- com --snapshot o índice já é o arquivo mapeado (mmap): as páginas são as
+  do cache do SO, divididas entre todos os processos
+- sem fork (spawn): cada worker recebe o catálogo uma vez no initializer
+  (ou reabre o snapshot pelo caminho)
+
+Cada tarefa leva só uma fatia de ProdutoDesejado e devolve os rankings;
+map() junta as fatias na ordem dos produtos, então o CSV final sai igual
+ao da rodada sequencial.
+"""
+import gc
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .domain import ProdutoDesejado
+from .services import match_ofertas_por_nome, melhor_entre_candidatos
+
+# fatias por processo em cada lote: fatias menores equilibram produtos
+# lentos (muitos candidatos) entre os workers
+FATIAS_POR_PROCESSO = 4
+
+# estado do worker: (índice, top_n, alternativas, vetorizado)
+_ESTADO: Optional[tuple] = None
+
+
+def _iniciar(index, snapshot: Optional[str], top_n, alternativas, vetorizado) -> None:
+    """initializer do pool sem fork: monta o estado do worker uma vez."""
+    global _ESTADO
+    if snapshot is not None:
+        from .snapshot import carregar_snapshot
+
+        index = carregar_snapshot(snapshot).index
+    _ESTADO = (index, top_n, alternativas, vetorizado)
+
+
+def _rankings(produtos: list[ProdutoDesejado]) -> list[list[dict]]:
+    """[melhor, alternativas...] de cada produto da fatia ([] = não encontrado)."""
+    index, top_n, alternativas, vetorizado = _ESTADO
+    if vetorizado:
+        from .custo import ranking_compras
+
+    saida = []
+    for p in produtos:
+        candidatos = match_ofertas_por_nome(p.nome_base, index, top_n=top_n, min_score=0.52)
+        if vetorizado:
+            saida.append(ranking_compras(p, candidatos, 1 + alternativas))
+        else:
+            best = melhor_entre_candidatos(p, candidatos)
+            saida.append([] if best is None else [best])
+    return saida
+
+
+class MatchParalelo:
+    """
+    Uso:
+        with MatchParalelo(index, processos=32, top_n=20) as mp:
+            for p, linhas in zip(produtos, mp.rankings(produtos)):
+                ...
+
+    snapshot: caminho do catalogo.snap de onde `index` veio (só usado sem
+    fork, para os workers reabrirem o arquivo em vez de receber o índice).
+    """
+
+    def __init__(
+        self,
+        index,
+        processos: Optional[int] = None,
+        top_n: Optional[int] = 20,
+        alternativas: int = 0,
+        vetorizado: bool = False,
+        snapshot: Optional[str | Path] = None,
+    ):
+        self.processos = processos or os.cpu_count() or 1
+        self._estado = (index, top_n, alternativas, vetorizado)
+        self._snapshot = None if snapshot is None else str(snapshot)
+        self._ex: Optional[ProcessPoolExecutor] = None
+        self._congelou = False
+
+    def __enter__(self):
+        global _ESTADO
+        if "fork" in mp.get_all_start_methods():
+            _ESTADO = self._estado
+            # só congela (e depois descongela) se ninguém congelou antes:
+            # gc.unfreeze() no fim soltaria objetos congelados por quem chamou
+            if gc.get_freeze_count() == 0:
+                gc.freeze()
+                self._congelou = True
+            self._ex = ProcessPoolExecutor(self.processos, mp_context=mp.get_context("fork"))
+        else:
+            index, *resto = self._estado
+            if self._snapshot is not None:
+                index = None
+            self._ex = ProcessPoolExecutor(
+                self.processos, initializer=_iniciar, initargs=(index, self._snapshot, *resto),
+            )
+        return self
+
+    def rankings(self, produtos: list[ProdutoDesejado]) -> list[list[dict]]:
+        """Rankings na ordem de `produtos` (como _escolher na rodada sequencial)."""
+        tam = max(1, -(-len(produtos) // (self.processos * FATIAS_POR_PROCESSO)))
+        fatias = [produtos[i:i + tam] for i in range(0, len(produtos), tam)]
+        return [linhas for parte in self._ex.map(_rankings, fatias) for linhas in parte]
+
+    def __exit__(self, *exc):
+        global _ESTADO
+        self._ex.shutdown()
+        _ESTADO = None
+        if self._congelou:
+            gc.unfreeze()
+            self._congelou = False
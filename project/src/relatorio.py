@@ -0,0 +1,111 @@
+# src/relatorio.py
+"""
+Instrumentação da rodada: tempo de relógio e de CPU, contagem de itens e
+memória (RSS) por etapa, gravados num relatório JSON.
+
+Uso:
+    rel = RelatorioExecucao()
+    with rel.etapa("match") as e:
+        ...
+        e["itens"] += 1
+    rel.dados["fornecedores"] = tempos   # qualquer dado extra
+    rel.salvar(path)
+
+Entrar de novo na mesma etapa acumula (dá para medir produto a produto).
+
+Memória: o SO só dá o pico de RSS da vida do processo (ru_maxrss), então
+cada etapa reporta
+- pico_rss_delta_mb: quanto a etapa subiu esse pico (0 = não passou do pico
+  das etapas anteriores; não é o pico da etapa sozinha)
+- pico_rss_acumulado_mb: o pico do processo ao fim da etapa (inclui tudo
+  que rodou antes dela)
+e o mesmo para os filhos encerrados (*_filhos_*).
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import resource  # só existe em Unix
+except ImportError:
+    resource = None
+
+
+def _cpu_s() -> float:
+    # inclui os filhos já encerrados (workers do ProcessPoolExecutor)
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _rss_mb(quem: int) -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(quem).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def pico_rss_mb() -> Optional[float]:
+    """Pico de RSS do processo até agora (None fora de Unix)."""
+    return _rss_mb(resource.RUSAGE_SELF) if resource else None
+
+
+def pico_rss_filhos_mb() -> Optional[float]:
+    """Maior pico de RSS entre os filhos encerrados (None fora de Unix)."""
+    return _rss_mb(resource.RUSAGE_CHILDREN) if resource else None
+
+
+def _somar_delta(total: Optional[float], antes: Optional[float], depois: Optional[float]) -> Optional[float]:
+    if antes is None or depois is None:
+        return None
+    return (total or 0.0) + depois - antes
+
+
+class RelatorioExecucao:
+    """Coleta as métricas das etapas de uma rodada e grava em JSON."""
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.etapas: dict[str, dict] = {}
+        self.dados: dict[str, object] = {}
+
+    @contextmanager
+    def etapa(self, nome: str) -> Iterator[dict]:
+        e = self.etapas.get(nome)
+        if e is None:
+            e = self.etapas[nome] = {"tempo_s": 0.0, "cpu_s": 0.0, "chamadas": 0, "itens": 0}
+        t0, c0 = time.perf_counter(), _cpu_s()
+        m0, f0 = pico_rss_mb(), pico_rss_filhos_mb()
+        try:
+            yield e
+        finally:
+            e["tempo_s"] += time.perf_counter() - t0
+            e["cpu_s"] += _cpu_s() - c0
+            e["chamadas"] += 1
+            m1, f1 = pico_rss_mb(), pico_rss_filhos_mb()
+            e["pico_rss_delta_mb"] = _somar_delta(e.get("pico_rss_delta_mb"), m0, m1)
+            e["pico_rss_filhos_delta_mb"] = _somar_delta(e.get("pico_rss_filhos_delta_mb"), f0, f1)
+            e["pico_rss_acumulado_mb"] = m1
+            e["pico_rss_filhos_acumulado_mb"] = f1
+
+    def como_dict(self) -> dict:
+        etapas = {}
+        for nome, e in self.etapas.items():
+            etapas[nome] = {k: round(v, 4) if isinstance(v, float) else v for k, v in e.items()}
+        return {
+            "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+            "tempo_total_s": round(time.time() - self.inicio, 4),
+            "pico_rss_mb": pico_rss_mb(),
+            "pico_rss_filhos_mb": pico_rss_filhos_mb(),
+            "etapas": etapas,
+            **self.dados,
+        }
+
+    def salvar(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.como_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
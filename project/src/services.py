@@ -1,54 +1,21 @@
 # src/services.py
+import heapq
+import math
 import re
+from collections import Counter
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional
 
-def _extract_kg(text: str) -> Optional[float]:
-    m = re.search(r"(\d+(?:[.,]\d+)?)\s*kg\b", text, re.IGNORECASE)
-    if not m:
-        return None
-
-    val = m.group(1).replace(",", ".")
-    try:
-        return float(val)
-    except ValueError:
-        return None
-
-def _merge_wrapped_lines(text: str) -> list[str]:
-    """
-    Junta linhas que foram quebradas na extração do PDF.
-    Regra:
-      - Se começa com número: nova linha de item
-      - Senão: é continuação da linha anterior
-    """
-    merged: list[str] = []
-    current = ""
-
-    for raw in text.splitlines():
-        ln = " ".join(raw.split())
-        if not ln:
-            continue
-
-        if re.match(r"^\d+\s+", ln):  # começa com código
-            if current:
-                merged.append(current)
-            current = ln
-        else:
-            # continuação
-            if current:
-                current += " " + ln
-            else:
-                current = ln
-
-    if current:
-        merged.append(current)
-
-    return merged
+import numpy as np
 
+from .domain import OfertaFornecedor, ProdutoDesejado
+from .io import PerfilExtracao, normalize_name
+from .store import OfertaStore
 
 
 #=================================
-import re
-from typing import List, Optional
-from .domain import OfertaFornecedor
 
 def _to_float_any(x: str) -> Optional[float]:
     x = x.strip()
@@ -66,43 +33,118 @@ def _to_float_any(x: str) -> Optional[float]:
         return float(x)
     except ValueError:
         return None
-# -----------------------------
-# Fornecedor 2 (Tabela 44)
-# Regra: usar "Outros Estados p/kg"
-# Formato típico: COD NOME  preço_outros  preço_sp  preço_sn  embalagem
-# Ex.: "486 Aveia em Flocos Finos 5,00 5,00 5,30 25 kg"
-# -----------------------------
 
 
-def _extract_kg(text: str) -> Optional[float]:
+# --- padrões compilados uma vez (compartilhados pelos parsers) ---
+_RE_CODIGO = re.compile(r"^\d+\s+")                      # linha começa com código
+
+# Números da linha, cada um com o " kg" logo depois quando houver. split()
+# parte a linha inteira (C, uma passada): [texto, número, kg, texto, número, kg, ..., texto]
+# ("" no lugar do kg quando o número não tem)
+_RE_TOKEN = re.compile(r"(\d+(?:[.,]\d+)?)(\s*kg\b|)", re.IGNORECASE)
+_ANTES_PRECO = ("R$", "R$ ", "r$", "r$ ")
+
+
+def _colado(partes: list[str], j: int) -> str:
     """
-    Extrai kg de pedaços tipo:
-      "25 kg", "10 KG", "SACO 25 KG", "25,00 KG"
+    Número inteiro partes[j] colado no anterior por um separador ("1.234,56"
+    vira "1.234" + "," + "56"): a regex antiga, varrendo da esquerda, lia
+    "234,56". Devolve o pedaço do anterior que ela juntava ("234"), ou "".
     """
-    m = re.search(r"(\d+(?:[.,]\d+)?)\s*kg\b", text, re.IGNORECASE)
-    if not m:
-        return None
-    val = m.group(1).replace(",", ".")
-    try:
-        return float(val)
-    except ValueError:
-        return None
+    if j < 4 or partes[j - 1] not in (".", ",") or partes[j - 2] or not partes[j].isdigit():
+        return ""
+    ant = partes[j - 3]
+    return ant[max(ant.rfind("."), ant.rfind(",")) + 1:]
+
+
+class LinhaTokens:
+    """
+    Uma linha de item (já com espaços normalizados) partida numa passada só
+    em texto / número / " kg". Parsers usam só os campos prontos:
+    - codigo: onde o texto começa depois do código inicial ("486 Aveia" -> 4; 0 = sem código)
+    - nums: números com decimal ("5,00"), na ordem
+    - precos: "R$ 12,34" na ordem
+    - kg: embalagem do 1º "N kg" (None se não tem)
+    Onde o nome termina cada parser acha em `partes` (ou tokens(), com posições).
+    """
+    __slots__ = ("texto", "partes", "codigo", "nums", "precos", "kg")
+
+    def __init__(self, ln: str):
+        partes = _RE_TOKEN.split(ln)
+        numeros = partes[1::3]
+        sufixos = partes[2::3]
+
+        kg = None
+        for j in range(1, len(partes), 3):
+            if partes[j + 1]:
+                cauda = _colado(partes, j)
+                kg = float(f"{cauda}.{partes[j]}" if cauda else partes[j].replace(",", "."))
+                break
+
+        precos = []
+        if "$" in ln:
+            precos = [
+                g[g.rfind("$") - 1:] + n
+                for g, n in zip(partes[0::3], numeros) if g.endswith(_ANTES_PRECO)
+            ]
+
+        codigo = 0
+        if numeros and not partes[0] and numeros[0].isdigit():
+            depois = sufixos[0] or partes[3]
+            if depois[:1].isspace():
+                codigo = len(numeros[0]) + 1
+
+        self.texto = ln
+        self.partes = partes
+        self.codigo = codigo
+        self.nums = [n for n in numeros if "." in n or "," in n]
+        self.precos = precos
+        self.kg = kg
+
+    def tokens(self) -> list[tuple[int, int, int, bool]]:
+        """(ini, fim, fim_kg, decimal) de cada número; fim_kg > fim se vem " kg" depois."""
+        partes = self.partes
+        toks = []
+        pos = 0
+        for i in range(1, len(partes), 3):
+            ini = pos + len(partes[i - 1])
+            num = partes[i]
+            fim = ini + len(num)
+            pos = fim + len(partes[i + 1])
+            toks.append((ini, fim, pos, "." in num or "," in num))
+        return toks
+
 
 #------------------------------
-import re
 
-def _merge_wrapped_lines(text: str) -> list[str]:
-    merged: list[str] = []
+def _iter_lines(text: str | Iterable[str]) -> Iterator[str]:
+    """Aceita o texto inteiro ou qualquer iterável de páginas/linhas."""
+    if isinstance(text, str):
+        yield from text.splitlines()
+        return
+    for chunk in text:
+        yield from chunk.splitlines()
+
+
+def _merge_wrapped_lines(text: str | Iterable[str]) -> Iterator[str]:
+    """
+    Junta linhas que foram quebradas na extração do PDF.
+    Regra:
+      - Se começa com número: nova linha de item
+      - Senão: é continuação da linha anterior
+    Gera as linhas juntadas uma a uma (não guarda o documento inteiro),
+    já com os espaços normalizados.
+    """
     current = ""
 
-    for raw in text.splitlines():
+    for raw in _iter_lines(text):
         ln = " ".join(raw.split())
         if not ln:
             continue
 
-        if re.match(r"^\d+\s+", ln):
+        if _RE_CODIGO.match(ln):
             if current:
-                merged.append(current)
+                yield current
             current = ln
         else:
             if current:
@@ -111,431 +153,726 @@ def _merge_wrapped_lines(text: str) -> list[str]:
                 current = ln
 
     if current:
-        merged.append(current)
+        yield current
 
-    return merged
-#------------------------------
-def parse_fornecedor2(text: str, fornecedor: str = "fornecedor2") -> List[OfertaFornecedor]:
-    ofertas: List[OfertaFornecedor] = []
-
-    skipped_no_kg = 0
-    skipped_few_nums = 0
-    skipped_no_price = 0
-    parsed = 0
 
+# -----------------------------
+# Fornecedor 2 (Tabela 44)
+# Regra: usar "Outros Estados p/kg"
+# Formato típico: COD NOME  preço_outros  preço_sp  preço_sn  embalagem
+# Ex.: "486 Aveia em Flocos Finos 5,00 5,00 5,30 25 kg"
+# -----------------------------
+_CAB_F2 = re.compile(r"Tabela|Outros Estados|Embalagem")
 
 
-    for line in _merge_wrapped_lines(text):
-        ln = " ".join(line.split())
-        if not ln:
+def _nome_f2(t: LinhaTokens) -> str:
+    """
+    Nome = linha sem o código e sem o fim "p1 p2 p3 emb kg ..." (4 números
+    com decimal seguidos, o último com kg).
+    """
+    ln, toks = t.texto, t.tokens()
+    for i in range(len(toks) - 3):
+        seq = toks[i:i + 4]
+        ini = seq[0][0]
+        if ini - 1 < t.codigo or ln[ini - 1] != " ":
+            continue
+        if not all(decimal for *_, decimal in seq) or seq[3][2] == seq[3][1]:
             continue
+        # um espaço entre um número e o próximo (sem kg no meio)
+        if all(b[0] == a[2] + 1 and a[2] == a[1] and ln[a[1]] == " " for a, b in zip(seq, seq[1:])):
+            return ln[t.codigo:ini - 1].strip()
+    return ln[t.codigo:].strip()
+
+
+def iter_fornecedor2(
+    text: str | Iterable[str],
+    fornecedor: str = "fornecedor2",
+    contadores: Optional[Counter] = None,
+) -> Iterator[OfertaFornecedor]:
+    c = Counter() if contadores is None else contadores
 
+    for ln in _merge_wrapped_lines(text):
         # pula cabeçalhos comuns
-        if "Tabela" in ln or "Outros Estados" in ln or "Embalagem" in ln:
+        if _CAB_F2.search(ln):
+            c["skipped_header"] += 1
             continue
 
+        t = LinhaTokens(ln)
+
         # precisa começar com código numérico
-        if not re.match(r"^\d+\s+", ln):
+        if not t.codigo:
+            c["skipped_no_code"] += 1
             continue
 
         # pega embalagem no fim (ex: "25 kg")
-        emb = _extract_kg(ln)
+        emb = t.kg
         if emb is None:
-            skipped_no_kg += 1
+            c["skipped_no_kg"] += 1
             continue
 
         # pega os 3 preços no final antes da embalagem
-        # estratégia: capturar todos os números com vírgula e pegar os 3 últimos antes do "kg"
-        nums = re.findall(r"\d+(?:[.,]\d+)", ln)
-        if len(nums) < 4:
-            skipped_few_nums += 1
-            continue
-
-        # heuristic: últimos 4 números costumam ser: preco_outros, preco_sp, preco_sn, embalagem
-        embalagem_guess = nums[-1]
-        if "kg" not in ln.lower():
+        # heuristic: últimos 4 números com decimal costumam ser: preco_outros, preco_sp, preco_sn, embalagem
+        if len(t.nums) < 4:
+            c["skipped_few_nums"] += 1
             continue
 
-        preco_outros = _to_float_any(nums[-4])
+        preco_outros = _to_float_any(t.nums[-4])
         if preco_outros is None:
-            skipped_no_price += 1
+            c["skipped_no_price"] += 1
             continue
 
         # nome do produto = remove código e remove parte final (preços + embalagem)
-        # Simplificação: remove os 4 últimos números e o "kg"
-        nome_part = re.sub(r"^\d+\s+", "", ln)
-        # remove do fim: "... X X X 25 kg"
-        nome_part = re.sub(r"\s+\d+(?:[.,]\d+)\s+\d+(?:[.,]\d+)\s+\d+(?:[.,]\d+)\s+\d+(?:[.,]\d+)\s*kg\b.*$", "", nome_part, flags=re.IGNORECASE).strip()
+        nome_part = _nome_f2(t)
         if not nome_part:
+            c["skipped_no_name"] += 1
             continue
 
-        parsed += 1
-
-        ofertas.append(
-            OfertaFornecedor(
-                fornecedor=fornecedor,
-                nome_pdf=nome_part,
-                embalagem_kg=emb,
-                preco_por_kg=preco_outros,
-                tipo_preco="outros_estados",
-                linha_origem=ln
-            )
+        c["parsed"] += 1
+
+        yield OfertaFornecedor(
+            fornecedor=fornecedor,
+            nome_pdf=nome_part,
+            embalagem_kg=emb,
+            preco_por_kg=preco_outros,
+            tipo_preco="outros_estados",
+            linha_origem=ln
         )
-    print(f"[{fornecedor}] parsed={parsed} skipped_no_kg={skipped_no_kg} skipped_few_nums={skipped_few_nums} skipped_no_price={skipped_no_price}")
-    return ofertas
+
+
+def parse_fornecedor2(text: str | Iterable[str], fornecedor: str = "fornecedor2") -> List[OfertaFornecedor]:
+    return list(iter_fornecedor2(text, fornecedor))
 
 # -----------------------------
 # Fornecedor 4 (à vista)
 # Formato típico: "AÇÚCAR DEMERARA (CAIXA) 25 Kg R$ 5,43 R$ 5,49 AÇÚCAR"
 # Regra: usar o primeiro preço (à vista)
 # -----------------------------
-def parse_fornecedor4(text: str, fornecedor: str = "fornecedor4") -> List[OfertaFornecedor]:
-    ofertas: List[OfertaFornecedor] = []
+_CAB_F4 = re.compile(r"^P[ÁA]G|EMBALAGEM.*PRODUTO|PRODUTO.*EMBALAGEM")
 
-    for line in _merge_wrapped_lines(text):
-        ln = " ".join(line.split())
-        if not ln:
-            continue
 
-        up = ln.upper()
-        if up.startswith("PÁG") or up.startswith("PAG"):
-            continue
-        if "EMBALAGEM" in up and "PRODUTO" in up:
-            continue
+def _nome_f4(t: LinhaTokens) -> str:
+    """Nome = tudo antes do 1º "kg", sem o número logo antes dele."""
+    partes = t.partes
+    i = 2
+    while not partes[i]:
+        i += 3  # 1º número com " kg" (a linha tem embalagem)
+    antes = "".join(partes[:i])
+    solto = antes.lower().find("kg")  # ex.: "KGS" antes do "5 KG"
+    nome = (antes if solto < 0 else antes[:solto]).rstrip()
 
-        # precisa ter kg e algum preço
-        if "kg" not in ln.lower():
+    # tira o número do fim (com a parte colada do anterior, como a regex antiga)
+    fim = len(nome)
+    for k, (ini, tfim, _, _) in reversed(list(enumerate(t.tokens()))):
+        if tfim <= fim:
+            if tfim == fim:
+                cauda = _colado(partes, 3 * k + 1)
+                nome = nome[:ini - len(cauda) - 1] if cauda else nome[:ini]
+            break
+    return nome.strip()
+
+
+def iter_fornecedor4(
+    text: str | Iterable[str],
+    fornecedor: str = "fornecedor4",
+    contadores: Optional[Counter] = None,
+) -> Iterator[OfertaFornecedor]:
+    c = Counter() if contadores is None else contadores
+
+    for ln in _merge_wrapped_lines(text):
+        if _CAB_F4.search(ln.upper()):
+            c["skipped_header"] += 1
             continue
 
-        emb = _extract_kg(ln)
+        t = LinhaTokens(ln)
+
+        # precisa ter kg e algum preço
+        emb = t.kg
         if emb is None:
+            c["skipped_no_kg"] += 1
             continue
 
-        # captura preços no formato "R$ 12,34" ou "R$12.34"
-        prices = re.findall(r"R\$\s*\d+(?:[.,]\d+)?", ln, flags=re.IGNORECASE)
-        if not prices:
+        # preços no formato "R$ 12,34" ou "R$12.34"
+        if not t.precos:
             # fallback: às vezes vem só "12,34" sem R$
-            nums = re.findall(r"\d+(?:[.,]\d+)", ln)
-            if len(nums) < 2:
+            if len(t.nums) < 2:
+                c["skipped_few_nums"] += 1
                 continue
             # tenta usar o primeiro número como preço
-            preco_avista = _to_float_any(nums[0])
+            preco_avista = _to_float_any(t.nums[0])
         else:
-            preco_avista = _to_float_any(prices[0])
+            preco_avista = _to_float_any(t.precos[0])
 
         if preco_avista is None:
+            c["skipped_no_price"] += 1
             continue
 
         # nome = tudo antes do trecho de kg (heurística)
-        idx = ln.lower().find("kg")
-        nome_part = ln[:idx].strip()
-        nome_part = re.sub(r"\s*\d+(?:[.,]\d+)?\s*$", "", nome_part).strip()
+        nome_part = _nome_f4(t)
 
         if not nome_part:
+            c["skipped_no_name"] += 1
             continue
 
-        ofertas.append(
-            OfertaFornecedor(
-                fornecedor=fornecedor,
-                nome_pdf=nome_part,
-                embalagem_kg=emb,
-                preco_por_kg=preco_avista,
-                tipo_preco="avista",
-                linha_origem=ln,
-            )
+        c["parsed"] += 1
+
+        yield OfertaFornecedor(
+            fornecedor=fornecedor,
+            nome_pdf=nome_part,
+            embalagem_kg=emb,
+            preco_por_kg=preco_avista,
+            tipo_preco="avista",
+            linha_origem=ln,
         )
 
-    return ofertas
+
+def parse_fornecedor4(text: str | Iterable[str], fornecedor: str = "fornecedor4") -> List[OfertaFornecedor]:
+    return list(iter_fornecedor4(text, fornecedor))
 
 
 
 #======================================================== Fornecedor 3 
 
-def parse_fornecedor3(text: str, fornecedor: str = "fornecedor3") -> List[OfertaFornecedor]:
-    ofertas: List[OfertaFornecedor] = []
+_CAB_F3 = re.compile(r"TABELA DE PREÇO|R\$/KG|PESO/UN|DESCRIÇÃO")
 
-    lines = _merge_wrapped_lines(text)
 
-    for line in lines:
-        ln = " ".join(line.split())
-        if not ln:
-            continue
+def _nome_f3(t: LinhaTokens) -> str:
+    """Nome = linha sem o código e sem o fim típico "25 KG 5.00 125.00"."""
+    ln, p = t.texto, t.partes
+    # [... texto, emb, " kg", " ", preço, "", " ", total, "", ""]
+    if (
+        len(p) >= 10 and not p[-1] and not p[-2] and p[-4] == " " and not p[-5]
+        and p[-7] == " " and p[-8] and p[-10].endswith(" ")
+        and not p[-3].isdigit() and not p[-6].isdigit()
+    ):
+        corte = len(ln) - sum(map(len, p[-9:])) - 1  # espaço antes da embalagem
+        if corte >= t.codigo:
+            return ln[t.codigo:corte].strip()
+    return ln[t.codigo:].strip()
+
+
+def iter_fornecedor3(
+    text: str | Iterable[str],
+    fornecedor: str = "fornecedor3",
+    contadores: Optional[Counter] = None,
+) -> Iterator[OfertaFornecedor]:
+    c = Counter() if contadores is None else contadores
 
+    for ln in _merge_wrapped_lines(text):
         # ignora cabeçalhos
-        up = ln.upper()
-        if "TABELA DE PREÇO" in up or "R$/KG" in up or "PESO/UN" in up or "DESCRIÇÃO" in up:
+        if _CAB_F3.search(ln.upper()):
+            c["skipped_header"] += 1
             continue
 
-        # precisa ter kg
-        if "kg" not in ln.lower():
-            continue
+        t = LinhaTokens(ln)
 
-        emb = _extract_kg(ln)
+        # precisa ter kg
+        emb = t.kg
         if emb is None:
+            c["skipped_no_kg"] += 1
             continue
 
         # pega números (ex: "... 5.00 125.00")
-        nums = re.findall(r"\d+(?:[.,]\d+)", ln)
-        if len(nums) < 2:
+        if len(t.nums) < 2:
+            c["skipped_few_nums"] += 1
             continue
 
         # heurística: o penúltimo costuma ser o preço/kg
-        preco_kg = _to_float_any(nums[-2])
+        preco_kg = _to_float_any(t.nums[-2])
         if preco_kg is None:
+            c["skipped_no_price"] += 1
             continue
 
         # nome do produto: remove códigos no começo e corta o final numérico
-        nome_part = re.sub(r"^\d+\s+", "", ln).strip()
-        # remove trecho final típico: "25 KG 5.00 125.00"
-        nome_part = re.sub(r"\s+\d+(?:[.,]\d+)?\s*kg\s+\d+(?:[.,]\d+)\s+\d+(?:[.,]\d+)\s*$", "", nome_part, flags=re.IGNORECASE).strip()
+        nome_part = _nome_f3(t)
 
         if not nome_part:
+            c["skipped_no_name"] += 1
             continue
 
-        ofertas.append(
-            OfertaFornecedor(
-                fornecedor=fornecedor,
-                nome_pdf=nome_part,
-                embalagem_kg=emb,
-                preco_por_kg=preco_kg,
-                tipo_preco="tabela",
-                linha_origem=ln
-            )
+        c["parsed"] += 1
+
+        yield OfertaFornecedor(
+            fornecedor=fornecedor,
+            nome_pdf=nome_part,
+            embalagem_kg=emb,
+            preco_por_kg=preco_kg,
+            tipo_preco="tabela",
+            linha_origem=ln
         )
 
-    return ofertas
+
+def parse_fornecedor3(text: str | Iterable[str], fornecedor: str = "fornecedor3") -> List[OfertaFornecedor]:
+    return list(iter_fornecedor3(text, fornecedor))
 
 
 #------------------------------------- Fornecedor1
 
-def parse_fornecedor1(text: str, fornecedor: str = "fornecedor1") -> List[OfertaFornecedor]:
-    ofertas: List[OfertaFornecedor] = []
+_CAB_F1 = re.compile(
+    r"^TABELA DIA|PRODUTOS A GRANEL|PRE[ÇC]O/KG"
+    r"|PRODUTOS.*NACIONAIS|NACIONAIS.*PRODUTOS"
+    r"|EMBALAGEM.*(?:PRODUTOS|PUROS)|(?:PRODUTOS|PUROS).*EMBALAGEM"
+)
 
-    skipped_header = 0
-    skipped_no_emb = 0
-    skipped_no_prices = 0
-    parsed = 0
 
-    #print("[fornecedor1] DEBUG linhas split:", len(text.splitlines()))
+def _nome_f1(t: LinhaTokens) -> str:
+    """
+    Nome = tudo antes do 1º "SACO 25 KG" (linha inteira se não tem SACO;
+    antes do 1º "R$" se a linha começa pelo SACO).
+    """
+    partes = t.partes
+    for i in range(2, len(partes), 3):
+        if not partes[i]:
+            continue
+        antes = partes[i - 2]  # texto entre o número anterior e este
+        if antes.endswith(" "):
+            antes = antes[:-1]
+        # \bSACO: o que vem antes não pode ser letra/dígito (número anterior conta)
+        if antes[-4:].upper() == "SACO" and (not _palavra(antes[-5:-4]) if len(antes) > 4 else i == 2):
+            nome = ("".join(partes[:i - 2]) + antes[:-4]).strip()
+            return nome or t.texto.split("R$")[0].strip()
+    return t.texto
+
+
+def _palavra(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
 
 
+def iter_fornecedor1(
+    text: str | Iterable[str],
+    fornecedor: str = "fornecedor1",
+    contadores: Optional[Counter] = None,
+) -> Iterator[OfertaFornecedor]:
+    c = Counter() if contadores is None else contadores
+
     # ⚠️ fornecedor1: NÃO usar _merge_wrapped_lines, pois ele pode colar tudo em 1 linha
-    for raw in text.splitlines():
+    for raw in _iter_lines(text):
         ln = " ".join(raw.split())
         if not ln:
             continue
 
-        up = ln.upper()
-
         # cabeçalhos
-        if up.startswith("TABELA DIA") or "PRODUTOS A GRANEL" in up or "PREÇO/KG" in up or "PRECO/KG" in up:
-            skipped_header += 1
-            continue
-        if "PRODUTOS" in up and "NACIONAIS" in up:
-            skipped_header += 1
-            continue
-        if "EMBALAGEM" in up and ("PRODUTOS" in up or "PUROS" in up):
-            skipped_header += 1
+        if _CAB_F1.search(ln.upper()):
+            c["skipped_header"] += 1
             continue
 
+        t = LinhaTokens(ln)
+
         # precisa achar algo tipo SACO25KG
-        emb = _extract_kg(ln)
+        emb = t.kg
         if emb is None:
-            skipped_no_emb += 1
+            c["skipped_no_emb"] += 1
             continue
 
         # preços: R$ 19.00, R$ 21,10 etc
-        prices = re.findall(r"R\$\s*\d+(?:[.,]\d+)?", ln, flags=re.IGNORECASE)
-        if not prices:
-            skipped_no_prices += 1
+        if not t.precos:
+            c["skipped_no_prices"] += 1
             continue
 
         vals = []
-        for p in prices:
+        for p in t.precos:
             v = _to_float_any(p)
             if v is not None:
                 vals.append(v)
 
         if not vals:
-            skipped_no_prices += 1
+            c["skipped_no_prices"] += 1
             continue
 
         preco_kg = min(vals)  # regra: menor preço da linha
 
         # nome: tudo antes do SACOxxKG
-        nome_part = re.split(r"\bSACO\s*\d+(?:[.,]\d+)?\s*KG\b", ln, flags=re.IGNORECASE)[0].strip()
-        if not nome_part:
-            nome_part = ln.split("R$")[0].strip()
+        nome_part = _nome_f1(t)
 
         if not nome_part:
-            skipped_header += 1
+            c["skipped_header"] += 1
             continue
 
-        ofertas.append(
-            OfertaFornecedor(
-                fornecedor=fornecedor,
-                nome_pdf=nome_part,
-                embalagem_kg=emb,
-                preco_por_kg=preco_kg,
-                tipo_preco="menor_preco",
-                linha_origem=ln,
-            )
+        yield OfertaFornecedor(
+            fornecedor=fornecedor,
+            nome_pdf=nome_part,
+            embalagem_kg=emb,
+            preco_por_kg=preco_kg,
+            tipo_preco="menor_preco",
+            linha_origem=ln,
         )
-        parsed += 1
+        c["parsed"] += 1
 
-    #print(f"[{fornecedor}] parsed={parsed} skipped_header={skipped_header} skipped_no_emb={skipped_no_emb} skipped_no_prices={skipped_no_prices}")
-    return ofertas
 
-#----------------------------- lIMPEZA
-import re
-from .io import normalize_name
+def parse_fornecedor1(text: str | Iterable[str], fornecedor: str = "fornecedor1") -> List[OfertaFornecedor]:
+    return list(iter_fornecedor1(text, fornecedor))
+
+
+#------------------------------------- Registro de layouts
+
+@dataclass(frozen=True)
+class LayoutFornecedor:
+    """
+    Layout de tabela de um fornecedor:
+    - tipo_preco: regra da coluna de preço ("outros_estados", "avista", ...)
+    - cabecalho: linha que casa é cabeçalho (o parser ignora)
+    - assinatura: identifica o layout só pela 1ª página do PDF
+    - parser: gera as ofertas a partir do texto/linhas; parser(texto, fornecedor,
+      contadores=Counter) soma em `contadores` as ofertas ("parsed") e os
+      motivos de descarte ("skipped_*")
+    - extracao: recorte da tabela de preços em cada página (None = página inteira)
+    """
+    nome: str
+    tipo_preco: str
+    cabecalho: re.Pattern
+    assinatura: re.Pattern
+    parser: Callable[..., Iterator[OfertaFornecedor]]
+    extracao: Optional[PerfilExtracao] = None
+
+
+LAYOUTS: dict[str, LayoutFornecedor] = {}
+
+# mude quando algum parser (ou sem_duplicadas) mudar: invalida ofertas salvas
+# (incremental, snapshot)
+PARSER_VERSION = "4"
+
+
+def registrar_layout(layout: LayoutFornecedor) -> LayoutFornecedor:
+    """Adiciona (ou troca) um layout no registro. Fornecedor novo = um layout novo."""
+    LAYOUTS[layout.nome] = layout
+    return layout
+
+
+def detectar_layout(primeira_pagina: str) -> Optional[LayoutFornecedor]:
+    """Primeiro layout cuja assinatura aparece na 1ª página (None se nenhum)."""
+    for layout in LAYOUTS.values():
+        if layout.assinatura.search(primeira_pagina):
+            return layout
+    return None
+
+
+# linha de item: tem algum valor com centavos ("19.00", "5,43")
+_RE_PRECO = re.compile(r"\d[.,]\d{2}\b")
+
+# Perfis de extração: faixa da tabela nas páginas do PDF de cada fornecedor
+# (banner, cabeçalho repetido e rodapé de observações não chegam ao parser).
+# Os marcadores são textos exatos desses PDFs: em outro documento não casam
+# e a página fica inteira.
+# Assinatura e perfil de cada layout saem do mesmo PDF (o fornecedorN.pdf que o
+# nome do arquivo liga ao layout): --detectar escolhe o mesmo layout que o nome.
+registrar_layout(LayoutFornecedor(
+    nome="fornecedor1",
+    tipo_preco="menor_preco",
+    cabecalho=_CAB_F1,
+    assinatura=re.compile(r"^TABELA DIA\b", re.MULTILINE),
+    parser=iter_fornecedor1,
+    extracao=PerfilExtracao(
+        nome="fornecedor1",
+        inicio=re.compile(r"^PRODUTOS NACIONAIS PRODUTOS IMPORTADOS$"),  # banner da 1ª página
+        fim=re.compile(r"^OBS: EMPRESA DO SIMPLES"),                     # condições de venda
+        linha=_RE_PRECO,
+    ),
+))
+registrar_layout(LayoutFornecedor(
+    nome="fornecedor2",
+    tipo_preco="outros_estados",
+    cabecalho=_CAB_F2,
+    assinatura=re.compile(r"PREÇO À VISTA PREÇO À PRAZO|www\.ibericacomercio\.com"),
+    parser=iter_fornecedor2,
+    # sem perfil: este parser junta as linhas do PDF pelos cabeçalhos de cada
+    # página; tirá-los cola itens de páginas vizinhas
+))
+registrar_layout(LayoutFornecedor(
+    nome="fornecedor3",
+    tipo_preco="tabela",
+    cabecalho=_CAB_F3,
+    assinatura=re.compile(r"\bTabela N\S*\s*\d+"),            # "Tabela N° 44"
+    parser=iter_fornecedor3,
+    extracao=PerfilExtracao(
+        nome="fornecedor3",
+        inicio=re.compile(r"^p/kg Nacional$"),                           # cabeçalho em toda página
+        fim=re.compile(r"^Tabela válida até \d"),                        # validade + observações no pé
+        linha=_RE_PRECO,
+    ),
+))
+registrar_layout(LayoutFornecedor(
+    nome="fornecedor4",
+    tipo_preco="avista",
+    cabecalho=_CAB_F4,
+    assinatura=re.compile(r"^Código Descrição Inf\. Peso/Un\. R\$/KG", re.MULTILINE),
+    parser=iter_fornecedor4,
+    extracao=PerfilExtracao(
+        nome="fornecedor4",
+        inicio=re.compile(r"^Código Descrição Inf\. Peso/Un\. R\$/KG Preço Obs\.$"),  # avisos da 1ª página
+        linha=_RE_PRECO,
+    ),
+))
+
+#----------------------------------------------------------------
+
+# Camparando os preços : MOTOR DO PROGRAMA
+
+# --- matching helpers ---
 
 _STOPWORDS = {
     "kg", "quilo", "quilos", "un", "unidade", "unidades",
     "caixa", "cx", "pct", "pacote", "saco", "lata",
-    "torrada", "torrado", "sal", "s/", "sem",
-    "w1", "w2", "w3", "w4", "meta", "runner", "cru",
+    "meta", "runner", "cru",
 }
 
 _SINONIMOS = {
     "castanha do para": ["castanha do pará", "castanha para", "castanha pará"],
-    "aveia em flocos": ["flocos finos", "flocos grossos", "aveia flocos", "aveia em flocos finos"],
-    "farinha de trigo": ["trigo farinha", "farinha trigo"],
+    "aveia em flocos": ["aveia flocos", "flocos finos", "flocos grossos"],
+    "farinha de trigo": ["farinha trigo", "trigo farinha"],
     "chia": ["semente chia", "chia seed"],
 }
 
-def _clean_for_match(s: str) -> str:
-    """
-    Limpa texto para bater nomes:
-    - normaliza (lower, sem acento)
-    - remove parênteses
-    - remove códigos/nums isolados
-    - remove stopwords comuns
-    """
-    s = normalize_name(s)
-    s = re.sub(r"\(.*?\)", " ", s)                 # remove ( ... )
-    s = re.sub(r"[^a-z0-9\s]", " ", s)             # tira pontuação
-    tokens = [t for t in s.split() if t not in _STOPWORDS]
-    # remove tokens que são só números ou muito curtos tipo "w1"
-    tokens = [t for t in tokens if not t.isdigit() and len(t) > 1]
-    return " ".join(tokens).strip()
 
-def _expand_query(nome_base: str) -> list[str]:
-    """Gera variações do nome usando sinônimos."""
-    base = normalize_name(nome_base)
-    vars = [base]
-    for k, vs in _SINONIMOS.items():
-        if base == normalize_name(k):
-            vars.extend([normalize_name(v) for v in vs])
-    return list(dict.fromkeys(vars))  # remove duplicados mantendo ordem
+# mude quando o match mudar (_similarity, _clean_for_match, busca no OfferIndex):
+# invalida scores, candidatos incrementais e snapshots salvos
+MATCHER_VERSION = "2"
 
 
+def _similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
 
 
-#----------------------------------------------------------------
+def _lcs(a: str, pm: dict[str, int], mask: int) -> int:
+    """
+    Tamanho da maior subsequência comum entre `a` e b (bit-paralelo):
+    pm[c] = bits das posições de c em b, mask = (1 << len(b)) - 1.
+    Simétrico: b pode ser a consulta (pm montado uma vez) e `a` o nome.
+    """
+    v = mask
+    for ch in a:
+        bits = pm.get(ch)
+        if bits:        # letra fora de b não muda v
+            u = v & bits
+            v = ((v + u) | (v - u)) & mask
+    return mask.bit_length() - v.bit_count()
+
+
+def _mascaras(qcleans: list[str]) -> list[tuple[dict[str, int], int]]:
+    """(pm, mask) de _lcs para cada variação da consulta (monta uma vez por consulta)."""
+    saida = []
+    for q in qcleans:
+        pm: dict[str, int] = {}
+        for i, ch in enumerate(q):
+            pm[ch] = pm.get(ch, 0) | (1 << i)
+        saida.append((pm, (1 << len(q)) - 1))
+    return saida
+
+
+def _melhor_score(qcleans: list[str], cand: str, min_score: float, cache=None, mascaras=None) -> float:
+    """
+    max(_similarity(q, cand) for q in qcleans), com corte: se o máximo for
+    >= min_score ele é exato; senão o retorno é só algum valor < min_score.
+
+    O ratio completo (SequenceMatcher) só roda se dois tetos baratos deixarem
+    o par passar do corte e superar a melhor variação até agora:
+    - tamanho: 2*min(la, lb)/(la + lb)  (= real_quick_ratio)
+    - LCS: 2*lcs/(la + lb); os blocos do SequenceMatcher formam uma
+      subsequência comum, então o ratio nunca passa desse teto
+    cache: CacheScores opcional, consultado só depois dos tetos (guarda só
+    scores exatos, de pares que chegariam ao SequenceMatcher).
+    mascaras: _mascaras(qcleans), para quem pontua a mesma consulta várias vezes.
+    """
+    if mascaras is None:
+        mascaras = _mascaras(qcleans)
+    best_s = 0.0
+    lb = len(cand)
+    for qclean, (pm, mask) in zip(qcleans, mascaras):
+        la = len(qclean)
+        teto = 2.0 * min(la, lb) / (la + lb)
+        if teto < min_score or teto <= best_s:
+            continue
 
-# Camparando os preços : MOTOR DO PROGRAMA
+        teto = 2.0 * _lcs(cand, pm, mask) / (la + lb)
+        if teto < min_score or teto <= best_s:
+            continue
 
-import math
-from dataclasses import asdict
-from difflib import SequenceMatcher
+        s = cache.get(qclean, cand) if cache is not None else None
+        if s is None:
+            s = _similarity(qclean, cand)
+            if cache is not None:
+                cache.put(qclean, cand, s)
+        if s > best_s:
+            best_s = s
+    return best_s
 
-from .io import normalize_name
-from .domain import ProdutoDesejado, OfertaFornecedor
 
+_RE_PARENTESES = re.compile(r"\(.*?\)")
+_RE_PONTUACAO = re.compile(r"[^a-z0-9\s]")
 
-from difflib import SequenceMatcher
+# nomes limpos guardados (LRU): catálogos e consultas repetem os mesmos nomes
+MAX_NOMES_LIMPOS = 2**16
 
-def _similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, a, b).ratio()
 
-def match_ofertas_por_nome(
-    produto_nome: str,
-    ofertas: list[OfertaFornecedor],
-    top_n: int = 20,
-    min_score: float = 0.52,
-) -> list[tuple[OfertaFornecedor, float]]:
-    queries = _expand_query(produto_nome)  # inclui sinônimos
-    scored: list[tuple[OfertaFornecedor, float]] = []
+@lru_cache(maxsize=MAX_NOMES_LIMPOS)
+def _clean_for_match(s: str) -> str:
+    s = normalize_name(s)
+    s = _RE_PARENTESES.sub(" ", s)          # remove ( ... )
+    s = _RE_PONTUACAO.sub(" ", s)           # remove pontuação
+    tokens = [t for t in s.split() if t not in _STOPWORDS and not t.isdigit() and len(t) > 1]
+    return " ".join(tokens).strip()
 
-    for o in ofertas:
-        cand = _clean_for_match(o.nome_pdf)
-        if not cand:
-            continue
 
-        best_s = 0.0
-        for q in queries:
-            qclean = _clean_for_match(q)
-            s = _similarity(qclean, cand)
-            if s > best_s:
-                best_s = s
+# chave de _SINONIMOS normalizada -> variações normalizadas, montado uma vez
+_SINONIMOS_NORM: dict[str, list[str]] = {}
+for _k, _vs in _SINONIMOS.items():
+    _SINONIMOS_NORM.setdefault(normalize_name(_k), []).extend(normalize_name(v) for v in _vs)
 
-        if best_s >= min_score:
-            scored.append((o, best_s))
 
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:top_n]
+def _expand_query(nome_base: str) -> list[str]:
+    base = normalize_name(nome_base)
+    # remove duplicados preservando ordem
+    return list(dict.fromkeys([base, *_SINONIMOS_NORM.get(base, ())]))
 
 
-import math
-import re
-from difflib import SequenceMatcher
-from typing import Optional
+def _queries_limpas(produto_nome: str) -> list[str]:
+    """Variações da consulta (com sinônimos) já limpas para o match."""
+    return [_clean_for_match(q) for q in _expand_query(produto_nome)]
 
-from .domain import ProdutoDesejado, OfertaFornecedor
-from .io import normalize_name
 
+def _janela_tamanhos(la: int, min_score: float) -> tuple[float, float]:
+    """
+    Tamanhos lb de nome que ainda podem chegar a min_score contra uma consulta
+    de tamanho la: o ratio nunca passa de 2*min(la, lb)/(la + lb), então
+    lb fica em [la*m/(2-m), la*(2-m)/m] (m = min_score).
+    """
+    return la * min_score / (2.0 - min_score), la * (2.0 - min_score) / min_score
 
-# --- matching helpers ---
 
-_STOPWORDS = {
-    "kg", "quilo", "quilos", "un", "unidade", "unidades",
-    "caixa", "cx", "pct", "pacote", "saco", "lata",
-    "meta", "runner", "cru",
-}
+# consultas até este tamanho têm o LCS de todos os nomes calculado de uma vez
+# (máscara da consulta cabe num uint64 sem estourar em v + u)
+MAX_CONSULTA_LOTE = 63
 
-_SINONIMOS = {
-    "castanha do para": ["castanha do pará", "castanha para", "castanha pará"],
-    "aveia em flocos": ["aveia flocos", "flocos finos", "flocos grossos"],
-    "farinha de trigo": ["farinha trigo", "trigo farinha"],
-    "chia": ["semente chia", "chia seed"],
-}
 
+def _popcount(v: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):        # NumPy >= 2.0
+        return np.bitwise_count(v)
+    return np.unpackbits(v.view(np.uint8)).reshape(len(v), 64).sum(axis=1)
 
-def _similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, a, b).ratio()
 
+def _lcs_em_lote(q: str, colunas: np.ndarray, tamanhos: np.ndarray) -> np.ndarray:
+    """
+    _lcs de q contra cada nome de um bloco, todos ao mesmo tempo: o mesmo
+    algoritmo bit-paralelo, percorrendo os nomes coluna a coluna.
+    colunas[j, k] = j-ésimo byte do k-ésimo nome (0 depois do fim);
+    tamanhos em ordem crescente (coluna j só mexe nos nomes mais longos que j).
+    """
+    tabela = np.zeros(256, dtype=np.uint64)
+    for i, b in enumerate(q.encode("ascii")):
+        tabela[b] |= np.uint64(1 << i)
+    mask = np.uint64((1 << len(q)) - 1)
 
-def _clean_for_match(s: str) -> str:
-    s = normalize_name(s)
-    s = re.sub(r"\(.*?\)", " ", s)         # remove ( ... )
-    s = re.sub(r"[^a-z0-9\s]", " ", s)     # remove pontuação
-    tokens = [t for t in s.split() if t not in _STOPWORDS]
-    tokens = [t for t in tokens if not t.isdigit() and len(t) > 1]
-    return " ".join(tokens).strip()
+    v = np.full(len(tamanhos), mask, dtype=np.uint64)
+    for j in range(int(tamanhos[-1]) if len(tamanhos) else 0):
+        k = int(np.searchsorted(tamanhos, j, side="right"))
+        vk = v[k:]
+        u = vk & tabela[colunas[j, k:]]
+        v[k:] = ((vk + u) | (vk - u)) & mask
+    return len(q) - _popcount(v).astype(np.int64)
 
 
-def _expand_query(nome_base: str) -> list[str]:
-    base = normalize_name(nome_base)
-    vars = [base]
-    for k, vs in _SINONIMOS.items():
-        if base == normalize_name(k):
-            vars.extend([normalize_name(v) for v in vs])
-    # remove duplicados preservando ordem
-    out = []
-    for x in vars:
-        if x not in out:
-            out.append(x)
-    return out
+class OfferIndex:
+    """
+    Índice das ofertas para o match por nome (monta uma vez, consulta várias):
+    - _clean_for_match de cada oferta calculado uma vez só
+    - ofertas com o mesmo nome limpo são pontuadas juntas
+    - nomes ordenados por tamanho: só entra quem tem tamanho compatível com
+      alguma variação da consulta, e desses só quem passa do teto de LCS
+      (calculado em NumPy para todos de uma vez). São os mesmos tetos exatos
+      de _melhor_score: o resultado é igual ao da varredura completa, e só
+      os poucos que sobram vão para o SequenceMatcher
+    """
+
+    def __init__(self, ofertas: Iterable[OfertaFornecedor]):
+        # OfertaStore já é indexável: não vira lista de views
+        self.ofertas = ofertas if isinstance(ofertas, OfertaStore) else list(ofertas)
+        self.nomes: list[str] = []                      # nomes limpos únicos
+        self.ofertas_do_nome: list[list[int]] = []      # nome -> posições em self.ofertas
+
+        pos_nome: dict[str, int] = {}
+        for i, o in enumerate(self.ofertas):
+            cand = _clean_for_match(o.nome_pdf)
+            if not cand:
+                continue
+
+            n = pos_nome.get(cand)
+            if n is None:
+                n = pos_nome[cand] = len(self.nomes)
+                self.nomes.append(cand)
+                self.ofertas_do_nome.append([])
+            self.ofertas_do_nome[n].append(i)
+
+        # nomes em ordem de tamanho, seus tamanhos (crescentes) e os bytes de
+        # cada nome por coluna (nome limpo é ASCII: _RE_PONTUACAO)
+        ordem = sorted(range(len(self.nomes)), key=lambda n: len(self.nomes[n]))
+        self.por_tamanho = np.array(ordem, dtype=np.uint32)
+        self.tamanhos = np.array([len(self.nomes[n]) for n in ordem], dtype=np.uint32)
+        largura = int(self.tamanhos[-1]) if len(ordem) else 0
+        bloco = b"".join(self.nomes[n].encode("ascii").ljust(largura, b"\0") for n in ordem)
+        self.colunas = np.frombuffer(bloco, dtype=np.uint8).reshape(len(ordem), largura).T.copy()
+
+    def __len__(self) -> int:
+        return len(self.ofertas)
+
+    def candidatos(self, qcleans: list[str], min_score: float) -> set[int]:
+        """Nomes cujos tetos (tamanho e LCS) permitem score >= min_score com alguma variação da consulta."""
+        achados = []
+        for q in qcleans:
+            la = len(q)
+            lo, hi = _janela_tamanhos(la, min_score)
+            # janela alargada em 1 contra arredondamento; o teto de LCS abaixo é o exato
+            ini = int(np.searchsorted(self.tamanhos, math.floor(lo) - 1, side="left"))
+            fim = int(np.searchsorted(self.tamanhos, math.ceil(hi) + 1, side="right"))
+            if ini >= fim:
+                continue
+            nomes = self.por_tamanho[ini:fim]
+            if la <= MAX_CONSULTA_LOTE:
+                tam = self.tamanhos[ini:fim].astype(np.int64)
+                lcs = _lcs_em_lote(q, self.colunas[:, ini:fim], tam)
+                # mesma conta (float64) do teto de _melhor_score
+                nomes = nomes[2.0 * lcs / (la + tam) >= min_score]
+            achados.append(nomes)
+        return set(np.concatenate(achados).tolist()) if achados else set()
+
+    def match(
+        self,
+        produto_nome: str,
+        top_n: Optional[int] = 20,
+        min_score: float = 0.52,
+        cache=None,
+    ) -> list[tuple[OfertaFornecedor, float]]:
+        qcleans = _queries_limpas(produto_nome)
+
+        # com corte <= 0 toda oferta entra no resultado: não dá pra filtrar
+        nomes = range(len(self.nomes)) if min_score <= 0 else self.candidatos(qcleans, min_score)
+
+        mascaras = _mascaras(qcleans)
+        scored: list[tuple[float, int]] = []
+        for n in nomes:
+            best_s = _melhor_score(qcleans, self.nomes[n], min_score, cache, mascaras)
+            if best_s >= min_score:
+                # (-score, posição): empate fica na ordem original das ofertas
+                scored.extend((-best_s, i) for i in self.ofertas_do_nome[n])
+
+        # top_n=None: todos acima do min_score
+        top = sorted(scored) if top_n is None else heapq.nsmallest(top_n, scored)
+        return [(self.ofertas[i], -s) for s, i in top]
 
 
 def match_ofertas_por_nome(
     produto_nome: str,
-    ofertas: list[OfertaFornecedor],
-    top_n: int = 20,
+    ofertas: list[OfertaFornecedor] | OfferIndex,
+    top_n: Optional[int] = 20,
     min_score: float = 0.52,
+    cache=None,
 ) -> list[tuple[OfertaFornecedor, float]]:
-    queries = _expand_query(produto_nome)
+    """
+    Ofertas com score >= min_score, da maior para a menor (top_n=None: todas).
+    cache: CacheScores opcional; pares (consulta, nome) já vistos não são recalculados.
+    """
+    if isinstance(ofertas, OfferIndex):
+        return ofertas.match(produto_nome, top_n=top_n, min_score=min_score, cache=cache)
+
+    qcleans = _queries_limpas(produto_nome)
+    mascaras = _mascaras(qcleans)
     scored: list[tuple[OfertaFornecedor, float]] = []
 
     for o in ofertas:
@@ -543,13 +880,7 @@ def match_ofertas_por_nome(
         if not cand:
             continue
 
-        best_s = 0.0
-        for q in queries:
-            qclean = _clean_for_match(q)
-            s = _similarity(qclean, cand)
-            if s > best_s:
-                best_s = s
-
+        best_s = _melhor_score(qcleans, cand, min_score, cache, mascaras)
         if best_s >= min_score:
             scored.append((o, best_s))
 
@@ -561,11 +892,20 @@ def match_ofertas_por_nome(
 
 def melhor_compra_para_produto(
     p: ProdutoDesejado,
-    ofertas: list[OfertaFornecedor],
+    ofertas: list[OfertaFornecedor] | OfferIndex,
     top_n: int = 20,
     min_score: float = 0.52,
+    cache=None,
+) -> Optional[dict]:
+    candidatos = match_ofertas_por_nome(p.nome_base, ofertas, top_n=top_n, min_score=min_score, cache=cache)
+    return melhor_entre_candidatos(p, candidatos)
+
+
+def melhor_entre_candidatos(
+    p: ProdutoDesejado,
+    candidatos: list[tuple[OfertaFornecedor, float]],
 ) -> Optional[dict]:
-    candidatos = match_ofertas_por_nome(p.nome_base, ofertas, top_n=top_n, min_score=min_score)
+    """Escolhe o menor custo total entre candidatos (oferta, score) já casados."""
     if not candidatos:
         return None
 
@@ -0,0 +1,170 @@
+# src/servico.py
+"""
+Serviço HTTP/JSON local em cima do MotorCotacao (só biblioteca padrão).
+
+Uso (de dentro de project/):
+    python -m src.servico                      # 127.0.0.1:8765
+    python -m src.servico --porta 9000 --snapshot
+
+Rotas:
+    GET  /estado       versão do catálogo, nº de ofertas, fornecedores
+    POST /cotacao      {"produto": "chia", "demanda": 35, "unidade": "kg", "alternativas": 0}
+    POST /cotacoes     {"itens": [{"produto": ..., "demanda": ..., "unidade": ...}, ...], "alternativas": 0}
+    POST /recarregar   reingere os PDFs e troca o catálogo (sem derrubar as consultas em andamento)
+
+Erros de entrada voltam 400 com {"erro": "..."}; erros inesperados, 500
+(também em JSON).
+"""
+import json
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from .motor import MotorCotacao
+
+# corpo máximo aceito (bytes): lotes grandes cabem, requisições absurdas não
+MAX_CORPO = 16 * 2**20
+
+
+def _item(d: dict) -> tuple:
+    if not isinstance(d, dict):
+        raise ValueError("Cada item precisa ser um objeto JSON.")
+    for campo in ("produto", "demanda"):
+        if campo not in d:
+            raise ValueError(f"Campo '{campo}' ausente.")
+    return d["produto"], d["demanda"], d.get("unidade", "kg")
+
+
+def _alternativas(corpo: dict) -> int:
+    n = corpo.get("alternativas", 0)
+    if isinstance(n, bool) or not isinstance(n, int) or n < 0:
+        raise ValueError(f"Campo 'alternativas' deve ser um inteiro >= 0. Recebido: {n!r}")
+    return n
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ServicoCotacao"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _responder(self, status: int, dados) -> None:
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _corpo(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n > MAX_CORPO:
+            raise ValueError(f"Corpo grande demais: {n} bytes")
+        if n == 0:
+            return {}
+        dados = json.loads(self.rfile.read(n).decode("utf-8"))
+        if not isinstance(dados, dict):
+            raise ValueError("O corpo precisa ser um objeto JSON.")
+        return dados
+
+    def do_GET(self):
+        if self.path == "/estado":
+            self._responder(200, self.server.motor.estado())
+        else:
+            self._responder(404, {"erro": f"Rota não encontrada: {self.path}"})
+
+    def do_POST(self):
+        motor = self.server.motor
+        try:
+            corpo = self._corpo()
+            alternativas = _alternativas(corpo)
+            if self.path == "/cotacao":
+                versao, (r,) = motor.cotar_lote([_item(corpo)], alternativas=alternativas)
+                self._responder(200, {"versao": versao, **r})
+            elif self.path == "/cotacoes":
+                itens = corpo.get("itens")
+                if not isinstance(itens, list):
+                    raise ValueError("Campo 'itens' precisa ser uma lista.")
+                versao, resultados = motor.cotar_lote([_item(d) for d in itens], alternativas=alternativas)
+                self._responder(200, {"versao": versao, "resultados": resultados})
+            elif self.path == "/recarregar":
+                motor.recarregar()
+                self._responder(200, motor.estado())
+            else:
+                self._responder(404, {"erro": f"Rota não encontrada: {self.path}"})
+        except (ValueError, TypeError) as e:
+            # json.JSONDecodeError também é ValueError
+            self._responder(400, {"erro": str(e)})
+        except Exception as e:
+            # erro inesperado (ou PDFs sumiram na recarga): responde em JSON em
+            # vez de derrubar a conexão; o traceback vai para o log do servidor
+            self.log_error("Erro em %s:\n%s", self.path, traceback.format_exc())
+            self._responder(500, {"erro": f"Erro interno: {e}"})
+
+
+class ServicoCotacao(ThreadingHTTPServer):
+    """
+    Servidor HTTP com uma thread por conexão; todas usam o mesmo motor.
+    shutdown() espera as requisições em andamento terminarem.
+    """
+
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, motor: MotorCotacao, host: str = "127.0.0.1", porta: int = 8765, quiet: bool = False):
+        self.motor = motor
+        self.quiet = quiet
+        super().__init__((host, porta), _Handler)
+
+
+def servir(
+    folder: Optional[str | Path] = None,
+    host: str = "127.0.0.1",
+    porta: int = 8765,
+    workers: Optional[int] = None,
+    detectar: bool = False,
+    snapshot: bool = False,
+    quiet: bool = False,
+) -> None:
+    if folder is None:
+        folder = Path(__file__).resolve().parents[1] / "data" / "fornecedores"
+
+    motor = MotorCotacao(folder, workers=workers, detectar=detectar, snapshot=snapshot)
+    estado = motor.estado()
+    print(f"Catálogo v{estado['versao']}: {estado['ofertas']} ofertas de {len(estado['fornecedores'])} fornecedores")
+
+    with ServicoCotacao(motor, host, porta, quiet=quiet) as srv:
+        print(f"Servindo em http://{host}:{srv.server_address[1]}")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Serviço local de cotação (HTTP/JSON).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--porta", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=None,
+                    help="processos para extrair os PDFs (padrão: nº de CPUs; 1 = sequencial)")
+    ap.add_argument("--detectar", action="store_true",
+                    help="escolhe o layout de todo PDF pela 1ª página (ignora o nome do arquivo)")
+    ap.add_argument("--snapshot", action="store_true",
+                    help="carrega ofertas e índice do snapshot binário (regrava se os PDFs mudaram)")
+    ap.add_argument("-q", "--quiet", action="store_true",
+                    help="não registra cada requisição")
+    args = ap.parse_args()
+
+    servir(
+        host=args.host,
+        porta=args.porta,
+        workers=args.workers,
+        detectar=args.detectar,
+        snapshot=args.snapshot,
+        quiet=args.quiet,
+    )
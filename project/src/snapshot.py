@@ -0,0 +1,352 @@
+# src/snapshot.py
+"""
+Snapshot binário do catálogo: ofertas parseadas + índice de match (OfferIndex).
+
+Carregar é só abrir o arquivo com mmap: nada é parseado nem copiado na carga,
+as colunas são lidas direto das páginas mapeadas (e processos que abrem o
+mesmo snapshot dividem essas páginas no cache do SO).
+
+Formato:
+    MAGIC (8 bytes) | tamanho do cabeçalho (uint32 LE) | cabeçalho JSON | seções
+- cabeçalho: versões (formato, extrator, parser, matcher), chaves dos PDFs de origem,
+  strings internadas e, por seção, [typecode, offset, quantidade]
+- seções: arrays crus (ordem de bytes da máquina, gravada no cabeçalho),
+  alinhadas em 8 bytes; textos em UTF-8 com offsets em bytes
+Snapshot de outra versão (ou de outros PDFs) é recusado com ValueError.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .domain import OfertaFornecedor
+from .ingest import chaves_pdfs, ingest_fornecedores
+from .io import EXTRACTOR_VERSION, MIN_PAGINAS_SHARD
+from .services import MATCHER_VERSION, PARSER_VERSION, OfferIndex
+from .store import OfertaStore
+
+MAGIC = b"OFSNAP\x00\x00"
+# mude quando o layout do arquivo mudar
+VERSAO_SNAPSHOT = 3
+
+_PREFIXO = struct.Struct("<8sI")
+
+
+def _alinhar(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# ---------------- gravação ----------------
+
+def _textos(textos: Iterable[str]) -> tuple[bytes, array]:
+    """Textos concatenados em UTF-8 + ponteiros (n + 1)."""
+    buf = bytearray()
+    ptr = array("Q", [0])
+    for t in textos:
+        buf += t.encode("utf-8")
+        ptr.append(len(buf))
+    return bytes(buf), ptr
+
+
+def _listas(listas: Iterable[Iterable[int]], typecode: str) -> tuple[array, array]:
+    """Listas de inteiros em CSR: ponteiros (n + 1) + valores."""
+    ptr = array("Q", [0])
+    val = array(typecode)
+    for lst in listas:
+        val.extend(lst)
+        ptr.append(len(val))
+    return ptr, val
+
+
+def salvar_snapshot(
+    path: str | Path,
+    ofertas: Iterable[OfertaFornecedor],
+    fontes: dict[str, dict],
+    index: Optional[OfferIndex] = None,
+) -> None:
+    """
+    Grava o snapshot (escrita atômica).
+    - fontes: chaves dos PDFs de origem (ver ingest.chaves_pdfs)
+    - index: OfferIndex montado sobre estas mesmas ofertas (opcional)
+    """
+    path = Path(path)
+    strings: list[str] = []
+    sid: dict[str, int] = {}
+
+    def _id(s: str) -> int:
+        i = sid.get(s)
+        if i is None:
+            i = sid[s] = len(strings)
+            strings.append(s)
+        return i
+
+    cols = {
+        "forn": array("I"), "tipo": array("I"),
+        "emb": array("d"), "preco": array("d"),
+        "linha_ini": array("Q"), "linha_fim": array("Q"),
+        "nome_ini": array("Q"), "nome_fim": array("Q"),
+    }
+    texto = bytearray()
+    por_forn: dict[str, int] = {}
+
+    for o in ofertas:
+        cols["forn"].append(_id(o.fornecedor))
+        cols["tipo"].append(_id(o.tipo_preco))
+        cols["emb"].append(float("nan") if o.embalagem_kg is None else o.embalagem_kg)
+        cols["preco"].append(float("nan") if o.preco_por_kg is None else o.preco_por_kg)
+        por_forn[o.fornecedor] = por_forn.get(o.fornecedor, 0) + 1
+
+        linha, nome = o.linha_origem, o.nome_pdf
+        ini = len(texto)
+        texto += linha.encode("utf-8")
+        cols["linha_ini"].append(ini)
+        cols["linha_fim"].append(len(texto))
+
+        # nome costuma ser pedaço da linha: guarda só o offset (em bytes)
+        k = linha.find(nome)
+        if k < 0:
+            n_ini = len(texto)
+            texto += nome.encode("utf-8")
+        else:
+            n_ini = ini + len(linha[:k].encode("utf-8"))
+        cols["nome_ini"].append(n_ini)
+        cols["nome_fim"].append(n_ini + len(nome.encode("utf-8")))
+
+    secoes: dict[str, array | bytes] = dict(cols)
+    secoes["texto"] = bytes(texto)
+
+    if index is not None:
+        if len(index) != len(cols["emb"]):
+            raise ValueError("Índice não corresponde às ofertas do snapshot")
+        secoes["nomes"], secoes["nomes_ptr"] = _textos(index.nomes)
+        secoes["odn_ptr"], secoes["odn"] = _listas(index.ofertas_do_nome, "Q")
+        secoes["por_tamanho"] = array("I", index.por_tamanho.tolist())
+        secoes["tamanhos"] = array("I", index.tamanhos.tolist())
+        secoes["colunas"] = index.colunas.tobytes()      # largura x nomes, por coluna
+
+    # offsets relativos ao início da área de dados
+    desc, pos = {}, 0
+    for nome, sec in secoes.items():
+        tc = sec.typecode if isinstance(sec, array) else "B"
+        desc[nome] = [tc, pos, len(sec)]
+        pos = _alinhar(pos + len(sec) * array(tc).itemsize)
+
+    cab = json.dumps({
+        "formato": VERSAO_SNAPSHOT,
+        "extrator": EXTRACTOR_VERSION,
+        "parser": PARSER_VERSION,
+        "matcher": MATCHER_VERSION,
+        "ordem": sys.byteorder,
+        "fontes": fontes,
+        "ofertas_por_fornecedor": por_forn,
+        "strings": strings,
+        "indice": index is not None,
+        "secoes": desc,
+    }, ensure_ascii=False).encode("utf-8")
+    inicio = _alinhar(_PREFIXO.size + len(cab))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    try:
+        with tmp.open("wb") as f:
+            f.write(_PREFIXO.pack(MAGIC, len(cab)))
+            f.write(cab)
+            for nome, sec in secoes.items():
+                f.seek(inicio + desc[nome][1])
+                f.write(sec if isinstance(sec, bytes) else sec.tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+# ---------------- leitura (mmap) ----------------
+
+class _Textos:
+    """Sequência de textos UTF-8 (buffer + ponteiros), decodificados sob demanda."""
+
+    __slots__ = ("_buf", "_ptr")
+
+    def __init__(self, buf: memoryview, ptr: memoryview):
+        self._buf = buf
+        self._ptr = ptr
+
+    def __len__(self) -> int:
+        return len(self._ptr) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._buf[self._ptr[i]:self._ptr[i + 1]], "utf-8")
+
+
+class _Listas:
+    """Listas de inteiros em CSR; [i] devolve uma fatia (sem cópia)."""
+
+    __slots__ = ("_ptr", "_val")
+
+    def __init__(self, ptr: memoryview, val: memoryview):
+        self._ptr = ptr
+        self._val = val
+
+    def __len__(self) -> int:
+        return len(self._ptr) - 1
+
+    def __getitem__(self, i: int) -> memoryview:
+        return self._val[self._ptr[i]:self._ptr[i + 1]]
+
+
+class _StoreMapeado(OfertaStore):
+    """OfertaStore somente leitura com as colunas no mmap do snapshot."""
+
+    def __init__(self, path: Path, strings: list[str], secao):
+        self._path = path
+        self._strings = [sys.intern(s) for s in strings]
+        self._str_id = {s: i for i, s in enumerate(self._strings)}
+        self._forn = secao("forn")
+        self._tipo = secao("tipo")
+        self._emb = secao("emb")
+        self._preco = secao("preco")
+        self._linha_ini = secao("linha_ini")
+        self._linha_fim = secao("linha_fim")
+        self._nome_ini = secao("nome_ini")
+        self._nome_fim = secao("nome_fim")
+        self._buf = secao("texto")
+        self._partes = []
+        self._tam = len(self._buf)
+
+    def append(self, o: OfertaFornecedor) -> None:
+        raise TypeError("Snapshot é somente leitura")
+
+    @property
+    def texto(self) -> str:
+        return str(self._buf, "utf-8")
+
+    def _fatia(self, ini: int, fim: int) -> str:
+        return str(self._buf[ini:fim], "utf-8")
+
+    def __reduce__(self):
+        # para outro processo: só o caminho (ele mapeia as mesmas páginas)
+        return (_ofertas_do_arquivo, (str(self._path),))
+
+
+class _IndexMapeado(OfferIndex):
+    """OfferIndex lido do snapshot (nada é remontado)."""
+
+    def __init__(self, path: Path, ofertas: _StoreMapeado, secao):
+        self._path = path
+        self.ofertas = ofertas
+        self.nomes = _Textos(secao("nomes"), secao("nomes_ptr"))
+        self.ofertas_do_nome = _Listas(secao("odn_ptr"), secao("odn"))
+        self.por_tamanho = np.frombuffer(secao("por_tamanho"), dtype=np.uint32)
+        self.tamanhos = np.frombuffer(secao("tamanhos"), dtype=np.uint32)
+        n = len(self.tamanhos)
+        self.colunas = np.frombuffer(secao("colunas"), dtype=np.uint8).reshape(-1 if n else 0, n)
+
+    def __reduce__(self):
+        return (_index_do_arquivo, (str(self._path),))
+
+
+class Snapshot:
+    """
+    Snapshot aberto. Uso:
+        snap = carregar_snapshot(path, fontes=chaves_pdfs(folder, fornecedores))
+        snap.ofertas   # OfertaStore (somente leitura)
+        snap.index     # OfferIndex (None se o snapshot foi gravado sem índice)
+    """
+
+    def __init__(self, path: Path, mm: mmap.mmap, cab: dict, inicio: int):
+        self.path = path
+        self.cabecalho = cab
+        self.fontes: dict[str, dict] = cab["fontes"]
+        self.ofertas_por_fornecedor: dict[str, int] = cab["ofertas_por_fornecedor"]
+        self._mm = mm
+        dados = memoryview(mm)[inicio:]
+
+        def secao(nome: str) -> memoryview:
+            tc, off, n = cab["secoes"][nome]
+            tam = n * array(tc).itemsize
+            return dados[off:off + tam].cast(tc)
+
+        self.ofertas = _StoreMapeado(path, cab["strings"], secao)
+        self.index = _IndexMapeado(path, self.ofertas, secao) if cab["indice"] else None
+
+
+def carregar_snapshot(path: str | Path, fontes: Optional[dict[str, dict]] = None) -> Snapshot:
+    """
+    Abre o snapshot com mmap. ValueError se for de outra versão do formato,
+    do extrator, dos parsers ou do match (o índice gravado depende dele), ou (com `fontes`) se os PDFs mudaram.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Snapshot não encontrado: {path}")
+
+    with path.open("rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if len(mm) < _PREFIXO.size:
+            raise ValueError(f"Snapshot inválido: {path.name}")
+        magic, n_cab = _PREFIXO.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Snapshot inválido: {path.name}")
+        cab = json.loads(mm[_PREFIXO.size:_PREFIXO.size + n_cab].decode("utf-8"))
+
+        versoes = (cab.get("formato"), cab.get("extrator"), cab.get("parser"), cab.get("matcher"), cab.get("ordem"))
+        if versoes != (VERSAO_SNAPSHOT, EXTRACTOR_VERSION, PARSER_VERSION, MATCHER_VERSION, sys.byteorder):
+            raise ValueError(f"Snapshot de outra versão: {path.name}")
+        if fontes is not None and cab["fontes"] != fontes:
+            raise ValueError(f"Snapshot desatualizado (PDFs mudaram): {path.name}")
+    except BaseException:
+        mm.close()
+        raise
+
+    return Snapshot(path, mm, cab, _alinhar(_PREFIXO.size + n_cab))
+
+
+def _ofertas_do_arquivo(path: str) -> OfertaStore:
+    return carregar_snapshot(path).ofertas
+
+
+def _index_do_arquivo(path: str) -> OfferIndex:
+    return carregar_snapshot(path).index
+
+
+def abrir_ou_gerar(
+    path: str | Path,
+    folder: str | Path,
+    workers: Optional[int] = None,
+    detectar: bool = False,
+    min_paginas_shard: int = MIN_PAGINAS_SHARD,
+) -> tuple[Snapshot, dict[str, dict]]:
+    """
+    Usa o snapshot se ele bate com os PDFs atuais; senão ingere tudo, grava
+    um snapshot novo (ofertas + OfferIndex) e abre esse.
+    Retorna (snapshot, tempos por fornecedor) como ingest_fornecedores.
+    """
+    folder = Path(folder)
+    fornecedores = sorted(p.stem for p in folder.glob("*.pdf"))
+    fontes = chaves_pdfs(folder, fornecedores, detectar=detectar)
+
+    try:
+        snap = carregar_snapshot(path, fontes=fontes)
+    except (FileNotFoundError, ValueError):
+        ofertas, tempos = ingest_fornecedores(
+            folder, fornecedores, workers=workers, detectar=detectar, min_paginas_shard=min_paginas_shard
+        )
+        salvar_snapshot(path, ofertas, fontes, index=OfferIndex(ofertas))
+        return carregar_snapshot(path), tempos
+
+    tempos = {
+        forn: {
+            "layout": fontes[forn]["layout"],
+            "ofertas": snap.ofertas_por_fornecedor.get(forn, 0),
+            "tempo_s": 0.0,
+            "snapshot": True,
+        }
+        for forn in fornecedores
+    }
+    return snap, tempos
@@ -0,0 +1,232 @@
+# src/store.py
+"""
+Armazenamento compacto das ofertas (em colunas).
+
+Cada OfertaFornecedor é um objeto com 6 campos e uma cópia da linha de origem.
+Com catálogos grandes isso é quase toda a memória do processo. Aqui:
+- embalagem_kg / preco_por_kg ficam em array('d') (None vira NaN)
+- fornecedor / tipo_preco são internados: a coluna guarda só o índice
+- linha_origem fica num texto único; cada oferta guarda (início, fim)
+- nome_pdf é um pedaço da própria linha (os parsers cortam o nome dela),
+  então também vira só (início, fim) nesse texto
+Para o resto do código, store[i] devolve uma OfertaView com os mesmos
+atributos de OfertaFornecedor.
+"""
+import bisect
+import math
+import sys
+from array import array
+from typing import Iterable, Iterator, Optional
+
+from .domain import OfertaFornecedor
+
+
+def _f(x: Optional[float]) -> float:
+    return math.nan if x is None else float(x)
+
+
+def _opt(x: float) -> Optional[float]:
+    return None if math.isnan(x) else x
+
+
+class OfertaView:
+    """Linha do OfertaStore com a mesma interface (somente leitura) de OfertaFornecedor."""
+
+    __slots__ = ("_s", "_i")
+
+    def __init__(self, store: "OfertaStore", i: int):
+        self._s = store
+        self._i = i
+
+    @property
+    def fornecedor(self) -> str:
+        return self._s._strings[self._s._forn[self._i]]
+
+    @property
+    def nome_pdf(self) -> str:
+        s, i = self._s, self._i
+        return s._fatia(s._nome_ini[i], s._nome_fim[i])
+
+    @property
+    def embalagem_kg(self) -> Optional[float]:
+        return _opt(self._s._emb[self._i])
+
+    @property
+    def preco_por_kg(self) -> Optional[float]:
+        return _opt(self._s._preco[self._i])
+
+    @property
+    def tipo_preco(self) -> str:
+        return self._s._strings[self._s._tipo[self._i]]
+
+    @property
+    def linha_origem(self) -> str:
+        s, i = self._s, self._i
+        return s._fatia(s._linha_ini[i], s._linha_fim[i])
+
+    def materializar(self) -> OfertaFornecedor:
+        return OfertaFornecedor(
+            fornecedor=self.fornecedor,
+            nome_pdf=self.nome_pdf,
+            embalagem_kg=self.embalagem_kg,
+            preco_por_kg=self.preco_por_kg,
+            tipo_preco=self.tipo_preco,
+            linha_origem=self.linha_origem,
+        )
+
+    def __eq__(self, other) -> bool:
+        # igualdade por conteúdo, como no dataclass
+        if isinstance(other, OfertaView):
+            other = other.materializar()
+        if isinstance(other, OfertaFornecedor):
+            return self.materializar() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.materializar())
+
+    def __repr__(self) -> str:
+        return repr(self.materializar())
+
+
+class OfertaStore:
+    """
+    Ofertas em colunas. Funciona como uma lista de ofertas (len, iter, [i]),
+    então serve direto para match_ofertas_por_nome / melhor_compra_para_produto.
+    """
+
+    def __init__(self, ofertas: Iterable[OfertaFornecedor] = ()):
+        self._strings: list[str] = []          # fornecedor / tipo_preco internados
+        self._str_id: dict[str, int] = {}
+        self._forn = array("I")
+        self._tipo = array("I")
+        self._emb = array("d")
+        self._preco = array("d")
+        self._linha_ini = array("Q")
+        self._linha_fim = array("Q")
+        self._nome_ini = array("Q")
+        self._nome_fim = array("Q")
+
+        # texto único guardado em blocos (com o offset de cada um): ler depois
+        # de um append junta só os pedaços novos, nunca o texto todo de novo
+        self._blocos: list[str] = []
+        self._inicios = array("Q")
+        self._partes: list[str] = []           # pedaços ainda não juntados num bloco
+        self._tam = 0
+
+        self.extend(ofertas)
+
+    # ---- escrita ----
+
+    def _sid(self, s: str) -> int:
+        i = self._str_id.get(s)
+        if i is None:
+            i = self._str_id[s] = len(self._strings)
+            self._strings.append(sys.intern(s))
+        return i
+
+    def _guardar(self, s: str) -> int:
+        ini = self._tam
+        self._partes.append(s)
+        self._tam += len(s)
+        return ini
+
+    def append(self, o: OfertaFornecedor) -> None:
+        self._forn.append(self._sid(o.fornecedor))
+        self._tipo.append(self._sid(o.tipo_preco))
+        self._emb.append(_f(o.embalagem_kg))
+        self._preco.append(_f(o.preco_por_kg))
+
+        linha, nome = o.linha_origem, o.nome_pdf
+        ini = self._guardar(linha)
+        self._linha_ini.append(ini)
+        self._linha_fim.append(ini + len(linha))
+
+        k = linha.find(nome)
+        if k < 0:
+            # nome não é pedaço da linha: guarda à parte
+            k = self._guardar(nome) - ini
+        self._nome_ini.append(ini + k)
+        self._nome_fim.append(ini + k + len(nome))
+
+    def extend(self, ofertas: Iterable[OfertaFornecedor]) -> None:
+        if type(ofertas) is OfertaStore:
+            self._extend_store(ofertas)
+            return
+        for o in ofertas:
+            self.append(o)
+
+    def _extend_store(self, other: "OfertaStore") -> None:
+        # concatena colunas: só remapeia as strings e desloca os offsets
+        remap = [self._sid(s) for s in other._strings]
+        self._forn.extend(remap[x] for x in other._forn)
+        self._tipo.extend(remap[x] for x in other._tipo)
+        self._emb.extend(other._emb)
+        self._preco.extend(other._preco)
+
+        base = self._tam
+        other._selar()
+        for bloco in other._blocos:
+            self._guardar(bloco)
+        for col, src in (
+            (self._linha_ini, other._linha_ini),
+            (self._linha_fim, other._linha_fim),
+            (self._nome_ini, other._nome_ini),
+            (self._nome_fim, other._nome_fim),
+        ):
+            col.extend(x + base for x in src)
+
+    def __iadd__(self, ofertas: Iterable[OfertaFornecedor]) -> "OfertaStore":
+        self.extend(ofertas)
+        return self
+
+    # ---- leitura ----
+
+    def _selar(self) -> None:
+        """Junta os pedaços pendentes num bloco novo."""
+        if self._partes:
+            self._inicios.append(self._tam - sum(map(len, self._partes)))
+            self._blocos.append("".join(self._partes))
+            self._partes = []
+
+    @property
+    def texto(self) -> str:
+        """Texto único com todas as linhas de origem (junta os blocos num só)."""
+        self._selar()
+        if len(self._blocos) > 1:
+            self._blocos = ["".join(self._blocos)]
+            self._inicios = array("Q", [0])
+        return self._blocos[0] if self._blocos else ""
+
+    def _fatia(self, ini: int, fim: int) -> str:
+        # linha e nome são guardados inteiros: a fatia cai sempre num bloco só
+        self._selar()
+        b = bisect.bisect_right(self._inicios, ini) - 1
+        off = self._inicios[b]
+        return self._blocos[b][ini - off:fim - off]
+
+    def __len__(self) -> int:
+        return len(self._emb)
+
+    def __getitem__(self, i: int) -> OfertaView:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("índice de oferta fora do intervalo")
+        return OfertaView(self, i)
+
+    def __iter__(self) -> Iterator[OfertaView]:
+        for i in range(len(self)):
+            yield OfertaView(self, i)
+
+    def __getstate__(self) -> dict:
+        self.texto  # um bloco só antes de serializar
+        return self.__dict__
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._strings = [sys.intern(s) for s in self._strings]
+
+    def materializar(self) -> list[OfertaFornecedor]:
+        return [v.materializar() for v in self]
@@ -0,0 +1,219 @@
+# src/tfidf.py
+"""
+Match em lote por TF-IDF de trigramas de caracteres (NumPy).
+
+Em vez de rodar SequenceMatcher produto a produto, monta:
+- matriz esparsa (CSC) nomes das ofertas x trigramas, com peso TF-IDF
+- consultas (produtos + sinônimos) x trigramas
+e calcula a similaridade de cosseno de todos os produtos contra todas as
+ofertas com um produto de matrizes por bloco de consultas.
+
+O score aqui é o cosseno TF-IDF (0..1), não o ratio do SequenceMatcher,
+por isso o corte padrão é outro (MIN_SCORE_TFIDF).
+"""
+import heapq
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .domain import OfertaFornecedor, ProdutoDesejado
+from .services import _clean_for_match, _queries_limpas, melhor_entre_candidatos
+from .store import OfertaStore
+
+MIN_SCORE_TFIDF = 0.4
+
+# células (consultas x nomes) calculadas por bloco: limita a memória
+_BLOCO_CELULAS = 1 << 22
+
+
+def _trigramas(clean: str) -> list[str]:
+    s = f" {clean} "
+    return [s[i:i + 3] for i in range(len(s) - 2)]
+
+
+class TfidfMatcher:
+    """
+    Monta uma vez a matriz TF-IDF das ofertas e casa listas de produtos
+    de uma vez só (match_lote).
+    """
+
+    def __init__(self, ofertas: Iterable[OfertaFornecedor]):
+        self.ofertas = ofertas if isinstance(ofertas, OfertaStore) else list(ofertas)
+
+        # nomes limpos únicos -> posições das ofertas
+        self.nomes: list[str] = []
+        self.ofertas_do_nome: list[list[int]] = []
+        pos_nome: dict[str, int] = {}
+        for i, o in enumerate(self.ofertas):
+            cand = _clean_for_match(o.nome_pdf)
+            if not cand:
+                continue
+            n = pos_nome.get(cand)
+            if n is None:
+                n = pos_nome[cand] = len(self.nomes)
+                self.nomes.append(cand)
+                self.ofertas_do_nome.append([])
+            self.ofertas_do_nome[n].append(i)
+
+        # primeira posição de cada nome (desempate igual ao OfferIndex)
+        self._primeira = np.array([ids[0] for ids in self.ofertas_do_nome], dtype=np.int64)
+
+        # vocabulário + contagens (nome, trigrama, tf)
+        self.vocab: dict[str, int] = {}
+        rows, cols, tfs = [], [], []
+        for n, nome in enumerate(self.nomes):
+            cont: dict[int, int] = {}
+            for g in _trigramas(nome):
+                t = self.vocab.setdefault(g, len(self.vocab))
+                cont[t] = cont.get(t, 0) + 1
+            rows.extend([n] * len(cont))
+            cols.extend(cont.keys())
+            tfs.extend(cont.values())
+
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        vals = np.array(tfs, dtype=np.float64)
+
+        n_nomes, n_termos = len(self.nomes), len(self.vocab)
+        df = np.bincount(cols, minlength=n_termos)
+        self.idf = np.log((1.0 + n_nomes) / (1.0 + df)) + 1.0
+
+        # peso tf-idf normalizado (L2) por nome
+        vals *= self.idf[cols]
+        norma = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=n_nomes))
+        vals /= norma[rows]
+
+        # CSC: para cada trigrama, os nomes que o contêm
+        ordem = np.argsort(cols, kind="stable")
+        self._indices = rows[ordem]
+        self._data = vals[ordem]
+        self._indptr = np.zeros(n_termos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=n_termos), out=self._indptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.ofertas)
+
+    def _vetor_consulta(self, qclean: str) -> tuple[np.ndarray, np.ndarray]:
+        """(termos, pesos) da consulta; trigramas fora do vocabulário não pontuam."""
+        cont: dict[int, int] = {}
+        total: dict[str, int] = {}
+        for g in _trigramas(qclean):
+            total[g] = total.get(g, 0) + 1
+        for g, c in total.items():
+            t = self.vocab.get(g)
+            if t is not None:
+                cont[t] = c
+
+        # a norma usa todos os trigramas (idf máximo para os desconhecidos),
+        # senão uma consulta com um só trigrama conhecido daria cosseno 1
+        idf_novo = np.log(1.0 + len(self.nomes)) + 1.0
+        norma2 = sum(
+            (c * (self.idf[self.vocab[g]] if g in self.vocab else idf_novo)) ** 2
+            for g, c in total.items()
+        )
+        termos = np.fromiter(cont.keys(), dtype=np.int64, count=len(cont))
+        pesos = np.fromiter(cont.values(), dtype=np.float64, count=len(cont))
+        if norma2 > 0:
+            pesos = pesos * self.idf[termos] / np.sqrt(norma2)
+        return termos, pesos
+
+    def _scores(self, linhas: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        """Matriz (consultas x nomes) de cossenos: Q @ O.T com O em CSC."""
+        n_nomes = len(self.nomes)
+        out = np.zeros(len(linhas) * n_nomes, dtype=np.float64)
+
+        r_list, t_list, w_list = [], [], []
+        for r, (termos, pesos) in enumerate(linhas):
+            r_list.append(np.full(len(termos), r, dtype=np.int64))
+            t_list.append(termos)
+            w_list.append(pesos)
+        if not t_list:
+            return out.reshape(len(linhas), n_nomes)
+
+        r_arr = np.concatenate(r_list)
+        t_arr = np.concatenate(t_list)
+        w_arr = np.concatenate(w_list)
+
+        # junta as colunas CSC de cada (consulta, trigrama) num vetor só
+        inicio = self._indptr[t_arr]
+        tam = self._indptr[t_arr + 1] - inicio
+        total = int(tam.sum())
+        if total == 0:
+            return out.reshape(len(linhas), n_nomes)
+        offs = np.repeat(inicio - np.cumsum(tam) + tam, tam) + np.arange(total)
+
+        flat = np.repeat(r_arr, tam) * n_nomes + self._indices[offs]
+        pesos = np.repeat(w_arr, tam) * self._data[offs]
+        out += np.bincount(flat, weights=pesos, minlength=out.size)
+        return out.reshape(len(linhas), n_nomes)
+
+    def match_lote(
+        self,
+        produtos_nomes: list[str],
+        top_n: Optional[int] = 20,
+        min_score: float = MIN_SCORE_TFIDF,
+    ) -> list[list[tuple[OfertaFornecedor, float]]]:
+        """
+        Casa todos os produtos de uma vez.
+        Retorna, para cada produto (na mesma ordem), [(oferta, score), ...]
+        do maior para o menor score, como match_ofertas_por_nome
+        (top_n=None: todas acima do min_score).
+        """
+        resultado: list[list[tuple[OfertaFornecedor, float]]] = []
+        n_nomes = len(self.nomes)
+        if n_nomes == 0:
+            return [[] for _ in produtos_nomes]
+
+        # consultas de cada produto (sinônimos viram linhas extras)
+        consultas = [_queries_limpas(nome) for nome in produtos_nomes]
+
+        bloco = max(1, _BLOCO_CELULAS // n_nomes)
+        i = 0
+        while i < len(consultas):
+            # junta produtos até encher o bloco de linhas
+            grupo, linhas = [], []
+            while i < len(consultas) and (not grupo or len(linhas) + len(consultas[i]) <= bloco):
+                grupo.append(len(linhas))
+                linhas.extend(self._vetor_consulta(q) for q in consultas[i])
+                i += 1
+
+            scores = self._scores(linhas)
+            # score do produto = melhor entre suas variações
+            por_produto = np.maximum.reduceat(scores, grupo, axis=0)
+
+            for row in por_produto:
+                resultado.append(self._top(row, top_n, min_score))
+
+        return resultado
+
+    def _top(self, row: np.ndarray, top_n: Optional[int], min_score: float) -> list[tuple[OfertaFornecedor, float]]:
+        ok = np.flatnonzero(row >= min_score)
+        if top_n is None:
+            pares = [(-float(row[n]), j) for n in ok for j in self.ofertas_do_nome[n]]
+            return [(self.ofertas[j], -s) for s, j in sorted(pares)]
+        if len(ok) > top_n:
+            # cada nome rende >= 1 oferta: bastam os top_n melhores nomes
+            # (+ empates com o último, que podem ter oferta mais antiga)
+            corte = np.partition(row[ok], len(ok) - top_n)[len(ok) - top_n]
+            ok = ok[row[ok] >= corte]
+
+        ordem = np.lexsort((self._primeira[ok], -row[ok]))
+        pares: list[tuple[float, int]] = []
+        for n in ok[ordem]:
+            s = float(row[n])
+            pares.extend((-s, j) for j in self.ofertas_do_nome[n])
+            if len(pares) >= top_n and -pares[top_n - 1][0] > s:
+                break
+        top = heapq.nsmallest(top_n, pares)
+        return [(self.ofertas[j], -s) for s, j in top]
+
+
+def melhor_compras_tfidf(
+    produtos: list[ProdutoDesejado],
+    matcher: TfidfMatcher,
+    top_n: int = 20,
+    min_score: float = MIN_SCORE_TFIDF,
+) -> list[Optional[dict]]:
+    """melhor_compra_para_produto para a lista inteira, com o match em lote."""
+    candidatos = matcher.match_lote([p.nome_base for p in produtos], top_n=top_n, min_score=min_score)
+    return [melhor_entre_candidatos(p, c) for p, c in zip(produtos, candidatos)]
@@ -0,0 +1,314 @@
+# src/vigia.py
+"""
+Modo daemon: vigia data/fornecedores e, quando um PDF chega, muda ou some,
+roda a rodada incremental (main(incremental=True)): só os PDFs alterados são
+extraídos/parseados e ofertas_extraidas.csv / compras_recomendadas.csv são
+regravados.
+
+Uso (de dentro de project/):
+    python -m src.vigia                   # inotify se houver, senão polling
+    python -m src.vigia --polling --intervalo 5
+
+- inotify (Linux, via ctypes) ou polling de stat() (tamanho + mtime)
+- debounce: o PDF só entra quando ficou `espera` segundos sem mudar e já
+  termina em %%EOF (arquivo ainda sendo copiado/enviado fica na fila)
+- métricas (fila, latência detecção -> CSV pronto, rodadas, erros) em
+  .cache/vigia.json a cada rodada
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .main import main
+
+# máscaras de inotify(7)
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_EVENTO = struct.Struct("iIII")  # wd, mask, cookie, len (+ nome)
+
+# o trailer do PDF fica no fim do arquivo (depois dele só espaços/quebras)
+_CAUDA_PDF = 1024
+
+
+def _assinatura(path: Path) -> Optional[tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _pdf_completo(path: Path) -> bool:
+    """Arquivo sumiu (remoção é mudança válida) ou já tem o %%EOF final."""
+    try:
+        with path.open("rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - _CAUDA_PDF))
+            return b"%%EOF" in f.read()
+    except FileNotFoundError:
+        return True
+
+
+class _Inotify:
+    """Eventos de inotify da pasta (nomes dos .pdf tocados)."""
+
+    def __init__(self, folder: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        mascara = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mascara) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch falhou: {folder}")
+        self.folder = folder
+
+    def eventos(self, timeout: float) -> Optional[set[str]]:
+        """Nomes tocados em até `timeout` s; None = fila do kernel estourou (rever tudo)."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        buf = os.read(self.fd, 64 * 1024)
+        nomes: set[str] = set()
+        i = 0
+        while i < len(buf):
+            _, mask, _, n = _EVENTO.unpack_from(buf, i)
+            i += _EVENTO.size
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            nome = os.fsdecode(buf[i:i + n].rstrip(b"\0"))
+            i += n
+            if nome.lower().endswith(".pdf"):
+                nomes.add(nome)
+        return nomes
+
+    def fechar(self) -> None:
+        os.close(self.fd)
+
+
+class _Polling:
+    """Compara tamanho + mtime dos .pdf a cada `timeout` s."""
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.vistos = self._listar()
+
+    def _listar(self) -> dict[str, tuple[int, int]]:
+        sigs = {p.name: _assinatura(p) for p in self.folder.glob("*.pdf")}
+        return {nome: s for nome, s in sigs.items() if s is not None}
+
+    def eventos(self, timeout: float) -> Optional[set[str]]:
+        time.sleep(timeout)
+        atuais = self._listar()
+        nomes = {n for n in atuais.keys() | self.vistos.keys() if atuais.get(n) != self.vistos.get(n)}
+        self.vistos = atuais
+        return nomes
+
+    def fechar(self) -> None:
+        pass
+
+
+class Vigia:
+    """
+    Uso:
+        v = Vigia(folder)
+        v.rodar()          # bloqueia; Ctrl+C para
+        v.metricas         # fila, latências, rodadas, erros
+    """
+
+    def __init__(
+        self,
+        folder: str | Path,
+        espera: float = 2.0,
+        intervalo: float = 1.0,
+        polling: bool = False,
+        workers: Optional[int] = None,
+        detectar: bool = False,
+        historico: bool = False,
+    ):
+        self.folder = Path(folder)
+        self.espera = espera
+        self.intervalo = intervalo
+        self.workers = workers
+        self.detectar = detectar
+        self.historico = historico
+        self.fonte = self._abrir_fonte(polling)
+        self.metricas_path = self.folder / ".cache" / "vigia.json"
+
+        # nome -> [1ª detecção, última mudança, assinatura]
+        self._pendentes: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self.metricas = {
+            "fonte": type(self.fonte).__name__.strip("_").lower(),
+            "rodadas": 0,
+            "pdfs_processados": 0,
+            "erros": 0,
+            "fila": 0,
+            "fila_max": 0,
+            "latencia_ultima_s": None,
+            "latencia_max_s": None,
+            "latencia_media_s": None,
+            "ingest_ultima_s": None,
+        }
+
+    def _abrir_fonte(self, polling: bool):
+        if not polling and sys.platform.startswith("linux"):
+            try:
+                return _Inotify(self.folder)
+            except (OSError, AttributeError):
+                pass  # sem inotify (libc sem o símbolo, limite de watches...)
+        return _Polling(self.folder)
+
+    def _marcar(self, nomes: set[str]) -> None:
+        agora = time.monotonic()
+        with self._lock:
+            for nome in nomes:
+                sig = _assinatura(self.folder / nome)
+                item = self._pendentes.get(nome)
+                if item is None:
+                    self._pendentes[nome] = [agora, agora, sig]
+                elif item[2] != sig:
+                    item[1], item[2] = agora, sig
+            self.metricas["fila"] = len(self._pendentes)
+            self.metricas["fila_max"] = max(self.metricas["fila_max"], len(self._pendentes))
+
+    def _observar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                nomes = self.fonte.eventos(self.intervalo)
+                if nomes is None:
+                    # inotify perdeu eventos: trata todos os PDFs como tocados
+                    nomes = {p.name for p in self.folder.glob("*.pdf")}
+                # polling não vê escrita em andamento: reconfere os pendentes
+                with self._lock:
+                    nomes |= self._pendentes.keys()
+                self._marcar(nomes)
+            except Exception as e:
+                # erro de leitura/stat (pasta remontada etc.): a detecção não
+                # pode morrer calada; conta, avisa e tenta de novo
+                with self._lock:
+                    self.metricas["erros"] += 1
+                print(f"[vigia] erro ao observar {self.folder}: {e!r}")
+                self._parar.wait(self.intervalo)
+
+    def _prontos(self) -> list[tuple[str, float]]:
+        """Tira da fila os PDFs estáveis há `espera` s; (nome, 1ª detecção)."""
+        agora = time.monotonic()
+        prontos = []
+        with self._lock:
+            for nome, (inicio, mudou, sig) in list(self._pendentes.items()):
+                path = self.folder / nome
+                if _assinatura(path) != sig:
+                    continue  # mudou de novo; _marcar atualiza
+                if agora - mudou >= self.espera and _pdf_completo(path):
+                    prontos.append((nome, inicio))
+                    del self._pendentes[nome]
+            self.metricas["fila"] = len(self._pendentes)
+        return prontos
+
+    def processar(self, prontos: list[tuple[str, float]]) -> None:
+        """Uma rodada incremental para o lote de PDFs prontos."""
+        if prontos:
+            print(f"\n[vigia] {len(prontos)} PDF(s) alterado(s):", ", ".join(sorted(n for n, _ in prontos)))
+        else:
+            print("\n[vigia] rodada inicial")
+        t0 = time.monotonic()
+        try:
+            main(
+                workers=self.workers, detectar=self.detectar, incremental=True, quiet=True,
+                historico=self.historico, folder=self.folder,
+            )
+        except Exception as e:
+            # PDF corrompido etc.: o daemon segue; o arquivo volta na próxima mudança
+            self.metricas["erros"] += 1
+            print(f"[vigia] erro na rodada: {e!r}")
+            return
+        fim = time.monotonic()
+
+        m = self.metricas
+        m["rodadas"] += 1
+        m["ingest_ultima_s"] = round(fim - t0, 3)
+        if not prontos:
+            return
+        latencias = [fim - inicio for _, inicio in prontos]
+        m["latencia_ultima_s"] = round(max(latencias), 3)
+        m["latencia_max_s"] = max(m["latencia_max_s"] or 0.0, m["latencia_ultima_s"])
+        media = m["latencia_media_s"] or 0.0
+        n = m["pdfs_processados"]
+        m["latencia_media_s"] = round((media * n + sum(latencias)) / (n + len(latencias)), 3)
+        m["pdfs_processados"] += len(prontos)
+
+    def salvar_metricas(self) -> None:
+        self.metricas_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.metricas_path.with_name(self.metricas_path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.metricas, indent=2), encoding="utf-8")
+        os.replace(tmp, self.metricas_path)
+
+    def rodar(self) -> None:
+        # alcança o que mudou com o daemon parado (estado incremental salvo)
+        self.processar([])
+        self.salvar_metricas()
+
+        observador = threading.Thread(target=self._observar, name="vigia-observador", daemon=True)
+        observador.start()
+        print(f"[vigia] observando {self.folder} ({self.metricas['fonte']}); Ctrl+C para sair")
+        try:
+            while not self._parar.is_set():
+                prontos = self._prontos()
+                if prontos:
+                    self.processar(prontos)
+                    self.salvar_metricas()
+                self._parar.wait(min(self.intervalo, self.espera / 2))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.parar()
+            observador.join()
+            self.fonte.fechar()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Vigia data/fornecedores e roda a ingestão incremental.")
+    ap.add_argument("--espera", type=float, default=2.0,
+                    help="segundos sem mudança antes de ingerir um PDF (debounce)")
+    ap.add_argument("--intervalo", type=float, default=1.0,
+                    help="período de checagem (polling) em segundos")
+    ap.add_argument("--polling", action="store_true",
+                    help="não usa inotify mesmo se disponível")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="processos para extrair os PDFs (padrão: nº de CPUs; 1 = sequencial)")
+    ap.add_argument("--detectar", action="store_true",
+                    help="escolhe o layout de todo PDF pela 1ª página (ignora o nome do arquivo)")
+    ap.add_argument("--historico", action="store_true",
+                    help="grava cada tabela nova no histórico de preços (data/historico_precos.sqlite)")
+    args = ap.parse_args()
+
+    folder = Path(__file__).resolve().parents[1] / "data" / "fornecedores"
+    Vigia(
+        folder,
+        espera=args.espera,
+        intervalo=args.intervalo,
+        polling=args.polling,
+        workers=args.workers,
+        detectar=args.detectar,
+        historico=args.historico,
+    ).rodar()
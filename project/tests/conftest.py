@@ -0,0 +1,37 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# os testes importam o pacote como `src` (igual a python -m src.main, de dentro de project/)
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_DIR))
+
+FORNECEDORES_DIR = PROJECT_DIR / "data" / "fornecedores"
+
+
+@pytest.fixture
+def pasta_pdfs(tmp_path):
+    """
+    Copia PDFs de exemplo para uma pasta temporária (sem cache de texto):
+    pasta_pdfs("fornecedor1") -> Path da pasta com fornecedor1.pdf.
+    """
+    def copiar(*nomes: str) -> Path:
+        for nome in nomes:
+            shutil.copy(FORNECEDORES_DIR / f"{nome}.pdf", tmp_path / f"{nome}.pdf")
+        return tmp_path
+
+    return copiar
+
+
+@pytest.fixture(scope="session")
+def catalogo():
+    """Ofertas dos quatro fornecedores, parseadas dos .txt de exemplo (sem PDF)."""
+    from src.services import LAYOUTS
+
+    ofertas = []
+    for nome in ("fornecedor1", "fornecedor2", "fornecedor3", "fornecedor4"):
+        texto = (FORNECEDORES_DIR / f"{nome}.txt").read_text(encoding="utf-8")
+        ofertas += LAYOUTS[nome].parser(texto, nome)
+    return ofertas
@@ -0,0 +1,48 @@
+import pytest
+
+from src.custo import ranking_compras
+from src.domain import OfertaFornecedor, ProdutoDesejado
+from src.services import OfferIndex, match_ofertas_por_nome, melhor_entre_candidatos
+
+
+def _oferta(forn, emb, preco):
+    return OfertaFornecedor(forn, "CHIA", emb, preco, "avista", f"CHIA {emb}KG {preco}")
+
+
+P = ProdutoDesejado("chia", 10.0)
+
+
+def test_empate_fica_com_o_candidato_que_veio_antes():
+    # os três custam R$ 50,00 para 10 kg; a ordem é a do match (maior score antes)
+    candidatos = [(_oferta("a", 10.0, 5.0), 0.9), (_oferta("b", 5.0, 5.0), 0.95), (_oferta("c", 2.0, 5.0), 0.8)]
+
+    melhor = melhor_entre_candidatos(P, candidatos)
+    assert melhor["fornecedor"] == "a"
+    assert [r["fornecedor"] for r in ranking_compras(P, candidatos, 3)] == ["a", "b", "c"]
+
+
+def test_empate_depois_de_arredondar_em_centavos():
+    # 50,004 e 50,001 viram 50,00: o primeiro ganha mesmo sendo o mais caro
+    candidatos = [(_oferta("a", 10.0, 5.0004), 0.9), (_oferta("b", 10.0, 5.0001), 0.9)]
+
+    assert melhor_entre_candidatos(P, candidatos)["fornecedor"] == "a"
+    assert ranking_compras(P, candidatos, 1)[0]["fornecedor"] == "a"
+
+
+def test_embalagem_invalida_nunca_e_escolhida():
+    candidatos = [(_oferta("a", 0.0, 1.0), 0.9), (_oferta("b", 25.0, 6.0), 0.9)]
+
+    assert melhor_entre_candidatos(P, candidatos)["fornecedor"] == "b"
+    assert [r["fornecedor"] for r in ranking_compras(P, candidatos, 5)] == ["b"]
+    assert melhor_entre_candidatos(P, []) is None
+    assert ranking_compras(P, [], 3) == []
+
+
+@pytest.mark.parametrize("demanda", [1.0, 17.0, 333.3])
+def test_ranking_vetorizado_igual_ao_loop_no_catalogo(catalogo, demanda):
+    index = OfferIndex(catalogo)
+    for nome in ("castanha do para", "chia", "aveia", "canela", "amendoim", "uva passa"):
+        p = ProdutoDesejado(nome, demanda)
+        candidatos = match_ofertas_por_nome(nome, index, top_n=None)
+        linhas = ranking_compras(p, candidatos, 1)
+        assert (linhas[0] if linhas else None) == melhor_entre_candidatos(p, candidatos), nome
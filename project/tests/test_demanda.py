@@ -0,0 +1,58 @@
+import csv
+
+import pytest
+
+from src.demanda import agregar, gravar_rateio, ratear
+from src.domain import ProdutoDesejado
+from src.io import iter_products_csv, tem_coluna_loja
+
+
+def test_repr_sem_loja_igual_ao_de_antes():
+    assert repr(ProdutoDesejado("chia", 35.0)) == "ProdutoDesejado(nome_base='chia', demanda_kg=35.0)"
+    assert repr(ProdutoDesejado("chia", 35.0, "centro")) == (
+        "ProdutoDesejado(nome_base='chia', demanda_kg=35.0, loja='centro')"
+    )
+
+
+def _csv_lojas(tmp_path):
+    path = tmp_path / "produtos.csv"
+    path.write_text(
+        "loja,produto,demanda,unidade\n"
+        "centro,Chia,10,kg\n"
+        "norte,Canela,3,kg\n"
+        "norte,chia,500,g\n"
+        "sul,Chia,4.5,kg\n"
+        "sul,Xyz,1,kg\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_agregar_soma_a_demanda_por_produto(tmp_path):
+    path = _csv_lojas(tmp_path)
+    assert tem_coluna_loja(path)
+
+    agregados, n_linhas, n_lojas = agregar(iter_products_csv(path))
+    assert agregados == [ProdutoDesejado("chia", 15.0), ProdutoDesejado("canela", 3.0), ProdutoDesejado("xyz", 1.0)]
+    assert (n_linhas, n_lojas) == (5, 3)
+
+
+def test_rateio_reparte_a_compra_consolidada(tmp_path):
+    path = _csv_lojas(tmp_path)
+    compra = {
+        "produto": "chia", "demanda_kg": 15.0, "fornecedor": "fornecedor1", "nome_pdf": "CHIA",
+        "preco_por_kg": 20.0, "qtd_comprada_kg": 20.0, "custo_total": 400.0,
+    }
+    saida = tmp_path / "compras_por_loja.csv"
+
+    # canela e xyz sem compra: ficam de fora
+    n = gravar_rateio(saida, iter_products_csv(path), {"chia": compra})
+
+    with saida.open(encoding="utf-8", newline="") as f:
+        linhas = list(csv.DictReader(f))
+    assert n == len(linhas) == 3
+    assert [(r["loja"], r["demanda_kg"]) for r in linhas] == [("centro", "10.0"), ("norte", "0.5"), ("sul", "4.5")]
+    # as lojas recebem e pagam tudo o que foi comprado, inclusive a sobra do pacote
+    assert sum(float(r["qtd_alocada_kg"]) for r in linhas) == pytest.approx(20.0, abs=1e-3)
+    assert sum(float(r["custo_rateado"]) for r in linhas) == pytest.approx(400.0, abs=0.02)
+    assert ratear(compra, ProdutoDesejado("chia", 10.0, "centro"))["custo_rateado"] == 266.67
@@ -0,0 +1,160 @@
+import datetime as dt
+import os
+
+import pytest
+
+from src import historico
+from src.domain import OfertaFornecedor
+from src.historico import HistoricoPrecos, _iso, data_da_tabela
+
+
+def _oferta(fornecedor, nome, preco, emb=25.0):
+    return OfertaFornecedor(fornecedor, nome, emb, preco, "avista", f"1 {nome} {emb} kg {preco}")
+
+
+@pytest.fixture
+def hist(tmp_path):
+    with HistoricoPrecos(tmp_path / "historico.sqlite") as h:
+        yield h
+
+
+@pytest.fixture
+def primeira_pagina(monkeypatch):
+    """Texto da 1ª página devolvido para qualquer PDF (e quantas vezes foi lido)."""
+    lidas = []
+
+    def definir(texto):
+        def extrair(path):
+            lidas.append(path)
+            return texto
+        monkeypatch.setattr(historico, "extract_first_page", extrair)
+        return lidas
+
+    return definir
+
+
+def _contagem(h):
+    con = h._con
+    return tuple(con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("tabelas", "precos", "termos"))
+
+
+def test_registrar_duas_vezes_o_mesmo_sha_nao_grava_nada(hist):
+    ofertas = [_oferta("f1", "CHIA 1KG", 20.0), _oferta("f1", "AVEIA EM FLOCOS", 8.0)]
+
+    assert hist.registrar("f1", "2025-04-01", "abc", ofertas) == 2
+    antes = _contagem(hist)
+    assert hist.registrar("f1", "2025-05-01", "abc", ofertas + [_oferta("f1", "ARROZ", 5.0)]) == 0
+    assert _contagem(hist) == antes
+    # o mesmo sha em outro fornecedor é outra tabela
+    assert hist.registrar("f2", "2025-04-01", "abc", ofertas) == 2
+
+
+def test_registrar_pasta_duas_vezes(hist, tmp_path, primeira_pagina):
+    for nome, conteudo in (("f1", b"pdf 1"), ("f2", b"pdf 2")):
+        (tmp_path / f"{nome}.pdf").write_bytes(conteudo)
+    ofertas = [_oferta("f1", "CHIA", 20.0), _oferta("f2", "CHIA", 18.0), _oferta("f2", "AVEIA", 7.0)]
+    tempos = {"f1": {"layout": "fornecedor1"}, "f2": {"layout": "fornecedor2"}}
+    lidas = primeira_pagina("TABELA DIA 01/04/2025")
+
+    assert hist.registrar_pasta(tmp_path, ofertas, tempos) == {"f1": 1, "f2": 2}
+    antes = _contagem(hist)
+    assert hist.registrar_pasta(tmp_path, ofertas, tempos) == {"f1": 0, "f2": 0}
+    assert _contagem(hist) == antes
+    assert len(lidas) == 2          # tabela já gravada: o PDF nem é aberto de novo
+
+    # PDF alterado vira tabela nova
+    (tmp_path / "f2.pdf").write_bytes(b"pdf 2 v2")
+    assert hist.registrar_pasta(tmp_path, ofertas, tempos) == {"f1": 0, "f2": 2}
+    assert [t["layout"] for t in hist.tabelas()] == ["fornecedor1", "fornecedor2", "fornecedor2"]
+
+
+def test_data_da_tabela_pula_data_invalida(tmp_path, primeira_pagina):
+    pdf = tmp_path / "f.pdf"
+    pdf.write_bytes(b"x")
+
+    primeira_pagina("Validade 31/02/2025 - Atualizado em: 27/10/2025")
+    assert data_da_tabela(pdf) == "2025-10-27"
+
+
+@pytest.mark.parametrize("texto", ["TABELA DE PREÇOS", "vencida em 31/02/2025", "cód. 12/345/6789"])
+def test_data_da_tabela_sem_data_valida_usa_a_do_arquivo(tmp_path, primeira_pagina, texto):
+    pdf = tmp_path / "f.pdf"
+    pdf.write_bytes(b"x")
+    quando = dt.datetime(2024, 3, 15, 12, 0).timestamp()
+    os.utime(pdf, (quando, quando))
+
+    primeira_pagina(texto)
+    assert data_da_tabela(pdf) == "2024-03-15"
+
+
+@pytest.fixture
+def com_tabelas(hist):
+    hist.registrar("f1", "2025-07-01", "a1", [
+        _oferta("f1", "SEMENTE DE CHIA", 20.0), _oferta("f1", "CHIA PRETA", 22.0),
+        _oferta("f1", "FARINHA TRIGO T1", 4.0),
+    ])
+    hist.registrar("f2", "2025-08-15", "b1", [
+        _oferta("f2", "CHIA SEED", 17.0), _oferta("f2", "FARINHA DE TRIGO", 4.5),
+        _oferta("f2", "SEMENTE DE GIRASSOL", 9.0),
+    ])
+    hist.registrar("f1", "2025-10-01", "a2", [
+        _oferta("f1", "SEMENTE DE CHIA", 19.0), _oferta("f1", "FARINHA TRIGO T1", 3.5),
+        _oferta("f1", "FARINHA DE TRIGO", None),
+    ])
+    return hist
+
+
+def test_tendencia_com_sinonimos_e_periodo(com_tabelas):
+    h = com_tabelas
+
+    assert h.tendencia("chia") == [
+        {"data_tabela": "2025-07-01", "fornecedor": "f1", "menor_preco_kg": 20.0, "preco_medio_kg": 21.0, "ofertas": 2},
+        {"data_tabela": "2025-08-15", "fornecedor": "f2", "menor_preco_kg": 17.0, "preco_medio_kg": 17.0, "ofertas": 1},
+        {"data_tabela": "2025-10-01", "fornecedor": "f1", "menor_preco_kg": 19.0, "preco_medio_kg": 19.0, "ofertas": 1},
+    ]
+    # "trigo farinha" (sinônimo) acha "FARINHA TRIGO T1", sem o "de"; sem preço não conta
+    assert [(r["data_tabela"], r["menor_preco_kg"], r["ofertas"]) for r in h.tendencia("farinha de trigo")] == [
+        ("2025-07-01", 4.0, 1), ("2025-08-15", 4.5, 1), ("2025-10-01", 3.5, 1),
+    ]
+    # intervalo inclusivo nas duas pontas; aceita date
+    assert [r["data_tabela"] for r in h.tendencia("chia", desde="2025-08-15", ate=dt.date(2025, 10, 1))] == [
+        "2025-08-15", "2025-10-01",
+    ]
+    assert [r["data_tabela"] for r in h.tendencia("chia", ate="2025-08-14")] == ["2025-07-01"]
+    assert h.tendencia("chia", fornecedor="f2")[0]["menor_preco_kg"] == 17.0
+    assert h.tendencia("quinoa") == []
+
+
+def test_melhor_preco_com_sinonimos_e_periodo(com_tabelas):
+    h = com_tabelas
+
+    assert h.melhor_preco("chia")["nome_pdf"] == "CHIA SEED"
+    assert h.melhor_preco("chia", desde="2025-09-01") == {
+        "fornecedor": "f1", "data_tabela": "2025-10-01", "nome_pdf": "SEMENTE DE CHIA",
+        "embalagem_kg": 25.0, "preco_por_kg": 19.0, "tipo_preco": "avista",
+    }
+    assert h.melhor_preco("farinha de trigo", ate="2025-08-31")["nome_pdf"] == "FARINHA TRIGO T1"
+    assert h.melhor_preco("chia", desde="2025-08-16", ate="2025-09-30") is None
+    with pytest.raises(ValueError):
+        h.melhor_preco("  ")
+
+
+@pytest.mark.parametrize("data,esperado", [
+    (None, None),
+    ("2025-04-01", "2025-04-01"),
+    (dt.date(2025, 4, 1), "2025-04-01"),
+    (dt.datetime(2025, 4, 1, 23, 59), "2025-04-01"),
+])
+def test_iso(data, esperado):
+    assert _iso(data) == esperado
+
+
+@pytest.mark.parametrize("data", ["2025-02-31", "01/04/2025", "2025-13-01", "ontem"])
+def test_iso_recusa_data_invalida(data):
+    with pytest.raises(ValueError, match="Data inválida"):
+        _iso(data)
+
+
+def test_periodo_invalido_na_consulta(com_tabelas):
+    with pytest.raises(ValueError, match="Data inválida"):
+        com_tabelas.tendencia("chia", desde="31/02/2025")
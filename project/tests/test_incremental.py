@@ -0,0 +1,44 @@
+import src.incremental as incremental
+from src.domain import ProdutoDesejado
+from src.incremental import IngestaoIncremental
+
+
+def test_candidatos_salvos_refeitos_quando_o_match_muda(pasta_pdfs, monkeypatch):
+    pasta = pasta_pdfs("fornecedor1")
+    produtos = [ProdutoDesejado("canela", 10.0)]
+
+    inc = IngestaoIncremental(pasta / ".cache" / "incremental.json")
+    inc.ingest(pasta, workers=1)
+    (esperado,) = inc.candidatos(produtos)
+    assert esperado
+
+    # marca o que está salvo: enquanto nada muda, é reusado
+    salvo = inc.estado["match"]["fornecedor1"]["produtos"]
+    salvo["canela"] = []
+    assert inc.candidatos(produtos) == [[]]
+
+    monkeypatch.setattr(incremental, "MATCHER_VERSION", "outra")
+    assert inc.candidatos(produtos) == [esperado]
+
+
+def test_pdf_reparseado_quando_parser_ou_perfil_mudam(pasta_pdfs, monkeypatch):
+    import dataclasses
+
+    import src.ingest as ingest
+    from src.services import LAYOUTS
+
+    pasta = pasta_pdfs("fornecedor1")
+    inc = IngestaoIncremental(pasta / ".cache" / "incremental.json")
+    inc.ingest(pasta, workers=1)
+    inc.ingest(pasta, workers=1)
+    assert inc.alterados == set()
+
+    monkeypatch.setattr(ingest, "PARSER_VERSION", "outra")
+    inc.ingest(pasta, workers=1)
+    assert inc.alterados == {"fornecedor1"}
+
+    layout = LAYOUTS["fornecedor1"]
+    perfil = dataclasses.replace(layout.extracao, versao=layout.extracao.versao + "-nova")
+    monkeypatch.setitem(LAYOUTS, "fornecedor1", dataclasses.replace(layout, extracao=perfil))
+    inc.ingest(pasta, workers=1)
+    assert inc.alterados == {"fornecedor1"}
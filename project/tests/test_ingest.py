@@ -0,0 +1,23 @@
+import shutil
+
+from src.ingest import ingest_fornecedores
+
+
+def _linhas(ofertas):
+    return [(o.fornecedor, o.nome_pdf, o.embalagem_kg, o.preco_por_kg, o.tipo_preco) for o in ofertas]
+
+
+def test_extracao_em_faixas_igual_a_sequencial(pasta_pdfs, tmp_path_factory):
+    # fornecedor1.pdf tem 4 páginas: com min_paginas_shard=2 e 2 workers vira 2 faixas
+    pasta = pasta_pdfs("fornecedor1")
+    outra = tmp_path_factory.mktemp("sequencial")
+    shutil.copy(pasta / "fornecedor1.pdf", outra / "fornecedor1.pdf")
+
+    ofertas, tempos = ingest_fornecedores(pasta, workers=2, min_paginas_shard=2)
+    esperadas, _ = ingest_fornecedores(outra, workers=1)
+
+    assert tempos["fornecedor1"]["faixas"] == 2
+    assert _linhas(ofertas) == _linhas(esperadas)
+    assert len(ofertas) > 0
+    # o cache de texto fica em .cache/: nada é gravado ao lado do PDF
+    assert sorted(p.name for p in pasta.iterdir()) == [".cache", "fornecedor1.pdf"]
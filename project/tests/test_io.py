@@ -0,0 +1,99 @@
+import csv
+
+import pytest
+
+import src.io as io_mod
+from src.io import (
+    PerfilExtracao,
+    _cache_lookup,
+    em_lotes,
+    gravar_cache_texto,
+    iter_products_chunks,
+    read_products_csv,
+    tem_coluna_loja,
+)
+
+LINHAS = [
+    ("Castanha do Pará", "20", "kg"),
+    ("Chia", "10", "kg"),
+    ("Aveia em flocos", "500", "g"),
+    ("Uva passa", "1,5", "kg"),
+    ("Canela", "3", "kg"),
+    ("Gergelim", "250", "g"),
+    ("Amendoim", "7", "kg"),
+]
+
+
+@pytest.fixture(params=[",", ";"])
+def produtos_csv(tmp_path, request):
+    path = tmp_path / "produtos.csv"
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=request.param)
+        w.writerow(["produto", "demanda", "unidade"])
+        w.writerows(LINHAS)
+    return path
+
+
+def test_lotes_juntos_iguais_ao_csv_inteiro(produtos_csv):
+    todos = read_products_csv(produtos_csv)
+    lotes = list(iter_products_chunks(produtos_csv, tamanho=3))
+
+    assert [len(lote) for lote in lotes] == [3, 3, 1]
+    assert [p for lote in lotes for p in lote] == todos
+    assert [p.demanda_kg for p in todos] == [20.0, 10.0, 0.5, 1.5, 3.0, 0.25, 7.0]
+    assert todos[0].nome_base == "castanha do para"
+    assert not tem_coluna_loja(produtos_csv)
+
+
+def test_em_lotes():
+    assert list(em_lotes(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(em_lotes([], 2)) == []
+    with pytest.raises(ValueError):
+        list(em_lotes([1], 0))
+
+
+def test_erro_na_linha_aparece_so_no_lote_dela(tmp_path):
+    path = tmp_path / "produtos.csv"
+    path.write_text("produto,demanda,unidade\nchia,1,kg\naveia,-2,kg\n", encoding="utf-8")
+    lotes = iter_products_chunks(path, tamanho=1)
+    assert next(lotes)[0].nome_base == "chia"
+    with pytest.raises(ValueError, match="Linha 3"):
+        next(lotes)
+
+
+@pytest.fixture
+def pdf(pasta_pdfs):
+    return pasta_pdfs("fornecedor1") / "fornecedor1.pdf"
+
+
+def _gravar(pdf, perfil=None):
+    key = _cache_lookup(pdf, perfil)
+    assert key is not None
+    gravar_cache_texto(pdf, key, "texto", perfil)
+    assert _cache_lookup(pdf, perfil) is None
+
+
+def test_cache_de_texto_vale_ate_o_extrator_mudar(pdf, monkeypatch):
+    _gravar(pdf)
+    monkeypatch.setattr(io_mod, "EXTRACTOR_VERSION", "outra")
+    assert _cache_lookup(pdf) is not None
+    # a entrada velha é descartada
+    assert not (pdf.parent / ".cache" / "fornecedor1.json").exists()
+
+
+def test_cache_de_texto_separado_e_invalidado_por_perfil(pdf):
+    perfil = PerfilExtracao("tabela")
+    _gravar(pdf)
+    # com perfil o texto é outro: não reusa o do PDF inteiro
+    assert _cache_lookup(pdf, perfil) is not None
+    _gravar(pdf, perfil)
+    assert _cache_lookup(pdf) is None
+
+    assert _cache_lookup(pdf, PerfilExtracao("tabela", versao="2")) is not None
+
+
+def test_cache_de_texto_invalidado_quando_o_pdf_muda(pdf):
+    _gravar(pdf)
+    with pdf.open("ab") as f:
+        f.write(b"\n")
+    assert _cache_lookup(pdf) is not None
@@ -0,0 +1,39 @@
+import pytest
+
+from src.ingest import layout_para_pdf
+from src.io import extract_first_page
+from src.services import LAYOUTS, detectar_layout
+
+from conftest import FORNECEDORES_DIR
+
+NOMES = ["fornecedor1", "fornecedor2", "fornecedor3", "fornecedor4"]
+
+
+@pytest.fixture(scope="module")
+def primeiras_paginas():
+    return {nome: extract_first_page(FORNECEDORES_DIR / f"{nome}.pdf") for nome in NOMES}
+
+
+@pytest.mark.parametrize("nome", NOMES)
+def test_cada_pdf_detectado_como_o_proprio_layout(primeiras_paginas, nome):
+    layout = detectar_layout(primeiras_paginas[nome])
+    assert layout is not None
+    assert layout.nome == nome
+    assert layout_para_pdf(FORNECEDORES_DIR / f"{nome}.pdf", detectar=True) is LAYOUTS[nome]
+
+
+@pytest.mark.parametrize("nome", NOMES)
+def test_assinatura_casa_so_com_o_proprio_pdf(primeiras_paginas, nome):
+    assinatura = LAYOUTS[nome].assinatura
+    assert [n for n, texto in primeiras_paginas.items() if assinatura.search(texto)] == [nome]
+
+
+@pytest.mark.parametrize("nome", [n for n in NOMES if LAYOUTS[n].extracao is not None])
+def test_perfil_vem_do_mesmo_pdf_da_assinatura(primeiras_paginas, nome):
+    # o marcador de início do recorte está na 1ª página do PDF do próprio layout
+    perfil = LAYOUTS[nome].extracao
+    linhas = primeiras_paginas[nome].splitlines()
+    assert any(perfil.inicio.search(ln) for ln in linhas)
+    for outro in NOMES:
+        if outro != nome:
+            assert not any(perfil.inicio.search(ln) for ln in primeiras_paginas[outro].splitlines())
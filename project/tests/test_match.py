@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from src.domain import OfertaFornecedor, ProdutoDesejado
+from src.services import OfferIndex, match_ofertas_por_nome, melhor_compra_para_produto
+
+# casos em que o índice por token/prefixo perdia ofertas da varredura completa
+CONSULTAS_FIXAS = ["aveia", "alho poro em", "aromafumacapo", "castanha do para", "chia", "xyz"]
+
+
+@pytest.fixture(scope="module")
+def consultas(catalogo):
+    random.seed(7)
+    amostra = random.sample(catalogo, 30)
+    # nomes do catálogo inteiros, cortados e sem espaços (pegam tamanhos variados)
+    return CONSULTAS_FIXAS + [
+        v for o in amostra
+        for v in (o.nome_pdf.lower(), o.nome_pdf.lower()[:12], o.nome_pdf.lower().replace(" ", ""))
+    ]
+
+
+def _linhas(resultado):
+    return [(id(o), s) for o, s in resultado]
+
+
+@pytest.mark.parametrize("top_n,min_score", [(20, 0.52), (None, 0.52), (8, 0.3)])
+def test_indice_igual_a_varredura(catalogo, consultas, top_n, min_score):
+    index = OfferIndex(catalogo)
+    for q in consultas:
+        esperado = match_ofertas_por_nome(q, catalogo, top_n=top_n, min_score=min_score)
+        obtido = match_ofertas_por_nome(q, index, top_n=top_n, min_score=min_score)
+        assert _linhas(obtido) == _linhas(esperado), q
+
+
+def test_melhor_compra_igual_com_indice(catalogo, consultas):
+    index = OfferIndex(catalogo)
+    for q in consultas:
+        p = ProdutoDesejado(q, 17.0)
+        assert melhor_compra_para_produto(p, index) == melhor_compra_para_produto(p, catalogo), q
+
+
+def test_cache_de_scores_so_ve_pares_que_passam_dos_tetos(catalogo, consultas):
+    from src.cache_scores import CacheScores
+
+    index = OfferIndex(catalogo)
+    cache = CacheScores()
+    frio = [match_ofertas_por_nome(q, index, cache=cache) for q in consultas]
+    cache.hits = cache.misses = 0
+    quente = [match_ofertas_por_nome(q, index, cache=cache) for q in consultas]
+
+    # na 2ª passada todo par consultado já está no cache (os cortados pelos tetos nem chegam nele)
+    assert cache.misses == 0
+    assert cache.hits > 0
+    assert [_linhas(r) for r in quente] == [_linhas(r) for r in frio]
+    assert [_linhas(r) for r in frio] == [_linhas(match_ofertas_por_nome(q, index)) for q in consultas]
+
+
+def test_cache_de_scores_de_outra_versao_do_match_e_descartado(tmp_path, monkeypatch):
+    import src.cache_scores as cache_scores
+    from src.cache_scores import CacheScores
+
+    cache = CacheScores(tmp_path / "scores.json")
+    match_ofertas_por_nome("chia", [OfertaFornecedor("f", "CHIA PRETA", 1.0, 10.0, "avista", "CHIA PRETA")], cache=cache)
+    cache.salvar()
+    assert len(CacheScores(tmp_path / "scores.json")) == len(cache) > 0
+
+    monkeypatch.setattr(cache_scores, "MATCHER_VERSION", "outra")
+    assert len(CacheScores(tmp_path / "scores.json")) == 0
@@ -0,0 +1,66 @@
+import random
+import re
+import unicodedata
+
+import pytest
+
+from src.io import normalize_name
+from src.services import _STOPWORDS, _clean_for_match
+
+# ASCII, acentos do Latin-1, outros Unicode (ß, ligadura ﬁ, K de kelvin,
+# İ, ½, ª) e marcas combinantes soltas; espaços de vários tipos
+ALFABETO = (
+    list("abcXYZ019 -().,/%")
+    + list("áàâãäçéêíóôõúüñÁÀÂÃÇÉÊÍÓÔÕÚÑªº°")
+    + ["ß", "ẞ", "ﬁ", "ﬀ", "\u212a", "İ", "ı", "½", "²", "µ", "ø", "æ", "œ"]
+    + ["\u0301", "\u0303", "\u0327", "\u0308"]   # agudo, til, cedilha, trema
+    + ["\t", "\n", "\xa0", "\u2003", "  "]
+)
+FIXOS = ["", "   ", "AÇÚCAR  MASCAVO", "açúcar mascavo", "Café", "Straße", "ﬁbra", "\u212aG", "feijão (carioca) 1kg"]
+
+
+def _normalize_nfkd(text: str) -> str:
+    """normalize_name sem o atalho para ASCII (o corpo original)."""
+    text = text.strip().lower()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.split())
+
+
+def _clean_nfkd(s: str) -> str:
+    """_clean_for_match original (sem cache, sobre _normalize_nfkd)."""
+    s = _normalize_nfkd(s)
+    s = re.sub(r"\(.*?\)", " ", s)
+    s = re.sub(r"[^a-z0-9\s]", " ", s)
+    tokens = [t for t in s.split() if t not in _STOPWORDS]
+    tokens = [t for t in tokens if not t.isdigit() and len(t) > 1]
+    return " ".join(tokens).strip()
+
+
+def _amostras(n: int, seed: int, alfabeto=ALFABETO):
+    rnd = random.Random(seed)
+    return FIXOS + ["".join(rnd.choice(alfabeto) for _ in range(rnd.randint(1, 24))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("alfabeto", [
+    [c for c in ALFABETO if c.isascii()],           # só o atalho
+    ALFABETO,                                       # misturado: cai na NFKD
+])
+def test_normalize_name_igual_a_nfkd(alfabeto):
+    for s in _amostras(3000, 1, alfabeto):
+        assert normalize_name(s) == _normalize_nfkd(s), repr(s)
+
+
+def test_clean_for_match_igual_ao_original():
+    for s in _amostras(3000, 2):
+        # duas vezes: a segunda vem do cache
+        assert _clean_for_match(s) == _clean_nfkd(s), repr(s)
+        assert _clean_for_match(s) == _clean_nfkd(s), repr(s)
+
+
+def test_casos_fora_do_latin1():
+    assert normalize_name(" Straße ") == "straße"
+    assert normalize_name("ﬁbra") == "fibra"
+    assert normalize_name("\u212aG") == "kg"            # K de kelvin: lower() já é ASCII
+    assert normalize_name("Café  do Pará") == "cafe do para"
+    assert _clean_for_match("Straße ﬁna") == "stra fina"
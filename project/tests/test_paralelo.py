@@ -0,0 +1,35 @@
+import gc
+
+import pytest
+
+from src.domain import ProdutoDesejado
+from src.paralelo import MatchParalelo
+from src.services import OfferIndex, melhor_compra_para_produto
+
+PRODUTOS = [ProdutoDesejado(n, 12.0) for n in ("canela", "aveia", "chia", "castanha do para", "xyz")]
+
+
+@pytest.fixture(scope="module")
+def index(catalogo):
+    return OfferIndex(catalogo)
+
+
+def test_rankings_iguais_ao_sequencial(index):
+    with MatchParalelo(index, processos=2) as pool:
+        rankings = pool.rankings(PRODUTOS)
+
+    esperado = [melhor_compra_para_produto(p, index) for p in PRODUTOS]
+    assert [r[0] if r else None for r in rankings] == esperado
+    assert gc.get_freeze_count() == 0
+
+
+def test_nao_descongela_o_que_quem_chamou_congelou(index):
+    gc.freeze()
+    try:
+        congelados = gc.get_freeze_count()
+        assert congelados > 0
+        with MatchParalelo(index, processos=2) as pool:
+            pool.rankings(PRODUTOS[:1])
+        assert gc.get_freeze_count() == congelados
+    finally:
+        gc.unfreeze()
@@ -0,0 +1,81 @@
+import csv
+from collections import Counter
+
+import pytest
+
+from src.ingest import sem_duplicadas
+from src.services import LAYOUTS
+
+from conftest import FORNECEDORES_DIR, PROJECT_DIR
+
+NOMES = ["fornecedor1", "fornecedor2", "fornecedor3", "fornecedor4"]
+
+# saída dos parsers originais (antes das otimizações) sobre os .txt de exemplo
+ESPERADAS = PROJECT_DIR / "tests" / "dados" / "ofertas_esperadas.csv"
+
+
+def _num(x: str):
+    return None if x == "" else float(x)
+
+
+@pytest.fixture(scope="module")
+def esperadas():
+    por_forn: dict[str, list[tuple]] = {}
+    with ESPERADAS.open(encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            por_forn.setdefault(r["fornecedor"], []).append((
+                r["nome_pdf"], _num(r["embalagem_kg"]), _num(r["preco_por_kg"]), r["tipo_preco"], r["linha_origem"],
+            ))
+    return por_forn
+
+
+def _linhas(ofertas):
+    return [(o.nome_pdf, o.embalagem_kg, o.preco_por_kg, o.tipo_preco, o.linha_origem) for o in ofertas]
+
+
+def _texto(nome):
+    return (FORNECEDORES_DIR / f"{nome}.txt").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("nome", NOMES)
+def test_parser_igual_ao_original(esperadas, nome):
+    assert _linhas(LAYOUTS[nome].parser(_texto(nome), nome)) == esperadas[nome]
+
+
+@pytest.mark.parametrize("nome", NOMES)
+def test_parser_em_linhas_igual_ao_texto_inteiro(esperadas, nome):
+    # a ingestão em streaming entrega linha a linha (sem o texto inteiro)
+    linhas = iter(_texto(nome).splitlines())
+    assert _linhas(LAYOUTS[nome].parser(linhas, nome)) == esperadas[nome]
+
+
+def test_contadores_do_parser(esperadas):
+    contadores = Counter()
+    list(LAYOUTS["fornecedor2"].parser(_texto("fornecedor2"), "fornecedor2", contadores=contadores))
+    assert contadores["parsed"] == len(esperadas["fornecedor2"])
+
+
+def test_sem_duplicadas_fica_com_a_primeira(catalogo):
+    contadores = Counter()
+    unicas = list(sem_duplicadas(catalogo, contadores))
+
+    assert len(unicas) + contadores["duplicadas"] == len(catalogo)
+    assert contadores["duplicadas"] > 0
+    # a ordem do PDF é mantida (subsequência do catálogo)
+    posicao = {id(o): i for i, o in enumerate(catalogo)}
+    assert [posicao[id(o)] for o in unicas] == sorted(posicao[id(o)] for o in unicas)
+    assert list(sem_duplicadas(unicas)) == unicas
+
+
+@pytest.mark.parametrize("linha, nome, kg", [
+    # inteiro colado no número anterior por um separador: a regex original
+    # lia só o último par ("234,56"), e o nome perdia esse mesmo pedaço
+    ("123 ARROZ 1.234,56 KG R$ 5,00", "123 ARROZ 1.", 234.56),
+    ("123 ARROZ 1.2.5kg R$ 5,00", "123 ARROZ 1.", 2.5),
+    ("123 ARROZ 1.234,56KGS 5 KG R$ 5,00", "123 ARROZ 1.", 5.0),
+    ("123 ARROZ 12,5.0 KG R$ 5,00", "123 ARROZ 12,", 5.0),
+    ("123 ARROZ 1,5 KG R$ 5,00", "123 ARROZ", 1.5),
+])
+def test_numero_com_separador_de_milhar_como_o_original(linha, nome, kg):
+    [o] = LAYOUTS["fornecedor4"].parser(linha, "fornecedor4")
+    assert (o.nome_pdf, o.embalagem_kg) == (nome, kg)
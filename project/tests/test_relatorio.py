@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from src.relatorio import RelatorioExecucao, pico_rss_mb
+
+pytestmark = pytest.mark.skipif(pico_rss_mb() is None, reason="ru_maxrss só existe em Unix")
+
+
+def test_rss_por_etapa_e_delta_e_nao_o_pico_da_vida_do_processo(tmp_path):
+    rel = RelatorioExecucao()
+    # maior que o pico atual: a etapa com certeza sobe o pico do processo
+    n_mb = int(pico_rss_mb()) + 64
+
+    with rel.etapa("grande"):
+        bloco = b"x" * (n_mb * 2**20)
+        del bloco
+    with rel.etapa("pequena"):
+        sum(range(1000))
+
+    grande, pequena = rel.etapas["grande"], rel.etapas["pequena"]
+    assert grande["pico_rss_delta_mb"] >= 32
+    # a etapa seguinte não herda o pico da anterior no delta, só no acumulado
+    assert pequena["pico_rss_delta_mb"] < 1
+    assert pequena["pico_rss_acumulado_mb"] >= grande["pico_rss_acumulado_mb"]
+
+    rel.salvar(tmp_path / "rel.json")
+    etapas = json.loads((tmp_path / "rel.json").read_text(encoding="utf-8"))["etapas"]
+    assert "pico_rss_mb" not in etapas["grande"]
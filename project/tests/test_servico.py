@@ -0,0 +1,102 @@
+import http.client
+import json
+import shutil
+import threading
+
+import pytest
+
+from src.motor import MotorCotacao
+from src.servico import ServicoCotacao
+
+from conftest import FORNECEDORES_DIR
+
+
+@pytest.fixture(scope="module")
+def motor(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("fornecedores")
+    shutil.copy(FORNECEDORES_DIR / "fornecedor1.pdf", pasta / "fornecedor1.pdf")
+    return MotorCotacao(pasta, workers=1)
+
+
+@pytest.fixture(scope="module")
+def servidor(motor):
+    # porta 0: o SO escolhe uma livre
+    srv = ServicoCotacao(motor, porta=0, quiet=True)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def cliente(servidor):
+    conn = http.client.HTTPConnection("127.0.0.1", servidor.server_address[1], timeout=30)
+    yield conn
+    conn.close()
+
+
+def _post(conn, rota, corpo):
+    dados = corpo if isinstance(corpo, bytes) else json.dumps(corpo).encode("utf-8")
+    conn.request("POST", rota, body=dados, headers={"Content-Type": "application/json"})
+    r = conn.getresponse()
+    return r.status, json.loads(r.read())
+
+
+def test_estado(cliente):
+    cliente.request("GET", "/estado")
+    r = cliente.getresponse()
+    estado = json.loads(r.read())
+    assert r.status == 200
+    assert estado["versao"] == 1
+    assert estado["fornecedores"]["fornecedor1"] == estado["ofertas"] > 0
+
+
+def test_cotacao_igual_ao_motor(cliente, motor):
+    status, r = _post(cliente, "/cotacao", {"produto": "canela", "demanda": 35})
+    assert status == 200
+    assert r["melhor"] == motor.cotar("canela", 35)
+    assert r["melhor"]["fornecedor"] == "fornecedor1"
+
+
+@pytest.mark.parametrize("corpo", [
+    {"produto": ["a"], "demanda": 1},
+    {"produto": "canela", "demanda": [1]},
+    {"produto": "canela", "demanda": True},
+    {"produto": "canela", "demanda": "muito"},
+    {"produto": "canela", "demanda": 1, "unidade": 3},
+    {"produto": "canela", "demanda": 1, "alternativas": "2"},
+    {"produto": "canela"},
+])
+def test_tipos_invalidos_voltam_400(cliente, corpo):
+    status, r = _post(cliente, "/cotacao", corpo)
+    assert status == 400
+    assert r["erro"]
+
+
+@pytest.mark.parametrize("demanda", [b"NaN", b"Infinity", b"-Infinity", b"1e999"])
+def test_demanda_nao_finita_volta_400(cliente, demanda):
+    status, r = _post(cliente, "/cotacao", b'{"produto": "canela", "demanda": ' + demanda + b"}")
+    assert status == 400
+    assert "finito" in r["erro"]
+
+
+def test_item_invalido_no_lote_volta_400(cliente):
+    itens = [{"produto": "canela", "demanda": 1}, {"produto": None, "demanda": 1}]
+    status, r = _post(cliente, "/cotacoes", {"itens": itens})
+    assert status == 400
+
+
+def test_erro_inesperado_volta_500_e_conexao_continua(cliente, motor, monkeypatch):
+    def falha(*args, **kwargs):
+        raise RuntimeError("quebrou")
+
+    monkeypatch.setattr(motor, "cotar_lote", falha)
+    status, r = _post(cliente, "/cotacao", {"produto": "canela", "demanda": 1})
+    assert status == 500
+    assert "quebrou" in r["erro"]
+
+    # a mesma conexão (keep-alive) continua respondendo
+    monkeypatch.undo()
+    status, r = _post(cliente, "/cotacao", {"produto": "canela", "demanda": 1})
+    assert status == 200
@@ -0,0 +1,42 @@
+import pytest
+
+import src.snapshot as snapshot
+from src.services import OfferIndex, match_ofertas_por_nome
+from src.snapshot import carregar_snapshot, salvar_snapshot
+
+
+@pytest.fixture
+def arquivo(tmp_path, catalogo):
+    path = tmp_path / "catalogo.snap"
+    salvar_snapshot(path, catalogo, fontes={}, index=OfferIndex(catalogo))
+    return path
+
+
+def test_snapshot_de_outra_versao_do_match_e_recusado(arquivo, monkeypatch):
+    assert carregar_snapshot(arquivo).index is not None
+
+    monkeypatch.setattr(snapshot, "MATCHER_VERSION", "outra")
+    with pytest.raises(ValueError, match="outra versão"):
+        carregar_snapshot(arquivo)
+
+
+def _linhas(ofertas):
+    return [(o.fornecedor, o.nome_pdf, o.embalagem_kg, o.preco_por_kg, o.tipo_preco, o.linha_origem) for o in ofertas]
+
+
+def test_snapshot_sobrevive_a_gravar_e_carregar(arquivo, catalogo):
+    snap = carregar_snapshot(arquivo, fontes={})
+    index = OfferIndex(catalogo)
+
+    assert _linhas(snap.ofertas) == _linhas(catalogo)
+    assert list(snap.index.nomes) == index.nomes
+    assert [list(ids) for ids in snap.index.ofertas_do_nome] == index.ofertas_do_nome
+    for q in ("aveia", "castanha do para", "alho poro em", "chia", "xyz"):
+        carregado = [(o.nome_pdf, o.preco_por_kg, s) for o, s in match_ofertas_por_nome(q, snap.index, top_n=None)]
+        original = [(o.nome_pdf, o.preco_por_kg, s) for o, s in match_ofertas_por_nome(q, index, top_n=None)]
+        assert carregado == original, q
+
+
+def test_snapshot_de_outros_pdfs_e_recusado(arquivo):
+    with pytest.raises(ValueError, match="desatualizado"):
+        carregar_snapshot(arquivo, fontes={"fornecedor1": {"sha256": "x"}})
@@ -0,0 +1,67 @@
+import pickle
+
+from src.domain import OfertaFornecedor
+from src.store import OfertaStore
+
+
+def _oferta(fornecedor="f1", nome="ARROZ", linha="1 ARROZ 5 kg 10,00", tipo="avista", emb=5.0, preco=10.0):
+    return OfertaFornecedor(
+        fornecedor=fornecedor, nome_pdf=nome, embalagem_kg=emb,
+        preco_por_kg=preco, tipo_preco=tipo, linha_origem=linha,
+    )
+
+
+def test_materializar_devolve_as_mesmas_ofertas(catalogo):
+    store = OfertaStore(catalogo)
+
+    assert len(store) == len(catalogo)
+    assert store.materializar() == catalogo
+    assert store[-1] == catalogo[-1]
+
+
+def test_none_e_nome_que_nao_e_pedaco_da_linha():
+    ofertas = [
+        _oferta(nome="ARROZ TIPO 1", linha="1 ARROZ tipo 1 5 kg"),   # nome normalizado pelo parser
+        _oferta(emb=None, preco=None),
+        _oferta(nome="", linha=""),
+    ]
+    store = OfertaStore(ofertas)
+
+    assert store.materializar() == ofertas
+    assert store[0].nome_pdf == "ARROZ TIPO 1"
+    assert store[1].embalagem_kg is None and store[1].preco_por_kg is None
+
+
+def test_extend_com_outro_store_remapeia_strings_e_offsets(catalogo):
+    a = OfertaStore(catalogo[:50])
+    b = OfertaStore([_oferta(fornecedor="novo", tipo="prazo", nome="FEIJAO PRETO", linha="2 feijão 1 kg")])
+    b.extend(catalogo[50:60])
+
+    a.extend(b)
+
+    assert type(b) is OfertaStore
+    assert a.materializar() == catalogo[:50] + b.materializar()
+    assert a[50].fornecedor == "novo" and a[50].tipo_preco == "prazo"
+    assert a[50].nome_pdf == "FEIJAO PRETO"
+
+
+def test_leituras_intercaladas_com_append(catalogo):
+    store = OfertaStore()
+    for i, o in enumerate(catalogo):
+        store.append(o)
+        # lê algo já gravado antes e a oferta recém-gravada
+        assert store[i // 2] == catalogo[i // 2]
+        assert store[i].linha_origem == o.linha_origem
+
+    assert store.texto == "".join(o.linha_origem + ("" if o.nome_pdf in o.linha_origem else o.nome_pdf) for o in catalogo)
+    assert store.materializar() == catalogo
+
+
+def test_pickle_mantem_as_ofertas(catalogo):
+    store = OfertaStore(catalogo[:20])
+    store[0].nome_pdf                      # já tem bloco selado
+    store.extend(catalogo[20:40])
+
+    copia = pickle.loads(pickle.dumps(store))
+
+    assert copia.materializar() == catalogo[:40]
@@ -0,0 +1,124 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from src import tfidf
+from src.domain import OfertaFornecedor
+from src.services import OfferIndex, _clean_for_match, _queries_limpas, match_ofertas_por_nome
+from src.tfidf import MIN_SCORE_TFIDF, TfidfMatcher, _trigramas
+
+PRODUTOS_FIXOS = ["castanha do pará", "chia", "aveia em flocos", "farinha de trigo", "xyz", ""]
+
+
+@pytest.fixture(scope="module")
+def matcher(catalogo):
+    return TfidfMatcher(catalogo)
+
+
+@pytest.fixture(scope="module")
+def produtos(catalogo):
+    random.seed(11)
+    amostra = random.sample(catalogo, 25)
+    return PRODUTOS_FIXOS + [v for o in amostra for v in (o.nome_pdf, o.nome_pdf[:10])]
+
+
+def _referencia(catalogo, nome_produto, top_n, min_score):
+    """Cosseno TF-IDF oferta a oferta, em Python puro (sem matriz nem blocos)."""
+    nomes = {}
+    for i, o in enumerate(catalogo):
+        c = _clean_for_match(o.nome_pdf)
+        if c:
+            nomes.setdefault(c, []).append(i)
+    tfs = {c: Counter(_trigramas(c)) for c in nomes}
+    df = Counter(g for tf in tfs.values() for g in tf)
+    idf = {g: math.log((1 + len(nomes)) / (1 + d)) + 1 for g, d in df.items()}
+    idf_novo = math.log(1 + len(nomes)) + 1
+
+    def vetor(tf, so_conhecidos):
+        v = {g: c * idf.get(g, idf_novo) for g, c in tf.items()}
+        norma = math.sqrt(sum(x * x for x in v.values())) or 1.0
+        return {g: x / norma for g, x in v.items() if not so_conhecidos or g in idf}
+
+    vetores = {c: vetor(tf, False) for c, tf in tfs.items()}
+    consultas = [vetor(Counter(_trigramas(q)), True) for q in _queries_limpas(nome_produto)]
+
+    pares = []
+    for c, ids in nomes.items():
+        s = max(sum(w * vetores[c].get(g, 0.0) for g, w in q.items()) for q in consultas)
+        if s >= min_score:
+            pares.extend((s, i) for i in ids)
+    pares.sort(key=lambda p: (-round(p[0], 9), p[1]))
+    return pares if top_n is None else pares[:top_n]
+
+
+def _compara(obtido, esperado, catalogo):
+    posicao = {id(o): i for i, o in enumerate(catalogo)}
+    assert [posicao[id(o)] for o, _ in obtido] == [i for _, i in esperado]
+    assert [s for _, s in obtido] == pytest.approx([s for s, _ in esperado], abs=1e-9)
+
+
+@pytest.mark.parametrize("top_n,min_score", [(20, MIN_SCORE_TFIDF), (None, MIN_SCORE_TFIDF), (5, 0.2)])
+def test_match_lote_igual_a_referencia(catalogo, matcher, produtos, top_n, min_score):
+    resultado = matcher.match_lote(produtos, top_n=top_n, min_score=min_score)
+
+    assert len(resultado) == len(produtos)
+    for nome, obtido in zip(produtos, resultado):
+        _compara(obtido, _referencia(catalogo, nome, top_n, min_score), catalogo)
+
+
+def test_top_n_none_traz_todos_acima_do_corte(matcher, produtos):
+    todos = matcher.match_lote(produtos, top_n=None)
+    top20 = matcher.match_lote(produtos, top_n=20)
+
+    for t, p in zip(todos, top20):
+        assert all(s >= MIN_SCORE_TFIDF for _, s in t)
+        assert t[:20] == p
+    assert any(len(t) > 20 for t in todos)
+
+
+def test_corte_min_score_tfidf(matcher, produtos):
+    soltos = matcher.match_lote(produtos, top_n=None, min_score=0.0)
+    cortados = matcher.match_lote(produtos, top_n=None)
+
+    for s, c in zip(soltos, cortados):
+        assert c == [(o, x) for o, x in s if x >= MIN_SCORE_TFIDF]
+    assert matcher.match_lote(["xyz"]) == [[]]
+
+
+def test_empate_fica_com_a_oferta_mais_antiga():
+    def oferta(nome, forn):
+        return OfertaFornecedor(forn, nome, 5.0, 10.0, "avista", f"1 {nome} 5 kg")
+
+    ofertas = [oferta("ARROZ INTEGRAL", "a"), oferta("FEIJAO", "b"), oferta("Arroz integral", "c"), oferta("ARROZ", "d")]
+    m = TfidfMatcher(ofertas)
+
+    [todos] = m.match_lote(["arroz integral"], top_n=None, min_score=0.0)
+    assert [o.fornecedor for o, _ in todos][:2] == ["a", "c"]       # mesmo nome: ordem das ofertas
+    assert todos[0][1] == todos[1][1] == pytest.approx(1.0)
+    [um] = m.match_lote(["arroz integral"], top_n=1, min_score=0.0)
+    assert [o.fornecedor for o, _ in um] == ["a"]
+
+
+def test_blocos_pequenos_dao_o_mesmo_resultado(catalogo, matcher, produtos, monkeypatch):
+    esperado = matcher.match_lote(produtos, top_n=None)
+
+    # 1 linha (consulta) por bloco, e blocos que não cabem as variações de um produto
+    for linhas in (1, 2, 3):
+        monkeypatch.setattr(tfidf, "_BLOCO_CELULAS", linhas * len(matcher.nomes))
+        assert matcher.match_lote(produtos, top_n=None) == esperado
+
+
+def test_mesmo_primeiro_lugar_que_o_sequence_matcher(catalogo, matcher):
+    # nome do catálogo como consulta: os dois matchers acham a própria oferta
+    random.seed(3)
+    amostra = random.sample([o for o in catalogo if _clean_for_match(o.nome_pdf)], 40)
+    nomes = [o.nome_pdf for o in amostra]
+    index = OfferIndex(catalogo)
+
+    for nome, cands in zip(nomes, matcher.match_lote(nomes, top_n=1)):
+        [(melhor, s)] = match_ofertas_por_nome(nome, index, top_n=1)
+        assert s == 1.0
+        assert cands[0][0] is melhor, nome
+        assert cands[0][1] == pytest.approx(1.0)
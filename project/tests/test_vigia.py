@@ -0,0 +1,49 @@
+from src.vigia import Vigia
+
+from conftest import FORNECEDORES_DIR
+
+
+def test_processar_usa_a_pasta_vigiada(pasta_pdfs, capsys):
+    pasta = pasta_pdfs("fornecedor1")
+    saida_padrao = FORNECEDORES_DIR / "compras_recomendadas.csv"
+    antes = saida_padrao.stat().st_mtime_ns
+
+    v = Vigia(pasta, polling=True, workers=1)
+    v.processar([])
+
+    assert v.metricas["erros"] == 0
+    assert v.metricas["rodadas"] == 1
+    assert (pasta / "compras_recomendadas.csv").exists()
+    assert (pasta / ".cache" / "incremental.json").exists()
+    # data/fornecedores não é tocada
+    assert saida_padrao.stat().st_mtime_ns == antes
+
+
+class _FonteInstavel:
+    """Falha na 1ª leitura; na 2ª entrega um PDF e pede parada."""
+
+    def __init__(self, vigia):
+        self.vigia = vigia
+        self.chamadas = 0
+
+    def eventos(self, timeout):
+        self.chamadas += 1
+        if self.chamadas == 1:
+            raise OSError("leitura falhou")
+        self.vigia.parar()
+        return {"fornecedor1.pdf"}
+
+    def fechar(self):
+        pass
+
+
+def test_erro_na_fonte_nao_para_a_deteccao(pasta_pdfs, capsys):
+    v = Vigia(pasta_pdfs("fornecedor1"), polling=True, intervalo=0.01)
+    v.fonte = _FonteInstavel(v)
+
+    v._observar()
+
+    assert v.fonte.chamadas == 2
+    assert v.metricas["erros"] == 1
+    assert "fornecedor1.pdf" in v._pendentes
+    assert "leitura falhou" in capsys.readouterr().out